@@ -62,29 +62,17 @@ st.sidebar.title("Navigation")
 st.sidebar.markdown("---")
 
 # Show some quick stats if database has data
-from src.models import SessionLocal, Rider, RiderRating, Race
-
-db = SessionLocal()
-try:
-    rider_count = db.query(Rider).count()
-    race_count = db.query(Race).count()
-
-    st.sidebar.metric("Total Riders", rider_count)
-    st.sidebar.metric("Total Races", race_count)
-
-    if rider_count > 0:
-        top_rider = (
-            db.query(Rider, RiderRating)
-            .join(RiderRating, Rider.id == RiderRating.rider_id)
-            .order_by(RiderRating.overall.desc())
-            .first()
-        )
-        if top_rider:
-            st.sidebar.markdown("### 🏆 Top Rated Rider")
-            st.sidebar.write(f"**{top_rider[0].name}**")
-            st.sidebar.write(f"Rating: {top_rider[1].overall}")
-finally:
-    db.close()
+from src.utils.cached_queries import ratings_version, load_summary
+
+summary = load_summary(ratings_version())
+
+st.sidebar.metric("Total Riders", summary['riders'])
+st.sidebar.metric("Total Races", summary['races'])
+
+if summary['top_rider']:
+    st.sidebar.markdown("### 🏆 Top Rated Rider")
+    st.sidebar.write(f"**{summary['top_rider']['name']}**")
+    st.sidebar.write(f"Rating: {summary['top_rider']['overall']}")
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("""
@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Literal
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -24,6 +24,14 @@ class Settings(BaseSettings):
     # Data fetching
     procyclingstats_base_url: str = "https://www.procyclingstats.com"
     fetch_interval_hours: int = 24
+    http_cache_path: Optional[str] = "data/cache/http_cache.db"  # Persistent scraper cache, None to disable
+    scraper_cache_max_mb: float = 64.0  # In-memory compressed page cache budget
+    scraper_max_concurrency: int = 4  # Race pages fetched in parallel
+    scraper_rate_burst: int = 3  # Requests allowed back to back under the average rate
+    scraper_fast_parse: bool = False  # Parse race pages with lxml/XPath instead of BeautifulSoup
+    pipelined_updates: bool = False  # Overlap fetching, parsing and DB writes in DailyUpdater
+    pipeline_parse_workers: int = 2
+    pipeline_queue_size: int = 8  # Capacity of each queue between pipeline stages
 
     # Rating system parameters
     initial_rating: int = 1500
@@ -36,6 +44,7 @@ class Settings(BaseSettings):
         "ProSeries": 1.0,  # Pro Series
         "Others": 0.7
     }
+    vectorized_rating_updates: bool = False  # Use the NumPy batch path in RatingEngine
 
     # Rider dimensions
     dimensions: list[str] = [
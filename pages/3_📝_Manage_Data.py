@@ -8,7 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.models import SessionLocal
-from src.utils.db_helpers import add_rider, add_race, add_race_result, get_rider_by_name, get_race_by_name
+from src.utils.db_helpers import add_rider, add_race, add_race_result, add_race_results_bulk, get_rider_by_name, get_race_by_name
 from src.utils.race_templates import RaceTemplates
 from src.services.rating_engine import RatingEngine
 from config.settings import settings
@@ -216,7 +216,7 @@ with tab3:
             if st.button("Import Batch Results"):
                 if batch_text:
                     lines = batch_text.strip().split('\n')
-                    success_count = 0
+                    rows = []
                     error_count = 0
 
                     for line in lines:
@@ -230,15 +230,12 @@ with tab3:
 
                                 rider = get_rider_by_name(db, name)
                                 if rider:
-                                    add_race_result(
-                                        db,
-                                        race_id=race_id,
-                                        rider_id=rider.id,
-                                        position=pos,
-                                        time_seconds=time_s,
-                                        time_behind_seconds=time_b
-                                    )
-                                    success_count += 1
+                                    rows.append({
+                                        'rider_id': rider.id,
+                                        'position': pos,
+                                        'time_seconds': time_s,
+                                        'time_behind_seconds': time_b
+                                    })
                                 else:
                                     st.warning(f"Rider '{name}' not found - skipped")
                                     error_count += 1
@@ -246,6 +243,7 @@ with tab3:
                             st.warning(f"Error parsing line '{line}': {e}")
                             error_count += 1
 
+                    success_count = len(add_race_results_bulk(db, race_id, rows))
                     st.success(f"✅ Imported {success_count} results successfully! ({error_count} errors)")
     else:
         st.info("No races found. Add a race first!")
@@ -228,6 +228,62 @@ with tab3:
     else:
         st.warning("No races found. Import races first before importing results.")
 
+    st.markdown("---")
+    st.subheader("Import a Multi-Race Results Archive")
+
+    st.markdown("""
+    Results for many races in one file, read and committed in chunks so large
+    archives do not need to fit in memory. Re-uploading the same file after an
+    interruption continues after the last committed chunk.
+
+    ```
+    race,race_date,position,rider_name,time_seconds,time_behind_seconds
+    Paris-Roubaix,2024-04-07,1,Mathieu van der Poel,19800,0
+    ```
+
+    Races are matched on a `race_pcs_id` column when present, otherwise on `race` and `race_date`.
+    For files larger than the upload limit use `python scripts/import_results.py`.
+    """)
+
+    archive_file = st.file_uploader("Choose CSV file", type=['csv'], key='archive_upload')
+
+    if archive_file is not None:
+        restart = st.checkbox("Re-import chunks committed by an earlier upload", key='archive_restart')
+
+        if st.button("Import Archive", key='import_archive_btn'):
+            temp_path = f"/tmp/{archive_file.name}"
+            with open(temp_path, 'wb') as f:
+                f.write(archive_file.getbuffer())
+
+            progress_bar = st.progress(0.0)
+            result = importer.import_results_stream(
+                temp_path,
+                progress=lambda fraction, stats: progress_bar.progress(
+                    fraction, text=f"{stats['success']:,} results imported"
+                ),
+                restart=restart
+            )
+
+            if result.get('chunks_skipped'):
+                st.info(f"Skipped {result['chunks_skipped']} chunks committed by an earlier run")
+
+            if result['success'] > 0:
+                st.success(f"✅ Successfully imported {result['success']} results!")
+                st.info("💡 Don't forget to update ratings in 'Manage Data' → 'Update Ratings'!")
+
+            if result['errors'] > 0:
+                st.warning(f"⚠️ {result['errors']} errors occurred")
+                if result.get('error_details'):
+                    with st.expander("Show error details"):
+                        for error in result['error_details'][:10]:  # Show first 10
+                            st.write(f"- {error}")
+
+            if 'message' in result:
+                st.error(result['message'])
+
+            # Clean up
+            os.remove(temp_path)
+
 db.close()
 
 st.markdown("---")
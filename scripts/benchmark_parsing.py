@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark comparing the BeautifulSoup and lxml race page parsers.
+
+Both parsers are run over saved race pages and checked for identical
+output before timing.
+
+Usage:
+    python scripts/benchmark_parsing.py                        # Use the test fixtures
+    python scripts/benchmark_parsing.py page1.html page2.html  # Use saved pages
+    python scripts/benchmark_parsing.py --iterations 50
+"""
+
+import sys
+import os
+import glob
+import argparse
+import logging
+import time
+
+from bs4 import BeautifulSoup
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.procyclingstats_scraper import ProCyclingStatsScraper
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures'
+)
+
+
+def time_parser(parse, pages, iterations: int) -> float:
+    """Return the mean seconds per page for a parse function."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for content in pages:
+            parse(content)
+    return (time.perf_counter() - start) / (iterations * len(pages))
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark race page parsing modes'
+    )
+
+    parser.add_argument(
+        'pages',
+        nargs='*',
+        help='Saved race pages (defaults to tests/fixtures/*.html)'
+    )
+
+    parser.add_argument(
+        '--iterations',
+        type=int,
+        default=20,
+        help='Times each page is parsed per mode (default: 20)'
+    )
+
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    if not paths:
+        print("No pages to benchmark")
+        return 1
+
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+
+    # Silence per-page "Extracted N results" logging
+    logging.getLogger('src.services.procyclingstats_scraper').setLevel(logging.WARNING)
+
+    scraper = ProCyclingStatsScraper(rate_limit_delay=0)
+
+    def parse_soup(content):
+        return scraper.parse_race_page(BeautifulSoup(content, 'html.parser'))
+
+    parse_fast = scraper.parse_race_page_fast
+
+    for path, content in zip(paths, pages):
+        if parse_soup(content) != parse_fast(content):
+            print(f"Parsers disagree on {path}")
+            return 1
+
+    soup_time = time_parser(parse_soup, pages, args.iterations)
+    fast_time = time_parser(parse_fast, pages, args.iterations)
+
+    print(f"Pages: {len(pages)}, iterations: {args.iterations}")
+    print(f"BeautifulSoup (html.parser): {soup_time * 1000:8.2f} ms/page")
+    print(f"lxml fast parse:             {fast_time * 1000:8.2f} ms/page")
+    print(f"Speedup:                     {soup_time / fast_time:8.1f}x")
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
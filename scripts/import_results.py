@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Command-line script to stream a multi-race results archive into the database.
+
+Results are read and committed in chunks, so files of any size can be
+imported. Running the same command again after an interruption continues
+after the last committed chunk.
+
+Usage:
+    python scripts/import_results.py all_results.csv
+    python scripts/import_results.py all_results.csv --chunksize 100000
+    python scripts/import_results.py all_results.csv --restart
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import SessionLocal
+from src.utils.csv_importer import CSVImporter, STREAM_CHUNK_SIZE
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Stream race results for many races from a CSV file'
+    )
+
+    parser.add_argument('filepath', help='Results CSV with race/race_date or race_pcs_id columns')
+
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=STREAM_CHUNK_SIZE,
+        help=f'Rows committed per transaction (default: {STREAM_CHUNK_SIZE})'
+    )
+
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Re-import chunks committed by an earlier run'
+    )
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        started = time.time()
+        stats = CSVImporter(db).import_results_stream(
+            args.filepath,
+            chunksize=args.chunksize,
+            progress=lambda fraction, stats: logger.info(
+                f"{fraction:.1%} read, {stats['success']} results imported, {stats['errors']} errors"
+            ),
+            restart=args.restart
+        )
+
+        logger.info(f"Chunks committed: {stats.get('chunks', 0)} (skipped {stats.get('chunks_skipped', 0)})")
+        logger.info(f"Results imported: {stats['success']}")
+        logger.info(f"Errors: {stats['errors']}")
+        for error in stats.get('error_details', [])[:20]:
+            logger.info(f"  {error}")
+        logger.info(f"Completed in {time.time() - started:.1f}s")
+
+        if 'message' in stats:
+            logger.error(stats['message'])
+            return 1
+        return 0
+
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Command-line script to recompute ratings by replaying race history.
+
+Run this after changing the K-factor, race importance multipliers or the
+performance curve so that past races reflect the new parameters.
+
+Usage:
+    python scripts/replay_ratings.py                          # Replay everything
+    python scripts/replay_ratings.py --start-date 2024-01-01  # Replay from a date
+"""
+
+import sys
+import os
+from datetime import datetime
+import argparse
+import logging
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import SessionLocal
+from src.services.rating_engine import RatingEngine
+from src.utils.db_helpers import refresh_rating_snapshots
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Recompute rider ratings by replaying race results'
+    )
+
+    parser.add_argument(
+        '--start-date',
+        type=str,
+        help='Only replay races from this date (YYYY-MM-DD), defaults to full history'
+    )
+
+    args = parser.parse_args()
+
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d') if args.start_date else None
+
+    db = SessionLocal()
+
+    try:
+        started = time.time()
+        stats = RatingEngine(db).replay(start_date)
+        snapshots = refresh_rating_snapshots(db)
+
+        logger.info(f"Races replayed: {stats['races_replayed']}")
+        logger.info(f"Results processed: {stats['results_processed']}")
+        logger.info(f"Riders updated: {stats['riders_updated']}")
+        logger.info(f"Monthly snapshots rebuilt: {snapshots}")
+        logger.info(f"Completed in {time.time() - started:.1f}s")
+        return 0
+
+    except Exception as e:
+        logger.error(f"Replay failed: {e}", exc_info=True)
+        db.rollback()
+        return 1
+
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -7,7 +7,9 @@ This script can be scheduled with cron or other task schedulers.
 Usage:
     python scripts/run_daily_update.py                    # Update today
     python scripts/run_daily_update.py --date 2024-07-14  # Update specific date
+    python scripts/run_daily_update.py --pipelined        # Overlap fetching, parsing and DB writes
     python scripts/run_daily_update.py --historical --start-date 2024-07-01 --days 7
+    python scripts/run_daily_update.py --historical --start-date 2024-07-01 --days 7 --restart
 """
 
 import sys
@@ -66,6 +68,18 @@ def main():
         help='Number of days for historical update (default: 7)'
     )
 
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Redo historical dates already completed by an earlier run'
+    )
+
+    parser.add_argument(
+        '--pipelined',
+        action='store_true',
+        help='Fetch and parse races concurrently while storing them in order'
+    )
+
     parser.add_argument(
         '--init-db',
         action='store_true',
@@ -96,19 +110,18 @@ def main():
                 end_date = start_date + timedelta(days=args.days - 1)
 
                 logger.info(f"Running historical update: {start_date} to {end_date}")
-                all_stats = updater.run_historical_update(start_date, end_date)
+                stats = updater.run_backfill(start_date, end_date, restart=args.restart)
 
                 # Summary
-                total_races = sum(s.get('races_processed', 0) for s in all_stats)
-                total_riders = sum(s.get('riders_added', 0) for s in all_stats)
-
                 logger.info(f"\n{'='*60}")
                 logger.info("Historical Update Complete")
-                logger.info(f"Total races processed: {total_races}")
-                logger.info(f"Total new riders: {total_riders}")
+                logger.info(f"Dates completed: {stats['dates_completed']} (skipped {stats['dates_skipped']})")
+                logger.info(f"Total races processed: {stats['races_processed']}")
+                logger.info(f"Total races failed: {stats['races_failed']}")
+                logger.info(f"Total new riders: {stats['riders_added']}")
                 logger.info(f"{'='*60}\n")
 
-                return 0
+                return 0 if stats.get('success') and not stats['races_failed'] else 1
 
             else:
                 # Single day update
@@ -118,7 +131,7 @@ def main():
                     target_date = date.today()
 
                 logger.info(f"Running daily update for {target_date}")
-                stats = updater.run_daily_update(target_date)
+                stats = updater.run_daily_update(target_date, pipelined=args.pipelined or None)
 
                 if stats.get('success'):
                     logger.info("\n✅ Daily update completed successfully!")
@@ -126,6 +139,8 @@ def main():
                     logger.info(f"New riders added: {stats.get('riders_added', 0)}")
                     logger.info(f"Results added: {stats.get('results_added', 0)}")
                     logger.info(f"Ratings updated: {stats.get('ratings_updated', 0)}\n")
+                    for stage, stage_stats in stats.get('pipeline', {}).get('stages', {}).items():
+                        logger.info(f"{stage}: {stage_stats['items']} races, {stage_stats['items_per_second']}/s")
                     return 0
                 else:
                     logger.error("\n❌ Daily update failed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Command-line script to move rating data between databases as Parquet files.
+
+Exports riders, races, race characteristics, results and rating history
+from the configured database, or imports such an export into it.
+
+Usage:
+    python scripts/transfer_data.py export exports/2024 --season 2024
+    python scripts/transfer_data.py import exports/2024
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import SessionLocal
+from src.utils.parquet_io import export_parquet, import_parquet
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Export or import rating data as Parquet files'
+    )
+
+    parser.add_argument('action', choices=['export', 'import'], help='Direction of the transfer')
+    parser.add_argument('directory', help='Directory holding the <table>.parquet files')
+
+    parser.add_argument(
+        '--season',
+        type=int,
+        help='Only export races of this season and the riders in them (export only)'
+    )
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        started = time.time()
+        if args.action == 'export':
+            stats = export_parquet(db, args.directory, season=args.season)
+        else:
+            stats = import_parquet(db, args.directory)
+
+        for table, rows in stats.items():
+            logger.info(f"{table}: {rows}")
+        logger.info(f"Completed in {time.time() - started:.1f}s")
+        return 0
+
+    except Exception as e:
+        logger.error(f"Transfer failed: {e}", exc_info=True)
+        db.rollback()
+        return 1
+
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -3,6 +3,11 @@
 from .base import Base, engine, SessionLocal, init_db
 from .rider import Rider, RiderRating, RatingHistory
 from .race import Race, RaceResult, RaceCharacteristics
+from .checkpoint import UpdateCheckpoint
+from .rating_snapshot import RatingSnapshot
+from .leaderboard import LeaderboardEntry
+from .data_version import DataVersion
+from .dimension_stat import DimensionStat
 
 __all__ = [
     "Base",
@@ -15,4 +20,9 @@ __all__ = [
     "Race",
     "RaceResult",
     "RaceCharacteristics",
+    "UpdateCheckpoint",
+    "RatingSnapshot",
+    "LeaderboardEntry",
+    "DataVersion",
+    "DimensionStat",
 ]
@@ -34,6 +34,10 @@ def init_db():
 
     Base.metadata.create_all(bind=engine)
 
+    # Bring tables created by older versions up to date
+    from .migrations import run_migrations
+    run_migrations(engine)
+
 
 def get_db():
     """Get a database session."""
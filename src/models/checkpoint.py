@@ -0,0 +1,22 @@
+"""Checkpoint model for resumable data updates."""
+
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from .base import Base
+
+
+class UpdateCheckpoint(Base):
+    """A unit of update work (a date or a race page) that completed successfully."""
+
+    __tablename__ = "update_checkpoints"
+    __table_args__ = (
+        Index("ix_update_checkpoints_kind_key", "kind", "key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # 'date', 'race' or 'unrated' (late race awaiting a recompute)
+    key = Column(String, nullable=False)  # ISO date, race URL or race ID
+    completed_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UpdateCheckpoint(kind='{self.kind}', key='{self.key}')>"
@@ -0,0 +1,16 @@
+"""Change counters that let readers cache query results until data changes."""
+
+from sqlalchemy import Column, Integer, String
+from .base import Base
+
+
+class DataVersion(Base):
+    """A named counter bumped in the same transaction as every write it covers."""
+
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)  # e.g. "ratings"
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion(name='{self.name}', version={self.version})>"
@@ -0,0 +1,46 @@
+"""Running sums over rider_ratings for rating means, variances and correlations."""
+
+from itertools import combinations_with_replacement
+from sqlalchemy import Column, BigInteger, String
+from .base import Base
+from .rider import HISTORY_RATING_COLUMNS
+
+# Every rating dimension plus overall
+STAT_DIMENSIONS = HISTORY_RATING_COLUMNS
+
+# Each unordered pair of dimensions once, squares included
+STAT_PAIRS = list(combinations_with_replacement(STAT_DIMENSIONS, 2))
+
+COUNT_KEY = "count"
+
+
+def sum_key(dimension: str) -> str:
+    """Name of the row holding the sum of a dimension."""
+    return f"sum:{dimension}"
+
+
+def product_key(a: str, b: str) -> str:
+    """Name of the row holding the sum of a * b, whichever order the pair is given in."""
+    if STAT_DIMENSIONS.index(a) > STAT_DIMENSIONS.index(b):
+        a, b = b, a
+    return f"product:{a}:{b}"
+
+
+STAT_KEYS = [COUNT_KEY] + [sum_key(dim) for dim in STAT_DIMENSIONS] + [product_key(a, b) for a, b in STAT_PAIRS]
+
+
+class DimensionStat(Base):
+    """
+    One running total over rider_ratings.
+
+    Rows are the rider count, the sum of each dimension and the sum of each
+    product of two dimensions. Missing ratings add nothing, as in SQL SUM.
+    """
+
+    __tablename__ = "dimension_stats"
+
+    name = Column(String, primary_key=True)  # e.g. "sum:flat", "product:flat:mountain"
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DimensionStat(name='{self.name}', value={self.value})>"
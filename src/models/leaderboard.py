@@ -0,0 +1,26 @@
+"""Materialized rankings of riders per rating dimension."""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from .base import Base
+
+
+class LeaderboardEntry(Base):
+    """A rider's rank in one rating dimension (rating descending, then rider ID)."""
+
+    __tablename__ = "leaderboard"
+    __table_args__ = (
+        # Top-K reads are a range scan on (dimension, rank)
+        Index("ix_leaderboard_dimension_rank", "dimension", "rank"),
+        # Rider first: updates load every dimension of the touched riders
+        Index("ix_leaderboard_rider_id_dimension", "rider_id", "dimension", unique=True),
+        Index("ix_leaderboard_dimension_rating", "dimension", "rating"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)  # A rating dimension or 'overall'
+    rank = Column(Integer, nullable=False)
+    rider_id = Column(Integer, ForeignKey("riders.id"), nullable=False)
+    rating = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<LeaderboardEntry(dimension='{self.dimension}', rank={self.rank}, rider_id={self.rider_id})>"
@@ -0,0 +1,193 @@
+"""
+In-place schema migrations for existing SQLite/PostgreSQL databases.
+
+Base.metadata.create_all only creates missing tables, so columns and
+indexes added to existing tables are applied here. Every step is
+idempotent and runs from init_db().
+"""
+
+import json
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .naming import make_name_key
+from .rider import HISTORY_RATING_COLUMNS
+from .dimension_stat import STAT_DIMENSIONS, STAT_PAIRS, STAT_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+def run_migrations(engine: Engine):
+    """Apply all pending schema migrations."""
+    migrate_name_keys(engine)
+    migrate_rating_history_columns(engine)
+    migrate_leaderboard(engine)
+    migrate_dimension_stats(engine)
+    migrate_indexes(engine)
+
+
+def migrate_name_keys(engine: Engine):
+    """Add and backfill the normalized name_key columns on riders and races."""
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table in ("riders", "races"):
+            columns = {column["name"] for column in inspector.get_columns(table)}
+            if "name_key" not in columns:
+                logger.info(f"Adding {table}.name_key")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN name_key VARCHAR"))
+
+        _backfill_name_keys(conn, "riders", unique_on=())
+        _backfill_name_keys(conn, "races", unique_on=("date",))
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_riders_name_key ON riders (name_key)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_races_name_key_date ON races (name_key, date)"))
+
+
+def migrate_rating_history_columns(engine: Engine):
+    """
+    Move rating history from the JSON ratings column to one integer column per dimension.
+
+    Existing snapshots are copied into the new columns and the JSON column is
+    dropped, together with the (rider_id, date) index used for rider history.
+    """
+    inspector = inspect(engine)
+    if "rating_history" not in inspector.get_table_names():
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("rating_history")}
+
+    with engine.begin() as conn:
+        for column in HISTORY_RATING_COLUMNS:
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE rating_history ADD COLUMN {column} INTEGER"))
+
+        if "ratings" in columns:
+            _backfill_rating_columns(conn)
+            logger.info("Dropping rating_history.ratings")
+            conn.execute(text("ALTER TABLE rating_history DROP COLUMN ratings"))
+
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_rating_history_rider_id_date ON rating_history (rider_id, date)"
+        ))
+
+
+def migrate_leaderboard(engine: Engine):
+    """Fill the leaderboard from rider_ratings for databases rated before it existed."""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM leaderboard LIMIT 1")).first() is not None:
+            return
+        if conn.execute(text("SELECT 1 FROM rider_ratings LIMIT 1")).first() is None:
+            return
+
+        logger.info("Building leaderboard from rider_ratings")
+        for column in HISTORY_RATING_COLUMNS:
+            conn.execute(text(
+                "INSERT INTO leaderboard (dimension, rank, rider_id, rating) "
+                f"SELECT '{column}', ROW_NUMBER() OVER (ORDER BY {column} DESC, rider_id), rider_id, {column} "
+                f"FROM rider_ratings WHERE {column} IS NOT NULL"
+            ))
+
+
+def migrate_dimension_stats(engine: Engine):
+    """Compute the dimension statistics for databases rated before they were maintained."""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM dimension_stats LIMIT 1")).first() is not None:
+            return
+        if conn.execute(text("SELECT 1 FROM rider_ratings LIMIT 1")).first() is None:
+            return
+
+        logger.info("Computing dimension statistics from rider_ratings")
+        aggregates = ["COUNT(*)"] + [f"SUM({dim})" for dim in STAT_DIMENSIONS] + [
+            f"SUM({a} * {b})" for a, b in STAT_PAIRS
+        ]
+        values = conn.execute(text(f"SELECT {', '.join(aggregates)} FROM rider_ratings")).one()
+        conn.execute(
+            text("INSERT INTO dimension_stats (name, value) VALUES (:name, :value)"),
+            [{"name": name, "value": int(value or 0)} for name, value in zip(STAT_KEYS, values)]
+        )
+
+
+def migrate_indexes(engine: Engine):
+    """Create indexes declared on the models that existing tables are missing."""
+    from .base import Base
+
+    with engine.begin() as conn:
+        # Replaced by ix_leaderboard_rider_id_dimension
+        conn.execute(text("DROP INDEX IF EXISTS ix_leaderboard_dimension_rider_id"))
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def _backfill_rating_columns(conn, batch_size: int = 10000):
+    """
+    Copy JSON rating snapshots into the per-dimension columns.
+
+    The JSON snapshots never recorded overall, so it is computed from the
+    dimensions with the engine's weights. Snapshots missing a weighted
+    dimension keep overall NULL and are logged.
+    """
+    # Imported here: the engine imports the models package
+    from src.services.rating_engine import OVERALL_WEIGHTS
+
+    assignments = ", ".join(f"{column} = :{column}" for column in HISTORY_RATING_COLUMNS)
+    rows = conn.execute(text("SELECT id, ratings FROM rating_history WHERE ratings IS NOT NULL")).fetchall()
+    if rows:
+        logger.info(f"Converting {len(rows)} rating history rows to columns")
+
+    incomplete = 0
+    for start in range(0, len(rows), batch_size):
+        updates = []
+        for row_id, snapshot in rows[start:start + batch_size]:
+            # SQLite returns JSON as text, PostgreSQL as a decoded object
+            if isinstance(snapshot, str):
+                snapshot = json.loads(snapshot)
+            values = {column: snapshot.get(column) for column in HISTORY_RATING_COLUMNS}
+            if values["overall"] is None:
+                if any(values[dim] is None for dim in OVERALL_WEIGHTS):
+                    incomplete += 1
+                else:
+                    # Same summation order and rounding as RatingEngine._calculate_overall_rating
+                    values["overall"] = int(round(sum(values[dim] * weight for dim, weight in OVERALL_WEIGHTS.items())))
+            updates.append({"id": row_id, **values})
+        conn.execute(text(f"UPDATE rating_history SET {assignments} WHERE id = :id"), updates)
+
+    if incomplete:
+        logger.warning(
+            f"{incomplete} rating history rows lack a dimension, "
+            "run scripts/replay_ratings.py to record their overall ratings"
+        )
+
+
+def _backfill_name_keys(conn, table: str, unique_on: tuple):
+    """
+    Fill name_key for rows that do not have one yet.
+
+    Rows whose key would collide with an existing row are left NULL and
+    logged, so the unique index can still be created.
+    """
+    extra = "".join(f", {column}" for column in unique_on)
+
+    taken = {
+        tuple(row)
+        for row in conn.execute(text(f"SELECT name_key{extra} FROM {table} WHERE name_key IS NOT NULL"))
+    }
+
+    updates = []
+    for row in conn.execute(text(f"SELECT id, name{extra} FROM {table} WHERE name_key IS NULL ORDER BY id")):
+        key = make_name_key(row[1])
+        unique_value = (key, *row[2:])
+        if key is None:
+            continue
+        if unique_value in taken:
+            logger.warning(f"Duplicate name key '{key}' for {table}.id={row[0]}, leaving it unset")
+            continue
+        taken.add(unique_value)
+        updates.append({"id": row[0], "name_key": key})
+
+    if updates:
+        logger.info(f"Backfilling {len(updates)} name keys in {table}")
+        conn.execute(text(f"UPDATE {table} SET name_key = :name_key WHERE id = :id"), updates)
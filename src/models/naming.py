@@ -0,0 +1,43 @@
+"""Normalized name keys used for exact rider and race lookups."""
+
+import re
+import unicodedata
+from typing import Optional
+
+# Letters that Unicode decomposition does not reduce to a base letter
+_TRANSLITERATIONS = str.maketrans({
+    'ø': 'o', 'Ø': 'O',
+    'æ': 'ae', 'Æ': 'AE',
+    'œ': 'oe', 'Œ': 'OE',
+    'ß': 'ss',
+    'đ': 'd', 'Đ': 'D',
+    'ł': 'l', 'Ł': 'L',
+    'þ': 'th', 'Þ': 'Th',
+    'ı': 'i',
+})
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def make_name_key(name: Optional[str]) -> Optional[str]:
+    """
+    Build the lookup key for a rider or race name.
+
+    The key is accent-folded, lowercased, with punctuation replaced by
+    single spaces, so "Pogačar" and "Pogacar" or "Liège-Bastogne-Liège"
+    and "Liege Bastogne Liege" share a key.
+
+    Args:
+        name: Rider or race name
+
+    Returns:
+        Normalized key, or None for an empty name
+    """
+    if not name:
+        return None
+
+    decomposed = unicodedata.normalize('NFKD', name.translate(_TRANSLITERATIONS))
+    folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    key = ' '.join(_NON_WORD.sub(' ', folded).split())
+
+    return key or None
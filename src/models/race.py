@@ -1,10 +1,11 @@
 """Race models for storing race information and results."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Enum, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 import enum
 from .base import Base
+from .naming import make_name_key
 
 
 class RaceCategory(enum.Enum):
@@ -21,10 +22,15 @@ class Race(Base):
     """Model representing a professional cycling race."""
 
     __tablename__ = "races"
+    __table_args__ = (
+        # Same race name can recur every season, so keys are unique per date
+        Index("ix_races_name_key_date", "name_key", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     pcs_id = Column(String, unique=True, index=True, nullable=True)  # ProCyclingStats ID
     name = Column(String, nullable=False, index=True)
+    name_key = Column(String, nullable=True)  # Normalized name for lookups
 
     # Race information
     category = Column(Enum(RaceCategory), default=RaceCategory.OTHERS)
@@ -51,6 +57,12 @@ class Race(Base):
     def __repr__(self):
         return f"<Race(name='{self.name}', date={self.date})>"
 
+    @validates("name")
+    def _update_name_key(self, key, name):
+        """Keep name_key in sync with name."""
+        self.name_key = make_name_key(name)
+        return name
+
 
 class RaceCharacteristics(Base):
     """Characteristics of a race that determine which skills are tested."""
@@ -99,6 +111,13 @@ class RaceResult(Base):
     """Results of riders in races."""
 
     __tablename__ = "race_results"
+    __table_args__ = (
+        # A race's classified finishers in order; the leading race_id also
+        # serves every other per-race lookup
+        Index("ix_race_results_race_id_status_position", "race_id", "did_not_finish", "did_not_start", "position"),
+        # A rider's results (profile page, history restores)
+        Index("ix_race_results_rider_id_race_id", "rider_id", "race_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     race_id = Column(Integer, ForeignKey("races.id"), nullable=False)
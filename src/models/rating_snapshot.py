@@ -0,0 +1,30 @@
+"""Periodic full snapshots of rider ratings for point-in-time queries."""
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from .base import Base
+
+
+class RatingSnapshot(Base):
+    """A rider's ratings at the start of a snapshot date, from history strictly before it."""
+
+    __tablename__ = "rating_snapshots"
+    __table_args__ = (
+        Index("ix_rating_snapshots_date_rider_id", "snapshot_date", "rider_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_date = Column(DateTime, nullable=False)  # First day of a month
+    rider_id = Column(Integer, ForeignKey("riders.id"), nullable=False)
+
+    flat = Column(Integer, nullable=True)
+    cobbles = Column(Integer, nullable=True)
+    mountain = Column(Integer, nullable=True)
+    time_trial = Column(Integer, nullable=True)
+    sprint = Column(Integer, nullable=True)
+    gc = Column(Integer, nullable=True)
+    one_day = Column(Integer, nullable=True)
+    endurance = Column(Integer, nullable=True)
+    overall = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<RatingSnapshot(rider_id={self.rider_id}, snapshot_date={self.snapshot_date})>"
@@ -1,9 +1,15 @@
 """Rider models for storing cyclist information and ratings."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from .base import Base
+from .naming import make_name_key
+
+# Rating columns stored on every rating history row
+HISTORY_RATING_COLUMNS = (
+    "flat", "cobbles", "mountain", "time_trial", "sprint", "gc", "one_day", "endurance", "overall"
+)
 
 
 class Rider(Base):
@@ -14,6 +20,7 @@ class Rider(Base):
     id = Column(Integer, primary_key=True, index=True)
     pcs_id = Column(String, unique=True, index=True, nullable=True)  # ProCyclingStats ID
     name = Column(String, nullable=False, index=True)
+    name_key = Column(String, unique=True, index=True, nullable=True)  # Normalized name for lookups
     country = Column(String, nullable=True)
     team = Column(String, nullable=True)
     birth_date = Column(DateTime, nullable=True)
@@ -30,6 +37,12 @@ class Rider(Base):
     def __repr__(self):
         return f"<Rider(name='{self.name}', team='{self.team}')>"
 
+    @validates("name")
+    def _update_name_key(self, key, name):
+        """Keep name_key in sync with name."""
+        self.name_key = make_name_key(name)
+        return name
+
 
 class RiderRating(Base):
     """Current ratings for each rider across different dimensions."""
@@ -85,6 +98,12 @@ class RatingHistory(Base):
     """Historical ratings for tracking evolution over time."""
 
     __tablename__ = "rating_history"
+    __table_args__ = (
+        # Per-rider history is always read in date order
+        Index("ix_rating_history_rider_id_date", "rider_id", "date"),
+        # Rows written by a race, read and replaced when it is recomputed
+        Index("ix_rating_history_race_id", "race_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     rider_id = Column(Integer, ForeignKey("riders.id"), nullable=False)
@@ -92,8 +111,16 @@ class RatingHistory(Base):
 
     date = Column(DateTime, nullable=False, index=True)
 
-    # Rating snapshots
-    ratings = Column(JSON, nullable=False)  # Store all dimension ratings as JSON
+    # Rating snapshots, one column per dimension
+    flat = Column(Integer, nullable=True)
+    cobbles = Column(Integer, nullable=True)
+    mountain = Column(Integer, nullable=True)
+    time_trial = Column(Integer, nullable=True)
+    sprint = Column(Integer, nullable=True)
+    gc = Column(Integer, nullable=True)
+    one_day = Column(Integer, nullable=True)
+    endurance = Column(Integer, nullable=True)
+    overall = Column(Integer, nullable=True)
 
     # Change metadata
     change_reason = Column(String, nullable=True)  # e.g., "Race result", "Manual adjustment"
@@ -104,3 +131,20 @@ class RatingHistory(Base):
 
     def __repr__(self):
         return f"<RatingHistory(rider_id={self.rider_id}, date={self.date})>"
+
+    @property
+    def ratings(self):
+        """Recorded ratings as a dictionary, leaving out unrecorded dimensions."""
+        return {
+            column: getattr(self, column)
+            for column in HISTORY_RATING_COLUMNS
+            if getattr(self, column) is not None
+        }
+
+    @ratings.setter
+    def ratings(self, values):
+        """Set rating columns from a dictionary of dimension ratings."""
+        for column, value in values.items():
+            if column not in HISTORY_RATING_COLUMNS:
+                raise KeyError(f"Unknown rating dimension '{column}'")
+            setattr(self, column, value)
@@ -1,6 +1,9 @@
 """Services for the Cycling Rating System."""
 
 from .rating_engine import RatingEngine
+from .rating_cache import RatingCache
+from .leaderboard import Leaderboard
+from .dimension_stats import DimensionStats
 from .data_fetcher import DataFetcher
 
-__all__ = ["RatingEngine", "DataFetcher"]
+__all__ = ["RatingEngine", "RatingCache", "Leaderboard", "DimensionStats", "DataFetcher"]
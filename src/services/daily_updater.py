@@ -10,8 +10,10 @@ This module handles:
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Tuple, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import sys
 import os
@@ -19,9 +21,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.services.procyclingstats_scraper import ProCyclingStatsScraper
+from src.services.http_cache import HttpCache
+from src.services.update_pipeline import UpdatePipeline
 from src.services.rating_engine import RatingEngine
-from src.utils.db_helpers import add_rider, add_race, add_race_result, get_rider_by_name, get_race_by_name
+from src.utils.db_helpers import (
+    upsert_race, add_race_results_bulk, resolve_riders_bulk, get_race_by_name, get_race_by_pcs_id, delete_race,
+    get_completed_checkpoints, get_checkpoint_keys, mark_checkpoint, clear_checkpoints, refresh_rating_snapshots
+)
 from src.models import SessionLocal, Rider, Race, RaceResult
+from config.settings import settings
 
 # Configure logging
 logging.basicConfig(
@@ -53,8 +61,13 @@ class DailyUpdater:
             scraper: ProCyclingStats scraper instance (creates one if None)
         """
         self.db = db
-        self.scraper = scraper or ProCyclingStatsScraper()
+        self.scraper = scraper or ProCyclingStatsScraper(
+            http_cache=HttpCache.from_settings(),
+            burst=settings.scraper_rate_burst
+        )
         self.rating_engine = RatingEngine(db)
+        # Set during a backfill: late races are rated together at the end
+        self.defer_late_races = False
         self.stats = {
             'races_processed': 0,
             'races_failed': 0,
@@ -64,18 +77,22 @@ class DailyUpdater:
             'errors': []
         }
 
-    def run_daily_update(self, target_date: Optional[date] = None) -> Dict:
+    def run_daily_update(self, target_date: Optional[date] = None, pipelined: Optional[bool] = None) -> Dict:
         """
         Run the complete daily update process.
 
         Args:
             target_date: Date to process (defaults to today)
+            pipelined: Overlap fetching, parsing and storing races
+                (defaults to settings.pipelined_updates)
 
         Returns:
             Dictionary with update statistics and status
         """
         if target_date is None:
             target_date = date.today()
+        if pipelined is None:
+            pipelined = settings.pipelined_updates
 
         logger.info(f"=" * 60)
         logger.info(f"Starting daily update for {target_date}")
@@ -105,19 +122,23 @@ class DailyUpdater:
 
             # Step 2: Process each race
             logger.info("Step 2: Processing races...")
-            for race_info in races:
-                try:
-                    self._process_race(race_info)
-                    self.stats['races_processed'] += 1
-                except Exception as e:
-                    logger.error(f"Failed to process race {race_info.get('name')}: {e}")
-                    self.stats['races_failed'] += 1
-                    self.stats['errors'].append({
-                        'race': race_info.get('name'),
-                        'error': str(e)
-                    })
-
-            # Step 3: Generate summary
+            if pipelined:
+                self._run_pipeline(races)
+            else:
+                # Download all new race pages concurrently before processing them in order
+                self._prefetch_races(races)
+
+                for race_info in races:
+                    try:
+                        self._process_race(race_info)
+                        self.stats['races_processed'] += 1
+                    except Exception as e:
+                        self._record_failure(race_info, e)
+
+            # Step 3: Snapshot months that are now complete for as-of queries
+            refresh_rating_snapshots(self.db)
+
+            # Step 4: Generate summary
             logger.info("=" * 60)
             logger.info("Update Summary:")
             logger.info(f"  Races processed: {self.stats['races_processed']}")
@@ -136,6 +157,97 @@ class DailyUpdater:
             self.stats['errors'].append({'system': str(e)})
             return self.stats
 
+    def _prefetch_races(self, races: List[Dict]):
+        """
+        Fetch the detail pages of races not yet in the database concurrently.
+
+        The pages land in the scraper's cache, so ``_process_race`` parses
+        them without waiting on the network. Failures are left for
+        ``_process_race`` to retry and report.
+
+        Args:
+            races: Basic race information from race list
+        """
+        urls = [
+            race_info['url'] for race_info in races
+            if race_info.get('url') and not self._find_existing_race(race_info)
+        ]
+        if not urls:
+            return
+
+        try:
+            fetched = self.scraper.prefetch(urls)
+            logger.info(f"Prefetched {fetched} of {len(urls)} race pages")
+        except Exception as e:
+            logger.warning(f"Concurrent prefetch failed, falling back to serial fetching: {e}")
+
+    def _run_pipeline(self, races: List[Dict]):
+        """
+        Process races through the staged fetch/parse/write pipeline.
+
+        Pages are fetched and parsed by worker pools while this thread
+        stores races and applies rating updates one at a time in race-date
+        order. Stage throughput and queue depths are added to the stats
+        under 'pipeline'.
+
+        Args:
+            races: Basic race information from race list
+        """
+        races = sorted(races, key=lambda race_info: race_info.get('date') or date.min)
+        new_races = [race_info for race_info in races if not self._race_exists(race_info)]
+
+        self.stats['pipeline'] = self._build_pipeline(self._write_race).run(new_races)
+
+    def _race_exists(self, race_info: Dict) -> bool:
+        """Check whether a listed race is already stored, counting it as processed if so."""
+        if self._find_existing_race(race_info):
+            logger.info(f"Race '{race_info.get('name')}' already exists, skipping")
+            self.stats['races_processed'] += 1
+            return True
+        return False
+
+    def _build_pipeline(self, write) -> UpdatePipeline:
+        """Create a fetch/parse pipeline that hands parsed races to ``write``."""
+        return UpdatePipeline(
+            fetch=lambda race_info: self.scraper.fetch_race_page(race_info.get('url')),
+            parse=self._parse_race_page,
+            write=write,
+            fetch_workers=settings.scraper_max_concurrency,
+            parse_workers=settings.pipeline_parse_workers,
+            queue_size=settings.pipeline_queue_size
+        )
+
+    def _parse_race_page(self, race_info: Dict, content: Optional[bytes]) -> Dict:
+        """Pipeline parse stage: turn a fetched page into race data."""
+        race_url = race_info.get('url')
+        race_data = self.scraper.parse_race_details(race_url, content) if content is not None else None
+
+        if not race_data:
+            raise ValueError(f"Failed to fetch race details from {race_url}")
+        return race_data
+
+    def _write_race(self, race_info: Dict, race_data: Optional[Dict], error: Optional[Exception]):
+        """Pipeline write stage: store a parsed race or record why it failed."""
+        if error is None:
+            try:
+                logger.info(f"Processing race: {race_info.get('name')}")
+                self._store_race(race_info, race_data)
+                self.stats['races_processed'] += 1
+                return
+            except Exception as e:
+                error = e
+
+        self._record_failure(race_info, error)
+
+    def _record_failure(self, race_info: Dict, error: Exception):
+        """Record a race that could not be processed."""
+        logger.error(f"Failed to process race {race_info.get('name')}: {error}")
+        self.stats['races_failed'] += 1
+        self.stats['errors'].append({
+            'race': race_info.get('name'),
+            'error': str(error)
+        })
+
     def _process_race(self, race_info: Dict):
         """
         Process a single race: fetch details, create race, process results.
@@ -147,7 +259,7 @@ class DailyUpdater:
         logger.info(f"Processing race: {race_name}")
 
         # Check if race already exists
-        existing_race = get_race_by_name(self.db, race_name)
+        existing_race = self._find_existing_race(race_info)
         if existing_race:
             logger.info(f"Race '{race_name}' already exists, skipping")
             return
@@ -159,20 +271,56 @@ class DailyUpdater:
         if not race_data:
             raise ValueError(f"Failed to fetch race details from {race_url}")
 
+        self._store_race(race_info, race_data)
+
+    def _find_existing_race(self, race_info: Dict) -> Optional[Race]:
+        """
+        Look up a listed race that is already stored.
+
+        Races are matched on their PCS id when the listing has one, which
+        tells apart stages and editions sharing a name; listings without
+        one fall back to an exact normalized name match.
+
+        Args:
+            race_info: Basic race information from race list
+
+        Returns:
+            The stored race or None
+        """
+        pcs_id = race_info.get('pcs_id')
+        if pcs_id:
+            return get_race_by_pcs_id(self.db, pcs_id)
+        return get_race_by_name(self.db, race_info.get('name'))
+
+    def _store_race(self, race_info: Dict, race_data: Dict):
+        """
+        Validate and store a fetched race, its results and rating updates.
+
+        Args:
+            race_info: Basic race information from race list
+            race_data: Race details from the scraper
+        """
+        race_name = race_info.get('name')
+
         # Validate race data
         if not self._validate_race_data(race_data):
             raise ValueError("Invalid race data")
 
-        # Create race in database
-        race = add_race(
+        # Create race in database, unless a concurrent or earlier run already did
+        race, created = upsert_race(
             self.db,
             name=race_data['name'],
             date=race_data['date'],
             category=race_data['category'],
             country=race_data.get('country'),
-            characteristics=race_data['characteristics']
+            characteristics=race_data['characteristics'],
+            pcs_id=race_data.get('pcs_id') or race_info.get('pcs_id')
         )
 
+        if not created:
+            logger.info(f"Race '{race.name}' (ID: {race.id}) already stored, skipping results and ratings")
+            return
+
         logger.info(f"Created race: {race.name} (ID: {race.id})")
 
         # Process results
@@ -181,19 +329,53 @@ class DailyUpdater:
             logger.warning(f"No results found for {race_name}")
             return
 
-        results_added = self._process_results(race.id, results)
-        self.stats['results_added'] += results_added
-
-        # Update ratings
-        logger.info(f"Updating ratings for {race_name}...")
         try:
-            rating_result = self.rating_engine.update_ratings_for_race(race.id)
-            self.stats['ratings_updated'] += rating_result.get('updated', 0)
-            logger.info(f"Updated ratings for {rating_result.get('updated', 0)} riders")
+            results_added = self._process_results(race.id, results)
+
+            # Update ratings
+            logger.info(f"Updating ratings for {race_name}...")
+            updated = self._update_ratings(race)
         except Exception as e:
-            logger.error(f"Failed to update ratings: {e}")
+            # A stored race counts as done, so drop it and let the next run store it again
+            logger.error(f"Failed to store results and ratings for {race_name}, removing the race: {e}")
+            self.db.rollback()
+            delete_race(self.db, race.id)
             raise
 
+        self.stats['results_added'] += results_added
+        self.stats['ratings_updated'] += updated
+        logger.info(f"Updated ratings for {updated} riders")
+
+    def _update_ratings(self, race: Race) -> int:
+        """
+        Apply a newly stored race to the ratings.
+
+        Races dated before the latest rated race arrived late, so the later
+        races they affect are recomputed incrementally. During a backfill
+        they are only recorded, and _rate_deferred_races recomputes them all
+        at once.
+
+        Args:
+            race: Newly stored race
+
+        Returns:
+            Number of riders whose ratings changed
+        """
+        latest_rated = self.rating_engine.latest_rated_date()
+
+        if latest_rated is not None and race.date < latest_rated:
+            if self.defer_late_races:
+                # Kept in the checkpoint table so a crashed backfill still rates it on the next run
+                mark_checkpoint(self.db, 'unrated', str(race.id))
+                return 0
+
+            logger.info(f"Race '{race.name}' predates ratings up to {latest_rated}, recomputing from {race.date}")
+            rating_result = self.rating_engine.recompute_from(race.date, race_ids=[race.id])
+            return rating_result.get('riders_updated', 0)
+
+        rating_result = self.rating_engine.update_ratings_for_race(race.id)
+        return rating_result.get('updated', 0)
+
     def _process_results(self, race_id: int, results: List[Dict]) -> int:
         """
         Process race results: create/find riders, add results.
@@ -205,42 +387,28 @@ class DailyUpdater:
         Returns:
             Number of results successfully added
         """
-        added_count = 0
-
-        for result in results:
-            try:
-                rider_name = result.get('rider_name')
-                if not rider_name:
-                    continue
+        entries = [
+            (result.get('rider_name'), result.get('pcs_id'), result.get('team'))
+            for result in results
+            if result.get('rider_name')
+        ]
 
-                # Find or create rider
-                rider = get_rider_by_name(self.db, rider_name)
-                if not rider:
-                    logger.info(f"Creating new rider: {rider_name}")
-                    rider = add_rider(
-                        self.db,
-                        name=rider_name,
-                        team=result.get('team')
-                    )
-                    self.rating_engine.initialize_rider_ratings(rider.id)
-                    self.stats['riders_added'] += 1
-
-                # Add race result
-                position = result.get('position')
-                if position:
-                    add_race_result(
-                        self.db,
-                        race_id=race_id,
-                        rider_id=rider.id,
-                        position=position
-                    )
-                    added_count += 1
+        # Find or create every rider on the sheet in one batch
+        created = []
+        rider_ids = resolve_riders_bulk(self.db, entries, created=created)
+        for rider_name in created:
+            logger.info(f"Created new rider: {rider_name}")
+        self.stats['riders_added'] += len(created)
 
-            except Exception as e:
-                logger.error(f"Failed to process result for {result.get('rider_name')}: {e}")
-                continue
+        rows = []
+        for result in results:
+            rider_name = (result.get('rider_name') or '').strip()
+            position = result.get('position')
+            if rider_name in rider_ids and position:
+                rows.append({'rider_id': rider_ids[rider_name], 'position': position})
 
-        return added_count
+        # Insert the whole result sheet in one transaction
+        return len(add_race_results_bulk(self.db, race_id, rows))
 
     def _validate_race_data(self, race_data: Dict) -> bool:
         """
@@ -296,12 +464,9 @@ class DailyUpdater:
             stats = self.run_daily_update(current_date)
             all_stats.append(stats)
 
+            # The scraper's rate limiter keeps requests spaced across days
             current_date += timedelta(days=1)
 
-            # Sleep between days to be respectful
-            import time
-            time.sleep(5)
-
         # Summary
         total_races = sum(s.get('races_processed', 0) for s in all_stats)
         total_riders = sum(s.get('riders_added', 0) for s in all_stats)
@@ -317,6 +482,176 @@ class DailyUpdater:
 
         return all_stats
 
+    def run_backfill(self, start_date: date, end_date: Optional[date] = None, restart: bool = False) -> Dict:
+        """
+        Backfill a historical date range concurrently, resuming earlier runs.
+
+        Race lists for all dates and then race pages are fetched in
+        parallel under the scraper's shared rate limiter, while races are
+        stored and rated one at a time in chronological order. Races older
+        than the latest rated race are not rated as they are stored; one
+        recompute from the earliest of them runs at the end. Every race
+        page stored and every date whose races all succeeded is recorded in
+        the checkpoint table, so rerunning the same range skips finished
+        work. Dates whose race list came back empty are not checkpointed,
+        since an empty list cannot be told apart from a failed fetch.
+
+        Args:
+            start_date: First date to backfill
+            end_date: Last date to backfill (defaults to today)
+            restart: Forget completed dates in the range and walk them again
+                (races already stored are still skipped)
+
+        Returns:
+            Dictionary with update statistics and status
+        """
+        if end_date is None:
+            end_date = date.today()
+
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        date_keys = [day.isoformat() for day in dates]
+
+        self.stats = {
+            'races_processed': 0,
+            'races_failed': 0,
+            'riders_added': 0,
+            'results_added': 0,
+            'ratings_updated': 0,
+            'errors': [],
+            'dates_total': len(dates),
+            'dates_skipped': 0,
+            'dates_completed': 0
+        }
+
+        if restart:
+            clear_checkpoints(self.db, 'date', date_keys)
+
+        completed_dates = get_completed_checkpoints(self.db, 'date', date_keys)
+        pending_dates = [day for day in dates if day.isoformat() not in completed_dates]
+        self.stats['dates_skipped'] = len(dates) - len(pending_dates)
+
+        logger.info(
+            f"Backfilling {start_date} to {end_date}: {len(pending_dates)} dates to do, "
+            f"{self.stats['dates_skipped']} already completed"
+        )
+
+        try:
+            # Step 1: Fetch the race lists of all pending dates concurrently
+            with ThreadPoolExecutor(max_workers=settings.scraper_max_concurrency) as pool:
+                listings = list(pool.map(self._list_races, pending_dates))
+
+            # Step 2: Queue every race not stored yet, in chronological order
+            completed_races = get_completed_checkpoints(
+                self.db, 'race',
+                [race_info.get('url') for races in listings if races for race_info in races]
+            )
+            remaining = {}
+            failed_dates = set()
+            items = []
+
+            for day, races in zip(pending_dates, listings):
+                if races is None:
+                    continue
+
+                todo = []
+                for race_info in races:
+                    if race_info.get('url') in completed_races:
+                        self.stats['races_processed'] += 1
+                    elif not self._race_exists(race_info):
+                        todo.append(race_info)
+
+                remaining[day] = len(todo)
+                items.extend({**race_info, 'date': day} for race_info in todo)
+
+                if races and not todo:
+                    self._complete_date(day)
+
+            # Step 3: Fetch and parse in parallel, store and rate in order
+            def write(race_info: Dict, race_data: Optional[Dict], error: Optional[Exception]):
+                failures = self.stats['races_failed']
+                self._write_race(race_info, race_data, error)
+
+                day = race_info['date']
+                if self.stats['races_failed'] == failures:
+                    mark_checkpoint(self.db, 'race', race_info.get('url'))
+                else:
+                    failed_dates.add(day)
+
+                remaining[day] -= 1
+                if remaining[day] == 0 and day not in failed_dates:
+                    self._complete_date(day)
+
+            self.defer_late_races = True
+            try:
+                self.stats['pipeline'] = self._build_pipeline(write).run(items)
+            finally:
+                self.defer_late_races = False
+
+            # Step 4: One recompute for every race older than the ratings
+            self.stats['ratings_updated'] += self._rate_deferred_races()
+
+            # Step 5: Snapshot the backfilled months for as-of queries
+            refresh_rating_snapshots(self.db)
+            self.stats['success'] = True
+
+        except Exception as e:
+            logger.error(f"Backfill failed: {e}")
+            self.stats['success'] = False
+            self.stats['errors'].append({'system': str(e)})
+
+        logger.info("=" * 60)
+        logger.info("Backfill Summary:")
+        logger.info(f"  Dates completed: {self.stats['dates_completed']} (skipped {self.stats['dates_skipped']})")
+        logger.info(f"  Races processed: {self.stats['races_processed']}")
+        logger.info(f"  Races failed: {self.stats['races_failed']}")
+        logger.info(f"  New riders added: {self.stats['riders_added']}")
+        logger.info(f"  Results added: {self.stats['results_added']}")
+        logger.info("=" * 60)
+
+        return self.stats
+
+    def _rate_deferred_races(self) -> int:
+        """
+        Rate the late races a backfill stored, with a single recompute from the earliest.
+
+        Picks up races left over by earlier backfills that failed before
+        this step.
+
+        Returns:
+            Number of riders whose ratings changed
+        """
+        keys = get_checkpoint_keys(self.db, 'unrated', '')
+        if not keys:
+            return 0
+
+        race_ids = [int(key) for key in keys]
+        earliest = self.db.query(func.min(Race.date)).filter(Race.id.in_(race_ids)).scalar()
+        if earliest is None:
+            # None of the recorded races is stored any more, so there is nothing to rate
+            logger.warning(f"Dropping {len(keys)} deferred races that no longer exist")
+            clear_checkpoints(self.db, 'unrated', keys)
+            return 0
+
+        logger.info(f"Recomputing ratings from {earliest} for {len(race_ids)} backfilled races")
+
+        rating_result = self.rating_engine.recompute_from(earliest, race_ids=race_ids)
+        clear_checkpoints(self.db, 'unrated', keys)
+        return rating_result.get('riders_updated', 0)
+
+    def _list_races(self, day: date) -> Optional[List[Dict]]:
+        """Fetch the race list for a date, returning None if it failed."""
+        try:
+            return self.scraper.get_today_races(day)
+        except Exception as e:
+            logger.error(f"Failed to list races for {day}: {e}")
+            self.stats['errors'].append({'date': day.isoformat(), 'error': str(e)})
+            return None
+
+    def _complete_date(self, day: date):
+        """Checkpoint a date whose races have all been stored."""
+        mark_checkpoint(self.db, 'date', day.isoformat())
+        self.stats['dates_completed'] += 1
+
 
 def run_daily_update_cli():
     """Command-line interface for running daily updates."""
@@ -343,7 +678,8 @@ def run_daily_update_cli():
             start_date = datetime.strptime(args.start_date, '%Y-%m-%d').date()
             end_date = start_date + timedelta(days=args.days)
 
-            updater.run_historical_update(start_date, end_date)
+            stats = updater.run_backfill(start_date, end_date)
+            return 0 if stats.get('success') else 1
 
         else:
             if args.date:
@@ -0,0 +1,137 @@
+"""Incrementally maintained sums behind the rating mean, variance and correlation."""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import RiderRating, DimensionStat
+from src.models.dimension_stat import (
+    STAT_DIMENSIONS, STAT_PAIRS, STAT_KEYS, COUNT_KEY, sum_key, product_key
+)
+from config.settings import settings
+
+
+class DimensionStats:
+    """
+    Count, sums, and sums of squares and cross-products of rider ratings.
+
+    When ratings change, each touched rider's old ratings are subtracted
+    and the new ones added, so reading the statistics never touches
+    rider_ratings. All totals are integers, so they stay exact however
+    many updates are applied.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rebuild(self):
+        """Recompute every total from rider_ratings. Does not commit."""
+        columns = [getattr(RiderRating, dim) for dim in STAT_DIMENSIONS]
+        index = {dim: i for i, dim in enumerate(STAT_DIMENSIONS)}
+
+        count, *values = self.db.query(
+            func.count(RiderRating.id),
+            *[func.sum(column) for column in columns],
+            *[func.sum(columns[index[a]] * columns[index[b]]) for a, b in STAT_PAIRS]
+        ).one()
+
+        self.db.query(DimensionStat).delete(synchronize_session=False)
+        self.db.execute(insert(DimensionStat), [
+            # PostgreSQL returns NUMERIC sums as Decimal
+            {"name": name, "value": int(value or 0)} for name, value in zip(STAT_KEYS, [count] + values)
+        ])
+
+    def apply(self, old: Mapping[int, Mapping[str, int]], new: Mapping[int, Mapping[str, int]]):
+        """
+        Replace riders' old ratings with their new ones in the totals.
+
+        Does not commit. Falls back to rebuild() when the totals have never
+        been computed.
+
+        Args:
+            old: Rider ID -> dimension -> rating before the change; riders
+                missing here are counted as new
+            new: Rider ID -> dimension -> rating after the change
+        """
+        if self.db.get(DimensionStat, COUNT_KEY) is None:
+            self.rebuild()
+            return
+
+        deltas = defaultdict(int)
+        for rider_id, ratings in new.items():
+            before = old.get(rider_id)
+            if before == ratings:
+                continue
+            if before is None:
+                deltas[COUNT_KEY] += 1
+            else:
+                self._accumulate(deltas, before, -1)
+            self._accumulate(deltas, ratings, 1)
+
+        changes = [{"key": name, "delta": delta} for name, delta in deltas.items() if delta]
+        if changes:
+            table = DimensionStat.__table__
+            self.db.execute(
+                update(table)
+                .where(table.c.name == bindparam("key"))
+                .values(value=table.c.value + bindparam("delta")),
+                changes
+            )
+
+    @staticmethod
+    def _accumulate(deltas: Dict[str, int], ratings: Mapping[str, int], sign: int):
+        """Add (sign=1) or remove (sign=-1) one rider's ratings."""
+        for a, b in STAT_PAIRS:
+            if a in ratings and b in ratings:
+                deltas[product_key(a, b)] += sign * ratings[a] * ratings[b]
+        for dim in STAT_DIMENSIONS:
+            if dim in ratings:
+                deltas[sum_key(dim)] += sign * ratings[dim]
+
+    def totals(self) -> Dict[str, int]:
+        """All stored totals by name (a few dozen rows)."""
+        return dict(self.db.query(DimensionStat.name, DimensionStat.value))
+
+    def moments(self, dimensions: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Mean, standard deviation and pairwise correlation of rating dimensions.
+
+        Derived from the stored totals with exact integer arithmetic, so the
+        cost does not depend on the number of riders.
+
+        Args:
+            dimensions: Dimensions to include (defaults to settings.dimensions)
+
+        Returns:
+            Dictionary with count, mean, sd (sample) and correlation
+            (dimension -> dimension -> r), or None when no rider is rated
+        """
+        dimensions = dimensions or settings.dimensions
+        totals = self.totals()
+        count = totals.get(COUNT_KEY)
+        if not count:
+            return None
+
+        def scatter(a: str, b: str) -> int:
+            """count * sum((a - mean_a) * (b - mean_b))"""
+            return count * totals[product_key(a, b)] - totals[sum_key(a)] * totals[sum_key(b)]
+
+        def correlate(a: str, b: str) -> float:
+            spread = scatter(a, a) * scatter(b, b)
+            return scatter(a, b) / math.sqrt(spread) if spread else float('nan')
+
+        return {
+            'count': count,
+            'mean': {dim: totals[sum_key(dim)] / count for dim in dimensions},
+            'sd': {
+                dim: math.sqrt(scatter(dim, dim) / (count * (count - 1))) if count > 1 else 0.0
+                for dim in dimensions
+            },
+            'correlation': {a: {b: correlate(a, b) for b in dimensions} for a in dimensions}
+        }
@@ -0,0 +1,152 @@
+"""
+Persistent on-disk cache for scraped HTTP responses.
+
+Raw response bytes are stored in a small SQLite database together with
+their ETag and Last-Modified headers, so a cron run or a historical
+backfill can reuse pages fetched by previous runs and revalidate stale
+ones with conditional GETs instead of downloading them again.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config.settings import settings
+
+# (URL pattern, time-to-live in seconds); the first matching rule wins
+DEFAULT_TTL_RULES = [
+    (r'/races\.php', 3600),          # Calendar pages change during race days
+    (r'/search\.php', 7 * 86400),    # Search results rarely change
+    (r'/race/', 6 * 3600),           # Race pages until they are marked final
+]
+DEFAULT_TTL = 86400
+
+
+class CachedResponse(NamedTuple):
+    """A cached response body and its validators."""
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    final: bool
+
+
+class HttpCache:
+    """
+    SQLite-backed cache of raw HTTP responses with per-URL-class TTLs.
+
+    Entries past their TTL are not discarded: their ETag/Last-Modified are
+    sent as If-None-Match/If-Modified-Since so an unchanged page costs a
+    304 instead of a full download. Entries marked final (e.g. results of
+    a race that finished days ago) never expire.
+    """
+
+    def __init__(self, path: str, ttl_rules: Optional[List[Tuple[str, int]]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file to store responses in (created if missing)
+            ttl_rules: (URL regex, TTL seconds) pairs, first match wins
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                final INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls) -> Optional["HttpCache"]:
+        """Create the cache configured in settings, or None when disabled."""
+        if not settings.http_cache_path:
+            return None
+        return cls(settings.http_cache_path)
+
+    def ttl_for(self, url: str) -> int:
+        """TTL in seconds for a URL according to the configured rules."""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return DEFAULT_TTL
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, fresh or stale."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, etag, last_modified, fetched_at, final FROM http_cache WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return CachedResponse(row[0], row[1], row[2], row[3], bool(row[4]))
+
+    def is_fresh(self, url: str, entry: CachedResponse) -> bool:
+        """Whether an entry can be used without revalidating."""
+        return entry.final or time.time() - entry.fetched_at < self.ttl_for(url)
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        """Request headers to revalidate a stale entry."""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, content: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store (or replace) a response."""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO http_cache (url, content, etag, last_modified, fetched_at, final)
+                VALUES (?, ?, ?, ?, ?, 0)
+                ON CONFLICT(url) DO UPDATE SET
+                    content = excluded.content,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at
+                """,
+                (url, content, etag, last_modified, time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Mark a stale entry fresh again after a 304 Not Modified."""
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def mark_final(self, url: str):
+        """Keep an entry forever, e.g. once a race's results are complete."""
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET final = 1 WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()
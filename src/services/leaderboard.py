@@ -0,0 +1,183 @@
+"""Incrementally maintained leaderboard of riders per rating dimension."""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import Rider, RiderRating, LeaderboardEntry
+from src.services.dimension_stats import DimensionStats
+from config.settings import settings
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+LOAD_CHUNK_SIZE = 500
+
+LEADERBOARD_DIMENSIONS = ["overall"] + settings.dimensions
+
+
+class Leaderboard:
+    """
+    Ranked copy of rider_ratings, one row per rider and dimension.
+
+    Riders are ranked by rating descending, ties broken by rider ID. After
+    ratings change only the touched riders are rewritten, and only the
+    ranks between their lowest and highest old or new rating are
+    renumbered, since nobody outside that band changes position. The
+    dimension statistics are kept in step from the same old and new ratings.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def top(self, dimension: str = "overall", limit: int = 50) -> List[Tuple[int, Rider, RiderRating]]:
+        """
+        Read the top of a dimension's ranking.
+
+        Args:
+            dimension: Rating dimension or 'overall'
+            limit: Number of riders to return
+
+        Returns:
+            List of (rank, rider, rating row) in rank order
+        """
+        return (
+            self.db.query(LeaderboardEntry.rank, Rider, RiderRating)
+            .join(Rider, Rider.id == LeaderboardEntry.rider_id)
+            .join(RiderRating, RiderRating.rider_id == LeaderboardEntry.rider_id)
+            .filter(LeaderboardEntry.dimension == dimension, LeaderboardEntry.rank <= limit)
+            .order_by(LeaderboardEntry.rank)
+            .all()
+        )
+
+    def rank_of(self, rider_id: int, dimension: str = "overall") -> Optional[int]:
+        """Rank of a rider in a dimension, or None if the rider has no ratings."""
+        return self.db.query(LeaderboardEntry.rank).filter(
+            LeaderboardEntry.dimension == dimension,
+            LeaderboardEntry.rider_id == rider_id
+        ).scalar()
+
+    def rebuild(self) -> int:
+        """
+        Recompute every ranking, and the dimension statistics, from rider_ratings.
+
+        Does not commit. Returns the number of leaderboard rows written.
+        """
+        DimensionStats(self.db).rebuild()
+        self.db.query(LeaderboardEntry).delete(synchronize_session=False)
+
+        written = 0
+        for dimension in LEADERBOARD_DIMENSIONS:
+            column = getattr(RiderRating, dimension)
+            ranked = select(
+                literal(dimension),
+                func.row_number().over(order_by=(column.desc(), RiderRating.rider_id)),
+                RiderRating.rider_id,
+                column
+            ).where(column.isnot(None))
+            written += self.db.execute(
+                insert(LeaderboardEntry).from_select(["dimension", "rank", "rider_id", "rating"], ranked)
+            ).rowcount
+        return written
+
+    def update(self, rider_ids: Iterable[int]) -> int:
+        """
+        Bring the rankings up to date after the given riders' ratings changed.
+
+        Pending ORM changes are flushed first. Does not commit. The number of
+        statements depends on the number of dimensions, not of riders.
+
+        Args:
+            rider_ids: Riders whose rider_ratings rows were written
+
+        Returns:
+            Number of leaderboard rows written
+        """
+        rider_ids = list(set(rider_ids))
+        if not rider_ids:
+            return 0
+
+        self.db.flush()
+
+        current, old = {}, {}
+        new_vectors, old_vectors = {}, {}  # rider_id -> dimension -> rating, for DimensionStats
+        for start in range(0, len(rider_ids), LOAD_CHUNK_SIZE):
+            chunk = rider_ids[start:start + LOAD_CHUNK_SIZE]
+            for rider_id, *ratings in self.db.query(
+                RiderRating.rider_id, *[getattr(RiderRating, dim) for dim in LEADERBOARD_DIMENSIONS]
+            ).filter(RiderRating.rider_id.in_(chunk)):
+                vector = new_vectors[rider_id] = {}
+                for dimension, rating in zip(LEADERBOARD_DIMENSIONS, ratings):
+                    if rating is not None:
+                        current[dimension, rider_id] = rating
+                        vector[dimension] = rating
+            for entry_id, dimension, rider_id, rating in self.db.query(
+                LeaderboardEntry.id, LeaderboardEntry.dimension, LeaderboardEntry.rider_id, LeaderboardEntry.rating
+            ).filter(LeaderboardEntry.rider_id.in_(chunk)):
+                old[dimension, rider_id] = (entry_id, rating)
+                old_vectors.setdefault(rider_id, {})[dimension] = rating
+
+        DimensionStats(self.db).apply(old_vectors, new_vectors)
+
+        moved, added = [], []
+        bands = {}  # dimension -> (lowest or None, highest) rating whose ranks may change
+        for (dimension, rider_id), rating in current.items():
+            entry_id, old_rating = old.get((dimension, rider_id), (None, None))
+            if old_rating == rating:
+                continue
+            if entry_id is None:
+                added.append({"dimension": dimension, "rank": 0, "rider_id": rider_id, "rating": rating})
+                ratings = (rating,)
+            else:
+                moved.append({"id": entry_id, "rating": rating})
+                ratings = (rating, old_rating)
+
+            # An added row pushes everyone below it down, so the band then
+            # reaches the bottom of the ranking
+            low, high = bands.get(dimension, (min(ratings), max(ratings)))
+            if entry_id is None or low is None:
+                low = None
+            else:
+                low = min(low, *ratings)
+            bands[dimension] = (low, max(high, *ratings))
+
+        if moved:
+            self.db.execute(update(LeaderboardEntry), moved)
+        if added:
+            self.db.execute(insert(LeaderboardEntry), added)
+
+        renumbered = []
+        for dimension, (low, high) in bands.items():
+            renumbered.extend(self._renumber(dimension, low, high))
+        if renumbered:
+            self.db.execute(update(LeaderboardEntry), renumbered)
+
+        return len(moved) + len(added) + len(renumbered)
+
+    def _renumber(self, dimension: str, low: Optional[int], high: int) -> List[Dict[str, int]]:
+        """
+        New ranks for the entries rated between low and high.
+
+        Everyone rated above high kept their rating, so they still hold
+        ranks 1 to N and the band continues from N + 1.
+        """
+        above = self.db.query(func.count(LeaderboardEntry.id)).filter(
+            LeaderboardEntry.dimension == dimension,
+            LeaderboardEntry.rating > high
+        ).scalar()
+
+        band = self.db.query(LeaderboardEntry.id, LeaderboardEntry.rank).filter(
+            LeaderboardEntry.dimension == dimension,
+            LeaderboardEntry.rating <= high
+        )
+        if low is not None:
+            band = band.filter(LeaderboardEntry.rating >= low)
+        band = band.order_by(LeaderboardEntry.rating.desc(), LeaderboardEntry.rider_id)
+
+        return [
+            {"id": entry_id, "rank": rank}
+            for rank, (entry_id, old_rank) in enumerate(band, start=above + 1)
+            if rank != old_rank
+        ]
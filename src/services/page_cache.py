@@ -0,0 +1,88 @@
+"""Memory-bounded LRU cache of compressed page bytes."""
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class CompressedLRUCache:
+    """
+    LRU cache that keeps zlib-compressed raw bytes under a memory budget.
+
+    Storing compressed HTML instead of parsed BeautifulSoup trees keeps a
+    long historical run's cache small; callers re-parse on a hit.
+    """
+
+    def __init__(self, max_mb: float = 64.0, compression_level: int = 6):
+        """
+        Initialize the cache.
+
+        Args:
+            max_mb: Maximum total size of compressed entries in megabytes
+            compression_level: zlib compression level (1-9)
+        """
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.compression_level = compression_level
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the decompressed bytes for a key, or None on a miss."""
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return zlib.decompress(compressed)
+
+    def put(self, key: str, content: bytes):
+        """Store bytes for a key, evicting least recently used entries as needed."""
+        compressed = zlib.compress(content, self.compression_level)
+        if len(compressed) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[key] = compressed
+            self._size += len(compressed)
+
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the compressed entries."""
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counters plus current usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes
+            }
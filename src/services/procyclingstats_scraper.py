@@ -8,14 +8,18 @@ This module provides automated data collection from procyclingstats.com includin
 - Automatic race type inference
 """
 
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional, Tuple
+from lxml import etree, html as lxml_html
+from typing import List, Dict, Iterable, Optional, Tuple
 from datetime import datetime, timedelta, date
 import time
 import re
 import logging
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 import sys
 import os
 
@@ -23,6 +27,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from config.settings import settings
 from src.utils.race_templates import RaceTemplates
+from src.services.http_cache import HttpCache
+from src.services.page_cache import CompressedLRUCache
+from src.services.rate_limiter import TokenBucket
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,33 +41,65 @@ class ProCyclingStatsScraper:
     Production-ready scraper for Pro Cycling Stats.
 
     Features:
-    - Rate limiting and respectful scraping
+    - Token-bucket rate limiting shared across concurrent fetches
     - Automatic race characteristic inference
     - Error handling and retry logic
-    - Caching to minimize requests
+    - Caching to minimize requests, optionally persisted across runs
     """
 
-    def __init__(self, rate_limit_delay: float = 2.0):
+    # Race pages this many days old are treated as final in the HTTP cache
+    FINAL_RACE_AGE_DAYS = 2
+
+    # Trailing race URL segments that select a view of the same race
+    RACE_URL_VIEW_SUFFIXES = ('result', 'results', 'overview', 'info')
+
+    def __init__(
+        self,
+        rate_limit_delay: float = 2.0,
+        http_cache: Optional[HttpCache] = None,
+        cache_max_mb: Optional[float] = None,
+        burst: int = 1,
+        max_concurrency: Optional[int] = None,
+        fast_parse: Optional[bool] = None
+    ):
         """
         Initialize the scraper.
 
         Args:
-            rate_limit_delay: Seconds to wait between requests
+            rate_limit_delay: Average seconds between requests
+            http_cache: Persistent on-disk response cache (in-memory only if None)
+            cache_max_mb: Memory budget of the in-process page cache
+                (defaults to settings.scraper_cache_max_mb)
+            burst: Number of requests that may be sent back to back
+            max_concurrency: Requests kept in flight by the concurrent fetch
+                methods (defaults to settings.scraper_max_concurrency)
+            fast_parse: Parse race pages with lxml/XPath instead of
+                BeautifulSoup (defaults to settings.scraper_fast_parse)
         """
         self.base_url = "https://www.procyclingstats.com"
         self.rate_limit_delay = rate_limit_delay
         self.last_request_time = 0
+        self.rate_limiter = TokenBucket(
+            1.0 / rate_limit_delay if rate_limit_delay > 0 else 0,
+            burst=burst
+        )
+        self.max_concurrency = max_concurrency or settings.scraper_max_concurrency
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(10, self.max_concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self._cache = {}
+        self._cache = CompressedLRUCache(
+            settings.scraper_cache_max_mb if cache_max_mb is None else cache_max_mb
+        )
+        self.http_cache = http_cache
+        self.fast_parse = settings.scraper_fast_parse if fast_parse is None else fast_parse
 
     def _rate_limit(self):
         """Enforce rate limiting between requests."""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
+        self.rate_limiter.acquire()
         self.last_request_time = time.time()
 
     def _fetch_page(self, url: str, use_cache: bool = True) -> Optional[BeautifulSoup]:
@@ -74,25 +113,159 @@ class ProCyclingStatsScraper:
         Returns:
             BeautifulSoup object or None on error
         """
-        if use_cache and url in self._cache:
+        content = self._fetch_bytes(url, use_cache)
+        if content is None:
+            return None
+
+        return BeautifulSoup(content, 'html.parser')
+
+    def _fetch_bytes(self, url: str, use_cache: bool = True) -> Optional[bytes]:
+        """
+        Fetch a webpage's raw bytes through the in-memory page cache.
+
+        Args:
+            url: URL to fetch
+            use_cache: Whether to use cached version if available
+
+        Returns:
+            Response body or None on error
+        """
+        content = self._cache.get(url) if use_cache else None
+        if content is not None:
             logger.debug(f"Using cached version of {url}")
-            return self._cache[url]
+            return content
+
+        content = self._fetch_content(url, use_cache)
+        if content is not None:
+            self._cache.put(url, content)
+        return content
+
+    def _fetch_content(self, url: str, use_cache: bool = True) -> Optional[bytes]:
+        """
+        Fetch raw page bytes, going through the persistent HTTP cache if configured.
+
+        Fresh cache entries are returned without a request; stale ones are
+        revalidated with a conditional GET.
+
+        Args:
+            url: URL to fetch
+            use_cache: Whether a fresh cache entry may be used without revalidating
+
+        Returns:
+            Response body or None on error
+        """
+        entry = self.http_cache.get(url) if self.http_cache else None
+        if use_cache and entry is not None and self.http_cache.is_fresh(url, entry):
+            logger.debug(f"Using disk-cached version of {url}")
+            return entry.content
 
         self._rate_limit()
 
         try:
             logger.info(f"Fetching: {url}")
-            response = self.session.get(url, timeout=15)
+            headers = self.http_cache.conditional_headers(entry) if self.http_cache else {}
+            response = self.session.get(url, timeout=15, headers=headers)
+
+            if entry is not None and response.status_code == 304:
+                logger.debug(f"Not modified: {url}")
+                self.http_cache.touch(url)
+                return entry.content
+
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            self._cache[url] = soup
-            return soup
+            if self.http_cache:
+                self.http_cache.store(
+                    url,
+                    response.content,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+            return response.content
 
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
 
+    def _warm_cache(self, url: str) -> bool:
+        """Fetch a page into the in-memory cache without parsing it."""
+        if url in self._cache:
+            return True
+
+        content = self._fetch_content(url)
+        if content is None:
+            return False
+
+        self._cache.put(url, content)
+        return True
+
+    async def prefetch_async(self, urls: Iterable[str], max_concurrency: Optional[int] = None) -> int:
+        """
+        Fetch several pages concurrently into the in-memory cache.
+
+        Requests run in worker threads with up to ``max_concurrency`` in
+        flight; all of them draw from the scraper's shared rate limiter, so
+        the configured average rate holds however many are in flight.
+
+        Args:
+            urls: URLs to fetch
+            max_concurrency: Requests kept in flight (defaults to self.max_concurrency)
+
+        Returns:
+            Number of pages now available in the cache
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def fetch(url: str) -> bool:
+            async with semaphore:
+                return await asyncio.to_thread(self._warm_cache, url)
+
+        fetched = await asyncio.gather(*(fetch(url) for url in dict.fromkeys(urls)))
+        return sum(fetched)
+
+    def prefetch(self, urls: Iterable[str], max_concurrency: Optional[int] = None) -> int:
+        """
+        Synchronous wrapper around :meth:`prefetch_async`.
+
+        Later ``_fetch_page``/``fetch_race_details`` calls for these URLs are
+        served from the cache. When the caller already runs an event loop
+        (Streamlit, notebooks), the fetches get their own loop in a worker
+        thread and this call blocks until they finish.
+
+        Args:
+            urls: URLs to fetch
+            max_concurrency: Requests kept in flight (defaults to self.max_concurrency)
+
+        Returns:
+            Number of pages now available in the cache
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.prefetch_async(urls, max_concurrency))
+
+        # asyncio.run refuses to start inside a running loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.prefetch_async(urls, max_concurrency)).result()
+
+    def fetch_race_details_many(
+        self,
+        race_urls: Iterable[str],
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch details for several races, downloading their pages concurrently.
+
+        Args:
+            race_urls: URLs of the race pages
+            max_concurrency: Requests kept in flight (defaults to self.max_concurrency)
+
+        Returns:
+            Dictionary mapping each URL to its race data (None on error)
+        """
+        race_urls = list(dict.fromkeys(race_urls))
+        self.prefetch(race_urls, max_concurrency)
+        return {url: self.fetch_race_details(url) for url in race_urls}
+
     def get_today_races(self, target_date: Optional[date] = None) -> List[Dict]:
         """
         Get all races for a specific date.
@@ -121,12 +294,39 @@ class ProCyclingStatsScraper:
             races.append({
                 'name': race_link.text.strip(),
                 'url': race_url,
+                'pcs_id': self.race_pcs_id_from_url(race_url),
                 'date': target_date
             })
 
         logger.info(f"Found {len(races)} races for {date_str}")
         return races
 
+    @classmethod
+    def race_pcs_id_from_url(cls, race_url: str) -> Optional[str]:
+        """
+        Derive a stable PCS race id from a race URL.
+
+        The id is the path below ``/race/`` with view suffixes removed, so
+        ``https://www.procyclingstats.com/race/tour-de-france/2024/stage-1/result``
+        and ``race/tour-de-france/2024/stage-1`` both give
+        ``tour-de-france/2024/stage-1``.
+
+        Args:
+            race_url: Absolute or relative race URL
+
+        Returns:
+            PCS race id, or None if the URL is not a race page
+        """
+        segments = [segment for segment in urlparse(race_url).path.split('/') if segment]
+        if 'race' not in segments:
+            return None
+
+        segments = segments[segments.index('race') + 1:]
+        while segments and segments[-1] in cls.RACE_URL_VIEW_SUFFIXES:
+            segments.pop()
+
+        return '/'.join(segments) or None
+
     def fetch_race_details(self, race_url: str) -> Optional[Dict]:
         """
         Fetch complete race details including results and profile.
@@ -137,32 +337,143 @@ class ProCyclingStatsScraper:
         Returns:
             Dictionary with race data or None on error
         """
-        soup = self._fetch_page(race_url)
-        if not soup:
+        content = self.fetch_race_page(race_url)
+        if content is None:
             return None
 
+        return self.parse_race_details(race_url, content)
+
+    def fetch_race_page(self, race_url: str) -> Optional[bytes]:
+        """
+        Download a race page without parsing it.
+
+        Args:
+            race_url: URL of the race page
+
+        Returns:
+            Raw page or None on error
+        """
+        return self._fetch_bytes(race_url)
+
+    def parse_race_details(self, race_url: str, content: bytes) -> Optional[Dict]:
+        """
+        Parse a downloaded race page into complete race details.
+
+        Args:
+            race_url: URL the page was fetched from
+            content: Raw race page
+
+        Returns:
+            Dictionary with race data or None on error
+        """
         try:
-            race_data = {
-                'name': self._extract_race_name(soup),
-                'date': self._extract_race_date(soup),
-                'category': self._extract_race_category(soup),
-                'country': self._extract_country(soup),
-                'distance_km': self._extract_distance(soup),
-                'elevation_m': self._extract_elevation(soup),
-                'profile_type': self._extract_profile_type(soup),
-                'results': self._extract_results(soup),
-                'url': race_url
-            }
+            if self.fast_parse:
+                race_data = self.parse_race_page_fast(content)
+            else:
+                race_data = self.parse_race_page(BeautifulSoup(content, 'html.parser'))
+            race_data['url'] = race_url
+            race_data['pcs_id'] = self.race_pcs_id_from_url(race_url)
 
             # Infer characteristics from race data
             race_data['characteristics'] = self._infer_characteristics(race_data)
 
+            # Results of races that finished a while ago will not change
+            if self.http_cache and race_data['results'] and race_data['date'] <= (
+                datetime.now() - timedelta(days=self.FINAL_RACE_AGE_DAYS)
+            ):
+                self.http_cache.mark_final(race_url)
+
             return race_data
 
         except Exception as e:
             logger.error(f"Error parsing race details from {race_url}: {e}")
             return None
 
+    def parse_race_page(self, soup: BeautifulSoup) -> Dict:
+        """
+        Extract race fields from a parsed race page.
+
+        Args:
+            soup: Parsed race page
+
+        Returns:
+            Dictionary with race data (without characteristics and url)
+        """
+        return {
+            'name': self._extract_race_name(soup),
+            'date': self._extract_race_date(soup),
+            'category': self._extract_race_category(soup),
+            'country': self._extract_country(soup),
+            'distance_km': self._extract_distance(soup),
+            'elevation_m': self._extract_elevation(soup),
+            'profile_type': self._extract_profile_type(soup),
+            'results': self._extract_results(soup)
+        }
+
+    def parse_race_page_fast(self, content: bytes) -> Dict:
+        """
+        Extract race fields from raw page bytes using lxml and XPath.
+
+        The document is parsed once by libxml2, its text is extracted once
+        for all of the text heuristics, and the results table is read with
+        XPath. Produces the same output as :meth:`parse_race_page`.
+
+        Args:
+            content: Raw race page
+
+        Returns:
+            Dictionary with race data (without characteristics and url)
+        """
+        doc = lxml_html.document_fromstring(content)
+        # BeautifulSoup's get_text() skips script and style contents
+        etree.strip_elements(doc, 'script', 'style', etree.Comment, with_tail=False)
+        text = doc.text_content()
+
+        h1 = doc.find('.//h1')
+        if h1 is not None:
+            name = h1.text_content().strip()
+        else:
+            title = doc.find('.//title')
+            name = title.text_content().split('»')[0].strip() if title is not None else "Unknown Race"
+
+        country = None
+        flags = doc.xpath(
+            "//span[contains(concat(' ', normalize-space(@class), ' '), ' flag ')]"
+        )
+        if flags:
+            classes = flags[0].get('class', '').split()
+            country = classes[1] if len(classes) > 1 else None
+
+        tables = doc.xpath(
+            "//table[re:test(@class, 'result|classification')]",
+            namespaces={'re': 'http://exslt.org/regular-expressions'}
+        ) or doc.xpath('//table')
+
+        results = []
+        if tables:
+            rows = []
+            for row in tables[0].iterdescendants('tr'):
+                cells = list(row.iterdescendants('td'))
+                link = cells[1].find('.//a') if len(cells) > 1 else None
+                rows.append((
+                    [cell.text_content() for cell in cells],
+                    (link.text_content(), link.get('href', '')) if link is not None else None
+                ))
+            results = self._results_from_rows(rows[1:])  # Skip header
+        else:
+            logger.warning("No results table found")
+
+        return {
+            'name': name,
+            'date': self._race_date_from_text(text),
+            'category': self._race_category_from_text(text),
+            'country': country,
+            'distance_km': self._distance_from_text(text),
+            'elevation_m': self._elevation_from_text(text),
+            'profile_type': self._profile_type_from_text(text),
+            'results': results
+        }
+
     def _extract_race_name(self, soup: BeautifulSoup) -> str:
         """Extract race name from the page."""
         # Try h1 tag first
@@ -181,13 +492,17 @@ class ProCyclingStatsScraper:
 
     def _extract_race_date(self, soup: BeautifulSoup) -> Optional[datetime]:
         """Extract race date from the page."""
+        return self._race_date_from_text(soup.get_text())
+
+    @staticmethod
+    def _race_date_from_text(text: str) -> Optional[datetime]:
+        """Find the race date in the page text."""
         # Look for date in various formats
         date_patterns = [
             r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]+)\s+(\d{4})',
             r'(\d{4})-(\d{2})-(\d{2})'
         ]
 
-        text = soup.get_text()
         for pattern in date_patterns:
             match = re.search(pattern, text)
             if match:
@@ -204,7 +519,12 @@ class ProCyclingStatsScraper:
 
     def _extract_race_category(self, soup: BeautifulSoup) -> str:
         """Extract race category/classification."""
-        text = soup.get_text().lower()
+        return self._race_category_from_text(soup.get_text())
+
+    @staticmethod
+    def _race_category_from_text(text: str) -> str:
+        """Infer the race category from the page text."""
+        text = text.lower()
 
         # Check for specific race types
         if 'tour de france' in text or 'giro d\'italia' in text or 'vuelta a españa' in text:
@@ -230,8 +550,13 @@ class ProCyclingStatsScraper:
 
     def _extract_distance(self, soup: BeautifulSoup) -> Optional[float]:
         """Extract race distance in km."""
+        return self._distance_from_text(soup.get_text())
+
+    @staticmethod
+    def _distance_from_text(text: str) -> Optional[float]:
+        """Find the race distance in the page text."""
         # Look for distance information
-        distance_match = re.search(r'(\d+(?:\.\d+)?)\s*km', soup.get_text(), re.IGNORECASE)
+        distance_match = re.search(r'(\d+(?:\.\d+)?)\s*km', text, re.IGNORECASE)
         if distance_match:
             try:
                 return float(distance_match.group(1))
@@ -241,13 +566,17 @@ class ProCyclingStatsScraper:
 
     def _extract_elevation(self, soup: BeautifulSoup) -> Optional[float]:
         """Extract elevation gain in meters."""
+        return self._elevation_from_text(soup.get_text())
+
+    @staticmethod
+    def _elevation_from_text(text: str) -> Optional[float]:
+        """Find the elevation gain in the page text."""
         # Look for elevation/altitude gain
         elev_patterns = [
             r'(\d+(?:,\d+)?)\s*m\s+(?:elevation|altitude|climbing)',
             r'(?:elevation|altitude|climbing).*?(\d+(?:,\d+)?)\s*m'
         ]
 
-        text = soup.get_text()
         for pattern in elev_patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
@@ -260,7 +589,12 @@ class ProCyclingStatsScraper:
 
     def _extract_profile_type(self, soup: BeautifulSoup) -> str:
         """Extract profile type (flat, hilly, mountain, etc.)."""
-        text = soup.get_text().lower()
+        return self._profile_type_from_text(soup.get_text())
+
+    @staticmethod
+    def _profile_type_from_text(text: str) -> str:
+        """Infer the profile type from the page text."""
+        text = text.lower()
 
         if 'mountain' in text or 'mountains' in text or 'uphill' in text:
             return 'mountain'
@@ -277,8 +611,6 @@ class ProCyclingStatsScraper:
 
     def _extract_results(self, soup: BeautifulSoup) -> List[Dict]:
         """Extract race results from the results table."""
-        results = []
-
         # Find results table
         results_table = soup.find('table', class_=re.compile(r'result|classification'))
         if not results_table:
@@ -289,14 +621,36 @@ class ProCyclingStatsScraper:
             logger.warning("No results table found")
             return []
 
-        rows = results_table.find_all('tr')
-        for row in rows[1:]:  # Skip header
+        rows = []
+        for row in results_table.find_all('tr'):
             cells = row.find_all('td')
+            link = cells[1].find('a') if len(cells) > 1 else None
+            rows.append((
+                [cell.text for cell in cells],
+                (link.text, link.get('href', '')) if link else None
+            ))
+
+        return self._results_from_rows(rows[1:])  # Skip header
+
+    @staticmethod
+    def _results_from_rows(rows: Iterable[Tuple[List[str], Optional[Tuple[str, str]]]]) -> List[Dict]:
+        """
+        Build result dictionaries from results table rows.
+
+        Args:
+            rows: Pairs of (cell texts, (text, href) of the rider link or None)
+
+        Returns:
+            List of result dictionaries
+        """
+        results = []
+
+        for cells, rider_link in rows:
             if len(cells) < 2:
                 continue
 
             try:
-                position_text = cells[0].text.strip()
+                position_text = cells[0].strip()
                 # Extract position number
                 position_match = re.search(r'(\d+)', position_text)
                 if not position_match:
@@ -304,20 +658,22 @@ class ProCyclingStatsScraper:
 
                 position = int(position_match.group(1))
 
-                # Extract rider name
-                rider_link = cells[1].find('a') if len(cells) > 1 else None
-                rider_name = rider_link.text.strip() if rider_link else cells[1].text.strip()
+                # Extract rider name and PCS id from the rider link
+                rider_name = rider_link[0].strip() if rider_link else cells[1].strip()
+                rider_href = rider_link[1] if rider_link else ''
+                pcs_id_match = re.search(r'(?:^|/)rider/([^/?#]+)', rider_href)
+                pcs_id = pcs_id_match.group(1) if pcs_id_match else None
 
                 # Extract team if available
-                team = cells[2].text.strip() if len(cells) > 2 else None
+                team = cells[2].strip() if len(cells) > 2 else None
 
                 # Extract time if available
-                time_cell = cells[3] if len(cells) > 3 else None
-                time_str = time_cell.text.strip() if time_cell else None
+                time_str = cells[3].strip() if len(cells) > 3 else None
 
                 result = {
                     'position': position,
                     'rider_name': rider_name,
+                    'pcs_id': pcs_id,
                     'team': team,
                     'time': time_str
                 }
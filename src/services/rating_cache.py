@@ -0,0 +1,84 @@
+"""Per-update cache of rider ratings loaded in bulk."""
+
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import RiderRating
+from config.settings import settings
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+LOAD_CHUNK_SIZE = 500
+
+
+class RatingCache:
+    """
+    Cache of RiderRating rows for the riders involved in an update.
+
+    All ratings for the requested riders are fetched with a single
+    IN (...) query and any missing rows are created together, so the
+    caller can work on a plain dict instead of querying per rider.
+    """
+
+    def __init__(self, db: Session, initial_rating: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            db: Database session
+            initial_rating: Rating given to newly created rows
+                (defaults to settings.initial_rating)
+        """
+        self.db = db
+        self.initial_rating = settings.initial_rating if initial_rating is None else initial_rating
+        self._ratings: Dict[int, RiderRating] = {}
+
+    def load(self, rider_ids: Iterable[int]) -> Dict[int, RiderRating]:
+        """
+        Load ratings for the given riders, creating missing rows.
+
+        Args:
+            rider_ids: IDs of the riders to load
+
+        Returns:
+            Dictionary mapping rider ID to RiderRating
+        """
+        missing_ids = list(dict.fromkeys(r for r in rider_ids if r not in self._ratings))
+
+        for start in range(0, len(missing_ids), LOAD_CHUNK_SIZE):
+            chunk = missing_ids[start:start + LOAD_CHUNK_SIZE]
+            for rating in self.db.query(RiderRating).filter(RiderRating.rider_id.in_(chunk)):
+                self._ratings[rating.rider_id] = rating
+
+        created = [
+            self._new_rating(rider_id)
+            for rider_id in missing_ids
+            if rider_id not in self._ratings
+        ]
+        if created:
+            self.db.add_all(created)
+            for rating in created:
+                self._ratings[rating.rider_id] = rating
+
+        return self._ratings
+
+    def _new_rating(self, rider_id: int) -> RiderRating:
+        """Build a RiderRating row at the initial rating."""
+        return RiderRating(
+            rider_id=rider_id,
+            flat=self.initial_rating,
+            cobbles=self.initial_rating,
+            mountain=self.initial_rating,
+            time_trial=self.initial_rating,
+            sprint=self.initial_rating,
+            gc=self.initial_rating,
+            one_day=self.initial_rating,
+            endurance=self.initial_rating,
+            overall=self.initial_rating,
+            races_count=0,
+            wins_count=0,
+            podiums_count=0
+        )
@@ -1,18 +1,44 @@
 """Rating calculation engine for updating rider ratings based on race results."""
 
 import math
-from datetime import datetime
-from typing import List, Dict, Tuple
-from sqlalchemy.orm import Session
+from datetime import datetime, date, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Tuple, Optional, Union
+import numpy as np
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session, joinedload
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.models import Rider, RiderRating, RatingHistory, Race, RaceResult, RaceCharacteristics
+from src.services.rating_cache import RatingCache
+from src.services.leaderboard import Leaderboard
+from src.utils.db_helpers import invalidate_rating_snapshots, bump_ratings_version, IN_CHUNK_SIZE
 from config.settings import settings
 
 
+# Weights used to combine the dimension ratings into the overall rating
+OVERALL_WEIGHTS = {
+    'flat': 0.15,
+    'cobbles': 0.10,
+    'mountain': 0.20,
+    'time_trial': 0.15,
+    'sprint': 0.10,
+    'gc': 0.15,
+    'one_day': 0.10,
+    'endurance': 0.05
+}
+
+MIN_RATING = 1000
+MAX_RATING = 2500
+
+# Rows per bulk write and per streamed fetch during a replay
+REPLAY_BATCH_SIZE = 10000
+
+
 class RatingEngine:
     """
     Engine for calculating and updating rider ratings.
@@ -20,10 +46,19 @@ class RatingEngine:
     Uses an ELO-like rating system adapted for multi-dimensional cycling performance.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, vectorized: Optional[bool] = None):
+        """
+        Initialize the rating engine.
+
+        Args:
+            db: Database session
+            vectorized: Use the NumPy batch path for race updates
+                (defaults to settings.vectorized_rating_updates)
+        """
         self.db = db
         self.k_factor = settings.k_factor
         self.initial_rating = settings.initial_rating
+        self.vectorized = settings.vectorized_rating_updates if vectorized is None else vectorized
 
     def calculate_expected_score(self, rating_a: int, rating_b: int) -> float:
         """
@@ -70,7 +105,11 @@ class RatingEngine:
         Returns:
             Importance multiplier
         """
-        category_name = race.category.value if race.category else "Others"
+        return self._category_importance(race.category)
+
+    def _category_importance(self, category) -> float:
+        """Importance multiplier for a RaceCategory (or None)."""
+        category_name = category.value if category else "Others"
         return settings.race_importance_multiplier.get(category_name, 1.0)
 
     def calculate_rating_change(
@@ -95,6 +134,71 @@ class RatingEngine:
         change = self.k_factor * importance_multiplier * (actual_score - expected_score)
         return int(round(change))
 
+    def calculate_performance_scores(self, positions: np.ndarray, total_riders: int) -> np.ndarray:
+        """
+        Vectorized version of calculate_performance_score.
+
+        Args:
+            positions: Array of finishing positions
+            total_riders: Total number of riders
+
+        Returns:
+            Array of performance scores (0.0 to 1.0)
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        return np.select(
+            [positions == 1, positions <= 3, positions <= 10, positions <= 20],
+            [
+                1.0,
+                0.9 - (positions - 1) * 0.15,
+                0.6 - (positions - 3) * 0.05,
+                0.3 - (positions - 10) * 0.02
+            ],
+            default=np.maximum(0.1, 0.1 - (positions - 20) * 0.005)
+        )
+
+    def calculate_field_update(
+        self,
+        field_ratings: np.ndarray,
+        weights: np.ndarray,
+        positions: np.ndarray,
+        importance: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute new ratings for a whole race field in a few array operations.
+
+        Every finisher is compared against the average pre-race rating of the
+        rest of the field, exactly as the scalar path does one rider at a time.
+
+        Args:
+            field_ratings: (N x D) integer array of pre-race dimension ratings,
+                columns in settings.dimensions order
+            weights: Length-D array of race characteristic weights
+            positions: Length-N array of finishing positions
+            importance: Race importance multiplier
+
+        Returns:
+            Tuple of (N x D) new dimension ratings and length-N overall ratings
+        """
+        field_ratings = np.asarray(field_ratings, dtype=np.int64)
+        weights = np.asarray(weights, dtype=float)
+        total_riders = field_ratings.shape[0]
+
+        # Average of everyone else: field total minus the rider's own rating
+        if total_riders > 1:
+            avg_competitors = (field_ratings.sum(axis=0) - field_ratings) / (total_riders - 1)
+        else:
+            avg_competitors = np.full(field_ratings.shape, float(self.initial_rating))
+
+        expected = 1 / (1 + np.power(10.0, (avg_competitors - field_ratings) / 400))
+        actual = self.calculate_performance_scores(positions, total_riders)
+
+        change = np.rint(self.k_factor * (importance * weights) * (actual[:, None] - expected))
+        updated = np.clip(field_ratings + change.astype(np.int64), MIN_RATING, MAX_RATING)
+        new_ratings = np.where(weights > 0, updated, field_ratings)
+
+        return new_ratings, self._calculate_overall_ratings(new_ratings)
+
     def update_ratings_for_race(self, race_id: int) -> Dict[str, any]:
         """
         Update all rider ratings based on a race result.
@@ -113,7 +217,9 @@ class RatingEngine:
         if not characteristics:
             raise ValueError(f"Race {race_id} has no characteristics defined")
 
-        results = self.db.query(RaceResult).filter(
+        results = self.db.query(RaceResult).options(
+            joinedload(RaceResult.rider, innerjoin=True)
+        ).filter(
             RaceResult.race_id == race_id,
             RaceResult.did_not_finish == 0,
             RaceResult.did_not_start == 0
@@ -128,49 +234,42 @@ class RatingEngine:
 
         updates = []
 
-        for result in results:
-            rider = result.rider
-            rating = self._get_or_create_rating(rider.id)
-
-            # Calculate average competitor rating for each dimension
-            avg_ratings = self._calculate_average_competitor_ratings(
-                results, result.rider_id, char_dict
+        # Load the whole field's ratings in one query
+        field = RatingCache(self.db, self.initial_rating).load(r.rider_id for r in results)
+
+        # Snapshot the field before any rider is updated so every finisher is
+        # compared against the same pre-race ratings
+        field_ratings = {rider_id: rating.to_dict() for rider_id, rating in field.items()}
+
+        if self.vectorized:
+            new_matrix, new_overall = self.calculate_field_update(
+                np.array(
+                    [[field_ratings[r.rider_id][dim] for dim in settings.dimensions] for r in results],
+                    dtype=np.int64
+                ),
+                np.array([char_dict[f"{dim}_weight"] for dim in settings.dimensions], dtype=float),
+                np.array([r.position for r in results], dtype=np.int64),
+                importance
             )
+        else:
+            field_sums = self._calculate_field_rating_sums(field_ratings, char_dict)
 
-            # Update each dimension based on race characteristics
-            old_ratings = rating.to_dict()
+        for index, result in enumerate(results):
+            rider = result.rider
+            rating = field[result.rider_id]
+            old_ratings = field_ratings[result.rider_id]
             new_ratings = {}
 
-            for dimension, weight in char_dict.items():
-                if weight > 0:
-                    dimension_name = dimension.replace('_weight', '')
-                    current_rating_value = getattr(rating, dimension_name)
-                    avg_competitor_rating = avg_ratings[dimension_name]
-
-                    # Calculate expected and actual scores
-                    expected = self.calculate_expected_score(
-                        current_rating_value,
-                        avg_competitor_rating
-                    )
-                    actual = self.calculate_performance_score(result.position, total_riders)
-
-                    # Calculate rating change (weighted by dimension importance)
-                    change = self.calculate_rating_change(
-                        current_rating_value,
-                        expected,
-                        actual,
-                        importance * weight
-                    )
-
-                    new_rating_value = max(1000, min(2500, current_rating_value + change))
+            if self.vectorized:
+                for column, dimension_name in enumerate(settings.dimensions):
+                    new_rating_value = int(new_matrix[index, column])
                     setattr(rating, dimension_name, new_rating_value)
                     new_ratings[dimension_name] = new_rating_value
-                else:
-                    dimension_name = dimension.replace('_weight', '')
-                    new_ratings[dimension_name] = getattr(rating, dimension_name)
-
-            # Update overall rating (weighted average)
-            rating.overall = self._calculate_overall_rating(rating)
+                rating.overall = int(new_overall[index])
+            else:
+                new_ratings = self._update_rider_scalar(
+                    rating, result, field_ratings, field_sums, char_dict, total_riders, importance
+                )
 
             # Update statistics
             rating.races_count += 1
@@ -186,7 +285,8 @@ class RatingEngine:
                 rider_id=rider.id,
                 race_id=race_id,
                 date=race.date,
-                ratings=new_ratings,
+                **new_ratings,
+                overall=rating.overall,
                 change_reason=f"Race result: {race.name} (P{result.position})"
             )
             self.db.add(history)
@@ -197,6 +297,9 @@ class RatingEngine:
                 "rating_change": rating.overall - old_ratings["overall"]
             })
 
+        invalidate_rating_snapshots(self.db, race.date)
+        Leaderboard(self.db).update(field.keys())
+        bump_ratings_version(self.db)
         self.db.commit()
 
         return {
@@ -229,50 +332,104 @@ class RatingEngine:
 
         return rating
 
-    def _calculate_average_competitor_ratings(
+    def _update_rider_scalar(
+        self,
+        rating: RiderRating,
+        result: RaceResult,
+        field_ratings: Dict[int, Dict[str, int]],
+        field_sums: Dict[str, int],
+        char_dict: Dict[str, float],
+        total_riders: int,
+        importance: float
+    ) -> Dict[str, int]:
+        """Update one rider's dimension ratings and return the new values."""
+        # Calculate average competitor rating for each dimension
+        avg_ratings = self._calculate_average_competitor_ratings(
+            field_sums, len(field_ratings), field_ratings[result.rider_id]
+        )
+
+        # Update each dimension based on race characteristics
+        new_ratings = {}
+
+        for dimension, weight in char_dict.items():
+            if weight > 0:
+                dimension_name = dimension.replace('_weight', '')
+                current_rating_value = getattr(rating, dimension_name)
+                avg_competitor_rating = avg_ratings[dimension_name]
+
+                # Calculate expected and actual scores
+                expected = self.calculate_expected_score(
+                    current_rating_value,
+                    avg_competitor_rating
+                )
+                actual = self.calculate_performance_score(result.position, total_riders)
+
+                # Calculate rating change (weighted by dimension importance)
+                change = self.calculate_rating_change(
+                    current_rating_value,
+                    expected,
+                    actual,
+                    importance * weight
+                )
+
+                new_rating_value = max(MIN_RATING, min(MAX_RATING, current_rating_value + change))
+                setattr(rating, dimension_name, new_rating_value)
+                new_ratings[dimension_name] = new_rating_value
+            else:
+                dimension_name = dimension.replace('_weight', '')
+                new_ratings[dimension_name] = getattr(rating, dimension_name)
+
+        # Update overall rating (weighted average)
+        rating.overall = self._calculate_overall_rating(rating)
+
+        return new_ratings
+
+    def _calculate_field_rating_sums(
         self,
-        results: List[RaceResult],
-        exclude_rider_id: int,
+        field_ratings: Dict[int, Dict[str, int]],
         characteristics: Dict[str, float]
-    ) -> Dict[str, float]:
-        """Calculate average competitor ratings for each dimension."""
-        avg_ratings = {}
+    ) -> Dict[str, int]:
+        """Sum the pre-race field ratings for each dimension, once per race."""
         dimensions = [d.replace('_weight', '') for d in characteristics.keys()]
 
-        for dimension in dimensions:
-            ratings_sum = 0
-            count = 0
-
-            for result in results:
-                if result.rider_id != exclude_rider_id:
-                    rider_rating = self._get_or_create_rating(result.rider_id)
-                    ratings_sum += getattr(rider_rating, dimension)
-                    count += 1
+        return {
+            dimension: sum(ratings[dimension] for ratings in field_ratings.values())
+            for dimension in dimensions
+        }
 
-            avg_ratings[dimension] = ratings_sum / count if count > 0 else self.initial_rating
+    def _calculate_average_competitor_ratings(
+        self,
+        field_sums: Dict[str, int],
+        field_size: int,
+        own_ratings: Dict[str, int]
+    ) -> Dict[str, float]:
+        """Calculate average competitor ratings by removing the rider from the field sums."""
+        count = field_size - 1
 
-        return avg_ratings
+        return {
+            dimension: (ratings_sum - own_ratings[dimension]) / count if count > 0 else self.initial_rating
+            for dimension, ratings_sum in field_sums.items()
+        }
 
     def _calculate_overall_rating(self, rating: RiderRating) -> int:
         """Calculate overall rating as weighted average of all dimensions."""
-        weights = {
-            'flat': 0.15,
-            'cobbles': 0.10,
-            'mountain': 0.20,
-            'time_trial': 0.15,
-            'sprint': 0.10,
-            'gc': 0.15,
-            'one_day': 0.10,
-            'endurance': 0.05
-        }
-
         weighted_sum = sum(
             getattr(rating, dim) * weight
-            for dim, weight in weights.items()
+            for dim, weight in OVERALL_WEIGHTS.items()
         )
 
         return int(round(weighted_sum))
 
+    def _calculate_overall_ratings(self, field_ratings: np.ndarray) -> np.ndarray:
+        """Vectorized _calculate_overall_rating over an (N x D) ratings array."""
+        # Accumulate column by column in the same order as the scalar sum so
+        # both paths round identically
+        weighted_sum = np.zeros(field_ratings.shape[0])
+        for dim, weight in OVERALL_WEIGHTS.items():
+            weighted_sum = weighted_sum + field_ratings[:, settings.dimensions.index(dim)] * weight
+
+        return np.rint(weighted_sum).astype(np.int64)
+
     def initialize_rider_ratings(self, rider_id: int) -> RiderRating:
         """
         Initialize ratings for a new rider.
@@ -284,5 +441,382 @@ class RatingEngine:
             Created RiderRating object
         """
         rating = self._get_or_create_rating(rider_id)
+        Leaderboard(self.db).update([rider_id])
+        bump_ratings_version(self.db)
         self.db.commit()
         return rating
+
+    def replay(self, start_date: Optional[Union[date, datetime]] = None) -> Dict[str, any]:
+        """
+        Recompute ratings by replaying race results in date order.
+
+        All rider ratings are held in memory in arrays indexed by rider ID,
+        each race is applied with calculate_field_update, and rider_ratings
+        and rating_history are written back in bulk. Use this after changing
+        the K-factor, importance multipliers or the performance curve.
+
+        Args:
+            start_date: Replay races from this date onward, starting from the
+                ratings recorded in rating history just before it. Replays the
+                whole history from initial ratings when None.
+
+        Returns:
+            Dictionary with replay statistics
+        """
+        start = self._as_datetime(start_date)
+
+        max_rider_id = self.db.query(func.max(Rider.id)).scalar() or 0
+        ratings = np.full((max_rider_id + 1, len(settings.dimensions)), self.initial_rating, dtype=np.int64)
+        counts = np.zeros((max_rider_id + 1, 3), dtype=np.int64)  # races, wins, podiums
+        touched = np.zeros(max_rider_id + 1, dtype=bool)
+
+        if start is not None:
+            self._restore_state_before(start, ratings, counts)
+
+        self._delete_race_history(start)
+        invalidate_rating_snapshots(self.db, start or datetime.min)
+        stats = self._replay_races(start, ratings, counts, touched)
+
+        if start is None:
+            rider_ids = [rider_id for (rider_id,) in self.db.query(Rider.id)]
+        else:
+            rider_ids = np.flatnonzero(touched).tolist()
+
+        self._write_ratings(rider_ids, ratings, counts)
+        if start is None:
+            Leaderboard(self.db).rebuild()
+        else:
+            Leaderboard(self.db).update(rider_ids)
+        bump_ratings_version(self.db)
+        self.db.commit()
+
+        stats["riders_updated"] = len(rider_ids)
+        return stats
+
+    def recompute_from(
+        self,
+        start_date: Union[date, datetime],
+        race_ids: Optional[List[int]] = None
+    ) -> Dict[str, any]:
+        """
+        Incrementally recompute ratings after a late or corrected result.
+
+        Riders start from their rating history just before start_date. The
+        changed races are recomputed, and a later race is only recomputed
+        when it shares a rider with something already recomputed; every
+        other race keeps its recorded history. Only riders reachable that
+        way have their ratings rewritten.
+
+        Args:
+            start_date: Date of the earliest changed race
+            race_ids: IDs of the changed races (defaults to all races on start_date)
+
+        Returns:
+            Dictionary with recompute statistics
+        """
+        start = self._as_datetime(start_date)
+
+        if race_ids is None:
+            race_ids = [
+                race_id for (race_id,) in self.db.query(Race.id).filter(
+                    Race.date >= start,
+                    Race.date < start + timedelta(days=1)
+                )
+            ]
+        seed_race_ids = set(race_ids)
+
+        max_rider_id = self.db.query(func.max(Rider.id)).scalar() or 0
+        ratings = np.full((max_rider_id + 1, len(settings.dimensions)), self.initial_rating, dtype=np.int64)
+        counts = np.zeros((max_rider_id + 1, 3), dtype=np.int64)
+        dirty = np.zeros(max_rider_id + 1, dtype=bool)
+
+        # Riders previously rated in a changed race are affected even if the
+        # corrected result no longer lists them
+        for (rider_id,) in self.db.query(RatingHistory.rider_id).filter(RatingHistory.race_id.in_(seed_race_ids)):
+            dirty[rider_id] = True
+
+        later_riders = self.db.query(RaceResult.rider_id).join(
+            Race, Race.id == RaceResult.race_id
+        ).filter(Race.date >= start)
+        self._restore_state_before(
+            start, ratings, counts,
+            rider_ids=later_riders.union(
+                self.db.query(RatingHistory.rider_id).filter(RatingHistory.race_id.in_(seed_race_ids))
+            )
+        )
+
+        stats = self._replay_races(start, ratings, counts, dirty, seed_race_ids=seed_race_ids)
+        invalidate_rating_snapshots(self.db, start)
+
+        rider_ids = np.flatnonzero(dirty).tolist()
+        self._write_ratings(rider_ids, ratings, counts)
+        Leaderboard(self.db).update(rider_ids)
+        bump_ratings_version(self.db)
+        self.db.commit()
+
+        stats["riders_updated"] = len(rider_ids)
+        return stats
+
+    def latest_rated_date(self) -> Optional[datetime]:
+        """Date of the most recent race that has been applied to ratings."""
+        return self.db.query(func.max(RatingHistory.date)).filter(
+            RatingHistory.race_id.isnot(None)
+        ).scalar()
+
+    def sync_from_history(self, rider_ids: List[int]) -> int:
+        """
+        Reset current ratings and counters of riders to their rating history.
+
+        Use this after rating history has been written from outside the
+        engine, for example by a bulk import from another database. Does not
+        commit, so it can join the transaction that wrote the history.
+
+        Args:
+            rider_ids: Riders whose rider_ratings rows are rewritten
+
+        Returns:
+            Number of riders updated
+        """
+        rider_ids = sorted(set(rider_ids))
+        if not rider_ids:
+            return 0
+
+        max_rider_id = rider_ids[-1]
+        ratings = np.full((max_rider_id + 1, len(settings.dimensions)), self.initial_rating, dtype=np.int64)
+        counts = np.zeros((max_rider_id + 1, 3), dtype=np.int64)
+
+        self._restore_state_before(datetime.max, ratings, counts, rider_ids)
+        self._write_ratings(rider_ids, ratings, counts)
+        Leaderboard(self.db).update(rider_ids)
+        bump_ratings_version(self.db)
+
+        return len(rider_ids)
+
+    def _as_datetime(self, value: Optional[Union[date, datetime]]) -> Optional[datetime]:
+        """Normalize a date to a datetime at midnight."""
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime(value.year, value.month, value.day)
+
+    def _restore_state_before(
+        self,
+        before: datetime,
+        ratings: np.ndarray,
+        counts: np.ndarray,
+        rider_ids: Optional[List[int]] = None
+    ):
+        """Load each rider's last recorded ratings and counters before a date into the arrays."""
+        latest = self.db.query(
+            RatingHistory.rider_id,
+            *[getattr(RatingHistory, dim) for dim in settings.dimensions],
+            func.row_number().over(
+                partition_by=RatingHistory.rider_id,
+                order_by=(RatingHistory.date.desc(), RatingHistory.id.desc())
+            ).label("recency")
+        ).filter(RatingHistory.date < before)
+        if rider_ids is not None:
+            latest = latest.filter(RatingHistory.rider_id.in_(rider_ids))
+        latest = latest.subquery()
+
+        snapshots = self.db.query(
+            latest.c.rider_id, *[latest.c[dim] for dim in settings.dimensions]
+        ).filter(latest.c.recency == 1)
+        for rider_id, *snapshot in snapshots:
+            ratings[rider_id] = [self.initial_rating if value is None else value for value in snapshot]
+
+        finished = self.db.query(
+            RatingHistory.rider_id,
+            func.count(RatingHistory.id),
+            func.sum(case((RaceResult.position == 1, 1), else_=0)),
+            func.sum(case((RaceResult.position <= 3, 1), else_=0))
+        ).join(
+            RaceResult,
+            (RaceResult.race_id == RatingHistory.race_id) & (RaceResult.rider_id == RatingHistory.rider_id)
+        ).filter(RatingHistory.date < before)
+        if rider_ids is not None:
+            finished = finished.filter(RatingHistory.rider_id.in_(rider_ids))
+
+        for rider_id, races, wins, podiums in finished.group_by(RatingHistory.rider_id):
+            counts[rider_id] = [races, wins or 0, podiums or 0]
+
+    def _delete_race_history(self, start: Optional[datetime], race_ids: Optional[List[int]] = None):
+        """Delete race-driven rating history from a date onward (or for given races)."""
+        query = self.db.query(RatingHistory).filter(RatingHistory.race_id.isnot(None))
+        if start is not None:
+            query = query.filter(RatingHistory.date >= start)
+        if race_ids is not None:
+            query = query.filter(RatingHistory.race_id.in_(race_ids))
+        query.delete(synchronize_session=False)
+
+    def _replay_races(
+        self,
+        start: Optional[datetime],
+        ratings: np.ndarray,
+        counts: np.ndarray,
+        touched: np.ndarray,
+        seed_race_ids: Optional[set] = None
+    ) -> Dict[str, int]:
+        """
+        Apply every race from start onward to the in-memory rating arrays.
+
+        With seed_race_ids, only the seed races and later races sharing a
+        rider with the touched set are recomputed; the remaining races advance
+        the arrays from their recorded history instead.
+        """
+        races = self.db.query(
+            Race.id, Race.name, Race.date, Race.category,
+            *[getattr(RaceCharacteristics, f"{dim}_weight") for dim in settings.dimensions]
+        ).join(RaceCharacteristics, RaceCharacteristics.race_id == Race.id)
+        if start is not None:
+            races = races.filter(Race.date >= start)
+
+        race_info = {
+            race_id: (name, race_date, self._category_importance(category),
+                      np.array([w or 0.0 for w in weights], dtype=float))
+            for race_id, name, race_date, category, *weights in races
+        }
+
+        recorded = {}
+        if seed_race_ids is not None:
+            recorded_rows = self.db.query(
+                RatingHistory.race_id, RatingHistory.rider_id,
+                *[getattr(RatingHistory, dim) for dim in settings.dimensions]
+            ).filter(RatingHistory.race_id.isnot(None))
+            if start is not None:
+                recorded_rows = recorded_rows.filter(RatingHistory.date >= start)
+            for race_id, rider_id, *snapshot in recorded_rows:
+                recorded.setdefault(race_id, {})[rider_id] = snapshot
+
+        results = self.db.query(
+            RaceResult.race_id, RaceResult.rider_id, RaceResult.position
+        ).join(Race, Race.id == RaceResult.race_id).filter(
+            RaceResult.did_not_finish == 0,
+            RaceResult.did_not_start == 0
+        )
+        if start is not None:
+            results = results.filter(Race.date >= start)
+        results = results.order_by(Race.date, Race.id, RaceResult.position)
+
+        stats = {"races_replayed": 0, "races_skipped": 0, "results_processed": 0, "history_rows": 0}
+        history = []
+
+        for race_id, rows in groupby(results.yield_per(REPLAY_BATCH_SIZE), key=itemgetter(0)):
+            if race_id not in race_info:
+                continue
+
+            rows = list(rows)
+
+            if seed_race_ids is not None:
+                rider_ids = [row[1] for row in rows]
+                if race_id not in seed_race_ids and not touched[rider_ids].any():
+                    self._advance_from_history(rows, recorded.get(race_id, {}), ratings, counts)
+                    stats["races_skipped"] += 1
+                    continue
+                self._delete_race_history(None, race_ids=[race_id])
+
+            self._apply_race_to_arrays(race_id, race_info[race_id], rows, ratings, counts, touched, history)
+
+            stats["races_replayed"] += 1
+            stats["results_processed"] += len(rows)
+
+            if len(history) >= REPLAY_BATCH_SIZE:
+                stats["history_rows"] += self._flush_history(history)
+
+        stats["history_rows"] += self._flush_history(history)
+        return stats
+
+    def _advance_from_history(
+        self,
+        rows: List[Tuple[int, int, int]],
+        recorded: Dict[int, List[Optional[int]]],
+        ratings: np.ndarray,
+        counts: np.ndarray
+    ):
+        """Advance the arrays through an unchanged race using its recorded history."""
+        for _, rider_id, position in rows:
+            snapshot = recorded.get(rider_id)
+            if snapshot is None:
+                continue
+            ratings[rider_id] = [
+                ratings[rider_id, col] if value is None else value for col, value in enumerate(snapshot)
+            ]
+            counts[rider_id] += [1, position == 1, position <= 3]
+
+    def _apply_race_to_arrays(
+        self,
+        race_id: int,
+        info: Tuple,
+        rows: List[Tuple[int, int, int]],
+        ratings: np.ndarray,
+        counts: np.ndarray,
+        touched: np.ndarray,
+        history: List[Dict]
+    ):
+        """Apply one race's results to the rating arrays and queue its history rows."""
+        name, race_date, importance, weights = info
+        rider_ids = np.array([row[1] for row in rows], dtype=np.int64)
+        positions = np.array([row[2] for row in rows], dtype=np.int64)
+
+        new_ratings, new_overall = self.calculate_field_update(ratings[rider_ids], weights, positions, importance)
+
+        ratings[rider_ids] = new_ratings
+        np.add.at(counts, (rider_ids, 0), 1)
+        np.add.at(counts, (rider_ids, 1), positions == 1)
+        np.add.at(counts, (rider_ids, 2), positions <= 3)
+        touched[rider_ids] = True
+
+        for rider_id, position, values, overall in zip(
+            rider_ids.tolist(), positions.tolist(), new_ratings.tolist(), new_overall.tolist()
+        ):
+            history.append({
+                "rider_id": rider_id,
+                "race_id": race_id,
+                "date": race_date,
+                **dict(zip(settings.dimensions, values)),
+                "overall": int(overall),
+                "change_reason": f"Race result: {name} (P{position})"
+            })
+
+    def _flush_history(self, history: List[Dict]) -> int:
+        """Bulk insert queued rating history rows and clear the queue."""
+        count = len(history)
+        if history:
+            self.db.bulk_insert_mappings(RatingHistory, history)
+            history.clear()
+        return count
+
+    def _write_ratings(self, rider_ids: List[int], ratings: np.ndarray, counts: np.ndarray):
+        """Write in-memory ratings for the given riders back to rider_ratings in bulk."""
+        if not rider_ids:
+            return
+
+        # Only the written riders' row IDs, so a bounded recompute stays bounded
+        existing = {}
+        for start in range(0, len(rider_ids), IN_CHUNK_SIZE):
+            existing.update(self.db.query(RiderRating.rider_id, RiderRating.id).filter(
+                RiderRating.rider_id.in_(rider_ids[start:start + IN_CHUNK_SIZE])
+            ))
+        overall = self._calculate_overall_ratings(ratings[rider_ids])
+        now = datetime.utcnow()
+
+        updates, inserts = [], []
+        for index, rider_id in enumerate(rider_ids):
+            mapping = dict(zip(settings.dimensions, ratings[rider_id].tolist()))
+            mapping.update(
+                rider_id=rider_id,
+                overall=int(overall[index]),
+                races_count=int(counts[rider_id, 0]),
+                wins_count=int(counts[rider_id, 1]),
+                podiums_count=int(counts[rider_id, 2]),
+                updated_at=now
+            )
+            if rider_id in existing:
+                mapping["id"] = existing[rider_id]
+                updates.append(mapping)
+            else:
+                inserts.append(mapping)
+
+        for start in range(0, len(updates), REPLAY_BATCH_SIZE):
+            self.db.bulk_update_mappings(RiderRating, updates[start:start + REPLAY_BATCH_SIZE])
+        for start in range(0, len(inserts), REPLAY_BATCH_SIZE):
+            self.db.bulk_insert_mappings(RiderRating, inserts[start:start + REPLAY_BATCH_SIZE])
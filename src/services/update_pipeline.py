@@ -0,0 +1,232 @@
+"""Staged fetch/parse/write pipeline with bounded queues."""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# How often blocked workers check whether the pipeline was stopped
+POLL_INTERVAL = 0.1
+
+
+class _StageStats:
+    """Thread-safe item count and busy time of one pipeline stage."""
+
+    def __init__(self):
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+
+    def as_dict(self, wall_seconds: float) -> Dict:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items / wall_seconds, 2) if wall_seconds > 0 else 0.0
+        }
+
+
+class _DepthStats:
+    """Thread-safe queue depth samples taken on every put."""
+
+    def __init__(self):
+        self.max_depth = 0
+        self._total = 0
+        self._samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, depth: int):
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self._total += depth
+            self._samples += 1
+
+    def as_dict(self) -> Dict:
+        return {
+            'max_depth': self.max_depth,
+            'mean_depth': round(self._total / self._samples, 2) if self._samples else 0.0
+        }
+
+
+class UpdatePipeline:
+    """
+    Run items through fetch, parse and write stages concurrently.
+
+    A pool of fetcher threads feeds a pool of parser threads through a
+    bounded queue, and the parsers feed the writer the same way, so a slow
+    stage applies backpressure instead of buffering everything in memory.
+    The writer runs on the calling thread and receives items strictly in
+    input order, which keeps database sessions single-threaded and lets
+    callers apply order-dependent updates such as ratings. Fetchers only
+    start an item while fewer than ``max_in_flight`` are unwritten, so the
+    results held back for reordering behind a slow item stay bounded too.
+
+    Exceptions raised by ``fetch`` or ``parse`` are not fatal: they are
+    handed to ``write`` in place of a result so the writer can record them.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any], Any],
+        parse: Callable[[Any, Any], Any],
+        write: Callable[[Any, Any, Optional[Exception]], None],
+        fetch_workers: int = 4,
+        parse_workers: int = 2,
+        queue_size: int = 8,
+        max_in_flight: Optional[int] = None
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            fetch: Called with an item, returns its payload
+            parse: Called with an item and its payload, returns the parsed result
+            write: Called with an item, its parsed result and the error raised
+                by an earlier stage (None on success)
+            fetch_workers: Number of fetcher threads
+            parse_workers: Number of parser threads
+            queue_size: Capacity of each inter-stage queue
+            max_in_flight: Items started but not yet written (defaults to
+                what the workers and both queues can hold)
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = max(1, parse_workers)
+        self.queue_size = max(1, queue_size)
+        if max_in_flight is None:
+            max_in_flight = self.fetch_workers + self.parse_workers + 2 * self.queue_size
+        self.max_in_flight = max(1, max_in_flight)
+
+    def run(self, items: List[Any]) -> Dict:
+        """
+        Push every item through the pipeline.
+
+        Args:
+            items: Items to process, written in this order
+
+        Returns:
+            Dictionary with per-stage throughput and queue depth statistics
+        """
+        items = list(items)
+        started = time.perf_counter()
+
+        stages = {'fetch': _StageStats(), 'parse': _StageStats(), 'write': _StageStats()}
+        depths = {'parse': _DepthStats(), 'write': _DepthStats(), 'reorder': _DepthStats()}
+
+        work = queue.Queue()
+        for index, item in enumerate(items):
+            work.put((index, item))
+
+        parse_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        # Released by the writer, so a slow item holds back at most this many others
+        in_flight = threading.Semaphore(self.max_in_flight)
+
+        fetchers_left = [self.fetch_workers]
+        fetchers_lock = threading.Lock()
+
+        def put(target: queue.Queue, entry, depth: _DepthStats):
+            """Blocking put that gives up once the pipeline is stopped."""
+            while not stop.is_set():
+                try:
+                    target.put(entry, timeout=POLL_INTERVAL)
+                except queue.Full:
+                    continue
+                depth.record(target.qsize())
+                return
+
+        def fetcher():
+            while not stop.is_set():
+                if not in_flight.acquire(timeout=POLL_INTERVAL):
+                    continue
+                # Items are taken in input order, so the one the writer waits for is always in flight
+                try:
+                    index, item = work.get_nowait()
+                except queue.Empty:
+                    in_flight.release()
+                    break
+
+                stage_started = time.perf_counter()
+                try:
+                    payload, error = self.fetch(item), None
+                except Exception as e:
+                    payload, error = None, e
+                stages['fetch'].record(time.perf_counter() - stage_started)
+
+                put(parse_queue, (index, item, payload, error), depths['parse'])
+
+            # The last fetcher to finish tells every parser to exit
+            with fetchers_lock:
+                fetchers_left[0] -= 1
+                done = fetchers_left[0] == 0
+            if done:
+                for _ in range(self.parse_workers):
+                    put(parse_queue, None, depths['parse'])
+
+        def parser():
+            while not stop.is_set():
+                try:
+                    entry = parse_queue.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if entry is None:
+                    break
+
+                index, item, payload, error = entry
+                stage_started = time.perf_counter()
+                result = None
+                if error is None:
+                    try:
+                        result = self.parse(item, payload)
+                    except Exception as e:
+                        error = e
+                stages['parse'].record(time.perf_counter() - stage_started)
+
+                put(write_queue, (index, item, result, error), depths['write'])
+
+        threads = [
+            threading.Thread(target=fetcher, name=f'pipeline-fetch-{i}', daemon=True)
+            for i in range(min(self.fetch_workers, max(1, len(items))))
+        ]
+        fetchers_left[0] = len(threads)
+        threads += [
+            threading.Thread(target=parser, name=f'pipeline-parse-{i}', daemon=True)
+            for i in range(self.parse_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Writer: results arrive out of order, buffer them until it is their turn
+        pending = {}
+        next_index = 0
+        try:
+            while next_index < len(items):
+                index, item, result, error = write_queue.get()
+                pending[index] = (item, result, error)
+                depths['reorder'].record(len(pending))
+
+                while next_index in pending:
+                    item, result, error = pending.pop(next_index)
+                    stage_started = time.perf_counter()
+                    self.write(item, result, error)
+                    stages['write'].record(time.perf_counter() - stage_started)
+                    next_index += 1
+                    in_flight.release()
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        wall_seconds = time.perf_counter() - started
+        return {
+            'wall_seconds': round(wall_seconds, 3),
+            'stages': {name: stage.as_dict(wall_seconds) for name, stage in stages.items()},
+            'queues': {name: depth.as_dict() for name, depth in depths.items()}
+        }
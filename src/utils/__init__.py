@@ -1,6 +1,9 @@
 """Utility functions for the Cycling Rating System."""
 
-from .db_helpers import add_rider, add_race, add_race_result, get_top_riders
+from .db_helpers import (
+    add_rider, add_race, upsert_race, add_race_result, add_race_results_bulk, resolve_riders_bulk, get_top_riders
+)
 from .race_templates import RaceTemplates
 
-__all__ = ["add_rider", "add_race", "add_race_result", "get_top_riders", "RaceTemplates"]
+__all__ = ["add_rider", "add_race", "upsert_race", "add_race_result", "add_race_results_bulk",
+           "resolve_riders_bulk", "get_top_riders", "RaceTemplates"]
@@ -0,0 +1,215 @@
+"""
+Aggregate queries for the Analytics page.
+
+Every function returns summary numbers computed by the database (counts,
+GROUP BY buckets, stored sums of squares and cross-products, ratings at
+given ranks), so the page receives a few kilobytes whatever the table sizes.
+"""
+
+import math
+from typing import Dict, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import Rider, RiderRating, Race, RaceResult, LeaderboardEntry
+from src.services.dimension_stats import DimensionStats
+from config.settings import settings
+
+# Quantiles drawn in the box plots
+BOX_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def get_overview(db: Session) -> Dict:
+    """
+    Row counts and the average overall rating, in one round trip.
+
+    Returns:
+        Dictionary with riders, races, results and avg_rating (None without ratings)
+    """
+    riders, races, results, avg_rating = db.execute(select(
+        select(func.count(Rider.id)).scalar_subquery(),
+        select(func.count(Race.id)).scalar_subquery(),
+        select(func.count(RaceResult.id)).scalar_subquery(),
+        select(func.avg(RiderRating.overall)).scalar_subquery()
+    )).one()
+
+    return {
+        'riders': riders,
+        'races': races,
+        'results': results,
+        'avg_rating': float(avg_rating) if avg_rating is not None else None
+    }
+
+
+def get_dimension_moments(db: Session, dimensions: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Mean, standard deviation and pairwise correlation of rating dimensions.
+
+    Read from the running totals RatingEngine keeps in dimension_stats.
+
+    Args:
+        db: Database session
+        dimensions: Dimensions to include (defaults to settings.dimensions)
+
+    Returns:
+        Dictionary with count, mean, sd (sample) and correlation
+        (dimension -> dimension -> r), or None when no rider is rated
+    """
+    return DimensionStats(db).moments(dimensions)
+
+
+def get_dimension_quartiles(db: Session, dimensions: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Box plot statistics of each rating dimension, read from the leaderboard.
+
+    The leaderboard holds every rider's rank per dimension, so a quantile
+    is one or two indexed (dimension, rank) lookups. Quantiles interpolate
+    linearly between ranks, like pandas.Series.quantile. The fences are the
+    most extreme ratings within 1.5 IQR of the quartiles.
+
+    Args:
+        db: Database session
+        dimensions: Dimensions to include (defaults to settings.dimensions)
+
+    Returns:
+        Dictionary of dimension -> {min, q1, median, q3, max, lowerfence, upperfence}
+    """
+    dimensions = dimensions or settings.dimensions
+
+    sizes = dict(
+        db.query(LeaderboardEntry.dimension, func.max(LeaderboardEntry.rank))
+        .filter(LeaderboardEntry.dimension.in_(dimensions))
+        .group_by(LeaderboardEntry.dimension)
+    )
+    if not sizes:
+        return {}
+
+    # Ascending position p of n ratings is rank n - p (rank 1 is the highest)
+    wanted = {}
+    for dim, size in sizes.items():
+        positions = [0, size - 1]
+        for quantile in BOX_QUANTILES:
+            position = quantile * (size - 1)
+            positions += [math.floor(position), math.ceil(position)]
+        wanted[dim] = {size - position for position in positions}
+
+    ratings = {}
+    for dim, rank, rating in db.query(
+        LeaderboardEntry.dimension, LeaderboardEntry.rank, LeaderboardEntry.rating
+    ).filter(
+        LeaderboardEntry.dimension.in_(list(wanted)),
+        LeaderboardEntry.rank.in_(set().union(*wanted.values()))
+    ):
+        ratings[dim, rank] = rating
+
+    stats = {}
+    for dim in dimensions:
+        size = sizes.get(dim)
+        if not size:
+            continue
+
+        def at(position: int) -> int:
+            return ratings[dim, size - position]
+
+        def quantile(q: float) -> float:
+            position = q * (size - 1)
+            low, high = math.floor(position), math.ceil(position)
+            return at(low) + (at(high) - at(low)) * (position - low)
+
+        q1, median, q3 = (quantile(q) for q in BOX_QUANTILES)
+        reach = 1.5 * (q3 - q1)
+
+        stats[dim] = {
+            'min': at(0),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'max': at(size - 1),
+            'lowerfence': _nearest_rating(db, dim, q1 - reach, lowest=True),
+            'upperfence': _nearest_rating(db, dim, q3 + reach, lowest=False)
+        }
+
+    return stats
+
+
+def _nearest_rating(db: Session, dimension: str, bound: float, lowest: bool) -> int:
+    """Lowest rating at or above a bound, or highest at or below it, via the (dimension, rating) index."""
+    if lowest:
+        nearest, condition = func.min(LeaderboardEntry.rating), LeaderboardEntry.rating >= bound
+    else:
+        nearest, condition = func.max(LeaderboardEntry.rating), LeaderboardEntry.rating <= bound
+
+    return db.query(nearest).filter(LeaderboardEntry.dimension == dimension, condition).scalar()
+
+
+def get_races_by_category(db: Session) -> Dict[str, int]:
+    """Number of races per category."""
+    return {
+        category.value if category else "Others": count
+        for category, count in db.query(Race.category, func.count(Race.id)).group_by(Race.category)
+    }
+
+
+def get_races_by_month(db: Session) -> List[Dict]:
+    """
+    Number of races per calendar month, in date order.
+
+    Returns:
+        List of {'month': 'YYYY-MM', 'count': n}
+    """
+    if db.bind.dialect.name == "postgresql":
+        month = func.to_char(Race.date, 'YYYY-MM')
+    else:
+        month = func.strftime('%Y-%m', Race.date)
+    month = month.label("month")
+
+    return [
+        {'month': value, 'count': count}
+        for value, count in db.query(month, func.count(Race.id)).group_by(month).order_by(month)
+    ]
+
+
+def get_most_active_riders(db: Session, limit: int = 10) -> List[Dict]:
+    """Riders with the most rated races."""
+    rows = (
+        db.query(Rider.name, RiderRating.races_count, RiderRating.wins_count, RiderRating.podiums_count)
+        .join(RiderRating, Rider.id == RiderRating.rider_id)
+        .order_by(RiderRating.races_count.desc())
+        .limit(limit)
+    )
+
+    return [
+        {'name': name, 'races': races, 'wins': wins, 'podiums': podiums}
+        for name, races, wins, podiums in rows
+    ]
+
+
+def get_best_win_rates(db: Session, min_races: int = 5, limit: int = 10) -> List[Dict]:
+    """
+    Riders with the highest share of wins among those with enough races.
+
+    Args:
+        db: Database session
+        min_races: Minimum number of rated races
+        limit: Number of riders to return
+
+    Returns:
+        List of {'name', 'win_rate' (percent), 'wins', 'races'}, best first
+    """
+    win_rate = (RiderRating.wins_count * 100.0 / RiderRating.races_count).label("win_rate")
+    rows = (
+        db.query(Rider.name, win_rate, RiderRating.wins_count, RiderRating.races_count)
+        .join(RiderRating, Rider.id == RiderRating.rider_id)
+        .filter(RiderRating.races_count >= max(min_races, 1))
+        .order_by(win_rate.desc(), RiderRating.wins_count.desc(), Rider.name)
+        .limit(limit)
+    )
+
+    return [
+        {'name': name, 'win_rate': float(rate), 'wins': wins, 'races': races}
+        for name, rate, wins, races in rows
+    ]
@@ -0,0 +1,159 @@
+"""
+Cached reads for the Streamlit pages.
+
+Every cached function takes the ratings version as its first argument, so
+results are served from memory across reruns and sessions until a write
+bumps the version. Call ratings_version() once per rerun and pass the value
+on. Results are plain dicts and lists, safe to reuse after the session that
+loaded them is closed.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import streamlit as st
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import SessionLocal, Rider, RiderRating, RatingHistory, RaceResult, Race
+from src.services.leaderboard import Leaderboard
+from src.utils.db_helpers import get_ratings_version, get_top_riders
+from src.utils import analytics
+
+# Entries kept per function; stale versions are evicted first
+CACHE_MAX_ENTRIES = 128
+
+
+def ratings_version() -> int:
+    """Read the current ratings version (one primary key lookup, never cached)."""
+    db = SessionLocal()
+    try:
+        return get_ratings_version(db)
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_top_riders(version: int, dimension: str, limit: int) -> List[Dict]:
+    """Cached get_top_riders."""
+    db = SessionLocal()
+    try:
+        return get_top_riders(db, dimension=dimension, limit=limit)
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_summary(version: int) -> Dict:
+    """Rider and race counts plus the top rated rider, for the sidebar."""
+    db = SessionLocal()
+    try:
+        top = Leaderboard(db).top("overall", limit=1)
+        return {
+            'riders': db.query(Rider).count(),
+            'races': db.query(Race).count(),
+            'top_rider': {'name': top[0][1].name, 'overall': top[0][2].overall} if top else None
+        }
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_rider_names(version: int) -> List[str]:
+    """All rider names in alphabetical order."""
+    db = SessionLocal()
+    try:
+        return [name for (name,) in db.query(Rider.name).order_by(Rider.name)]
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_rider_profile(version: int, name: str, results_limit: int = 20) -> Optional[Dict]:
+    """
+    Everything the Rider Profile page shows for one rider.
+
+    Returns:
+        Dictionary with the rider's details, ratings (None if unrated),
+        overall rating history and most recent results, or None if no
+        rider has that name
+    """
+    db = SessionLocal()
+    try:
+        rider = db.query(Rider).filter(Rider.name == name).first()
+        if rider is None:
+            return None
+
+        rating = db.query(RiderRating).filter(RiderRating.rider_id == rider.id).first()
+
+        # Read only the columns the chart needs, served by the (rider_id, date) index
+        history = db.query(RatingHistory.date, RatingHistory.overall).filter(
+            RatingHistory.rider_id == rider.id,
+            RatingHistory.overall.isnot(None)
+        ).order_by(RatingHistory.date).all()
+
+        results = db.query(RaceResult, Race).join(
+            Race, RaceResult.race_id == Race.id
+        ).filter(
+            RaceResult.rider_id == rider.id
+        ).order_by(Race.date.desc()).limit(results_limit).all()
+
+        return {
+            'name': rider.name,
+            'team': rider.team,
+            'country': rider.country,
+            'ratings': {
+                **rating.to_dict(),
+                'races': rating.races_count,
+                'wins': rating.wins_count,
+                'podiums': rating.podiums_count
+            } if rating else None,
+            'history': [(date, overall) for date, overall in history],
+            'results': [
+                {
+                    'date': race.date,
+                    'race': race.name,
+                    'category': race.category.value,
+                    'position': result.position,
+                    'points': result.points
+                }
+                for result, race in results
+            ]
+        }
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_analytics(version: int) -> Dict:
+    """The aggregates the Analytics page draws, all computed in SQL."""
+    db = SessionLocal()
+    try:
+        return {
+            'overview': analytics.get_overview(db),
+            'moments': analytics.get_dimension_moments(db),
+            'quartiles': analytics.get_dimension_quartiles(db),
+            'races_by_category': analytics.get_races_by_category(db),
+            'races_by_month': analytics.get_races_by_month(db),
+            'most_active': analytics.get_most_active_riders(db, limit=10),
+            'best_win_rates': analytics.get_best_win_rates(db, min_races=5, limit=10)
+        }
+    finally:
+        db.close()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_specialists(version: int, dimensions: Tuple[str, ...]) -> Dict[str, Dict]:
+    """The top rated rider of each dimension, as {dimension: {'name', 'rating'}}."""
+    db = SessionLocal()
+    try:
+        leaderboard = Leaderboard(db)
+        specialists = {}
+        for dim in dimensions:
+            top = leaderboard.top(dim, limit=1)
+            if top:
+                _, rider, rating = top[0]
+                specialists[dim] = {'name': rider.name, 'rating': getattr(rating, dim)}
+        return specialists
+    finally:
+        db.close()
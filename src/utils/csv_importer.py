@@ -1,22 +1,60 @@
 """CSV import utilities for bulk data loading."""
 
 import csv
+import hashlib
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.utils.db_helpers import add_rider, add_race, add_race_result
+from src.models import Race, RaceCharacteristics, RaceResult, UpdateCheckpoint
+from src.models.naming import make_name_key
+from src.utils.db_helpers import (
+    add_race_results_bulk, resolve_riders_bulk, get_rider_ids_by_name_keys,
+    get_race_ids_by_name_keys, get_race_ids_by_pcs_ids, parse_race_category,
+    get_checkpoint_keys, clear_checkpoints, bump_ratings_version
+)
 from src.utils.race_templates import RaceTemplates
 from src.services.rating_engine import RatingEngine
 
+# CSV column -> RaceCharacteristics field for custom race characteristics
+CHARACTERISTIC_COLUMNS = {
+    'flat': 'flat_weight',
+    'cobbles': 'cobbles_weight',
+    'mountain': 'mountain_weight',
+    'tt': 'time_trial_weight',
+    'sprint': 'sprint_weight',
+    'gc': 'gc_weight',
+    'oneday': 'one_day_weight',
+    'endurance': 'endurance_weight'
+}
+
+# Streaming imports read and commit this many rows at a time
+STREAM_CHUNK_SIZE = 50000
+
+# Checkpoint kind recording the committed chunks of a streamed file
+IMPORT_CHECKPOINT_KIND = 'import'
+
+# Streamed imports keep only the first error messages, but count them all
+MAX_ERROR_DETAILS = 1000
+
+# Bytes read from each end of a file to recognise it again when resuming
+FINGERPRINT_BYTES = 1024 * 1024
+
 
 class CSVImporter:
-    """Import data from CSV files."""
+    """
+    Import data from CSV files.
+
+    Each file is validated column by column with pandas, names are resolved
+    for the whole file with batched lookups, and every table is written
+    with one bulk INSERT in a single transaction.
+    """
 
     def __init__(self, db: Session):
         self.db = db
@@ -31,46 +69,20 @@ class CSVImporter:
         Tadej Pogačar,UAE Team Emirates,Slovenia,tadej-pogacar
         ...
 
+        Riders that already exist are matched and count as imported.
+
         Args:
             filepath: Path to CSV file
 
         Returns:
             Dictionary with import statistics
         """
-        success_count = 0
-        error_count = 0
-        errors = []
-
         try:
             df = pd.read_csv(filepath)
-
-            for _, row in df.iterrows():
-                try:
-                    rider = add_rider(
-                        self.db,
-                        name=row['name'],
-                        team=row.get('team'),
-                        country=row.get('country'),
-                        pcs_id=row.get('pcs_id')
-                    )
-                    self.rating_engine.initialize_rider_ratings(rider.id)
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {_ + 1}: {str(e)}")
-
         except Exception as e:
-            return {
-                'success': 0,
-                'errors': 1,
-                'message': f"Failed to read CSV: {str(e)}"
-            }
-
-        return {
-            'success': success_count,
-            'errors': error_count,
-            'error_details': errors
-        }
+            return _read_failure(e)
+
+        return self._import_riders_frame(df)
 
     def import_races_from_csv(self, filepath: str) -> Dict[str, int]:
         """
@@ -85,64 +97,21 @@ class CSVImporter:
         name,date,category,country,flat,cobbles,mountain,tt,sprint,gc,oneday,endurance
         ...
 
+        Races that already exist for the same date are matched and count as
+        imported.
+
         Args:
             filepath: Path to CSV file
 
         Returns:
             Dictionary with import statistics
         """
-        success_count = 0
-        error_count = 0
-        errors = []
-
         try:
             df = pd.read_csv(filepath)
-
-            for _, row in df.iterrows():
-                try:
-                    # Check if template is specified
-                    if 'template' in df.columns and pd.notna(row.get('template')):
-                        characteristics = RaceTemplates.get_template(row['template'])
-                    else:
-                        # Use custom characteristics from CSV
-                        characteristics = {
-                            'flat_weight': float(row.get('flat', 0)),
-                            'cobbles_weight': float(row.get('cobbles', 0)),
-                            'mountain_weight': float(row.get('mountain', 0)),
-                            'time_trial_weight': float(row.get('tt', 0)),
-                            'sprint_weight': float(row.get('sprint', 0)),
-                            'gc_weight': float(row.get('gc', 0)),
-                            'one_day_weight': float(row.get('oneday', 0)),
-                            'endurance_weight': float(row.get('endurance', 0))
-                        }
-
-                    race_date = pd.to_datetime(row['date'])
-
-                    race = add_race(
-                        self.db,
-                        name=row['name'],
-                        date=race_date,
-                        category=row.get('category', 'Others'),
-                        country=row.get('country'),
-                        characteristics=characteristics
-                    )
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {_ + 1}: {str(e)}")
-
         except Exception as e:
-            return {
-                'success': 0,
-                'errors': 1,
-                'message': f"Failed to read CSV: {str(e)}"
-            }
-
-        return {
-            'success': success_count,
-            'errors': error_count,
-            'error_details': errors
-        }
+            return _read_failure(e)
+
+        return self._import_races_frame(df)
 
     def import_results_from_csv(self, filepath: str, race_id: int) -> Dict[str, int]:
         """
@@ -161,46 +130,418 @@ class CSVImporter:
         Returns:
             Dictionary with import statistics
         """
-        success_count = 0
-        error_count = 0
-        errors = []
-
         try:
             df = pd.read_csv(filepath)
+        except Exception as e:
+            return _read_failure(e)
+
+        return self._import_results_frame(df, race_id)
+
+    def import_results_stream(
+        self,
+        filepath: str,
+        chunksize: int = STREAM_CHUNK_SIZE,
+        progress: Optional[Callable[[float, Dict], None]] = None,
+        restart: bool = False
+    ) -> Dict:
+        """
+        Stream results for many races from a CSV file of any size.
+
+        The file is read chunksize rows at a time and each chunk is written
+        in its own transaction together with a checkpoint, so memory stays
+        bounded and an interrupted import resumes after the last committed
+        chunk when called again with the same file.
+
+        CSV Format:
+        race,race_date,position,rider_name,time_seconds,time_behind_seconds
+        Paris-Roubaix,2024-04-07,1,Mathieu van der Poel,19800,0
+        ...
+
+        Races are matched on a race_pcs_id column when present, otherwise on
+        race name and race_date. Races and riders must already exist.
+
+        Args:
+            filepath: Path to CSV file
+            chunksize: Rows read and committed per transaction
+            progress: Optional callback called after each chunk with the
+                fraction of the file read and the statistics so far
+            restart: Re-import chunks committed by an earlier run
+
+        Returns:
+            Dictionary with import statistics, plus 'chunks' committed and
+            'chunks_skipped' from earlier runs
+        """
+        try:
+            columns = pd.read_csv(filepath, nrows=0).columns
+            prefix = f"{_file_fingerprint(filepath, chunksize)}:"
+        except Exception as e:
+            return _read_failure(e)
+
+        missing_columns = [column for column in ('position', 'rider_name') if column not in columns]
+        if 'race_pcs_id' not in columns:
+            missing_columns += [column for column in ('race', 'race_date') if column not in columns]
+        if missing_columns:
+            return _read_failure(f"Missing required columns: {', '.join(missing_columns)}")
+
+        if restart:
+            clear_checkpoints(self.db, IMPORT_CHECKPOINT_KIND, get_checkpoint_keys(self.db, IMPORT_CHECKPOINT_KIND, prefix))
+
+        # Chunks commit in order, so resume after the committed prefix
+        committed = {int(key[len(prefix):]) for key in get_checkpoint_keys(self.db, IMPORT_CHECKPOINT_KIND, prefix)}
+        skipped = 0
+        while skipped in committed:
+            skipped += 1
+
+        stats = {'success': 0, 'errors': 0, 'error_details': [], 'chunks': 0, 'chunks_skipped': skipped}
+        file_size = os.path.getsize(filepath) or 1
+
+        try:
+            with open(filepath, 'rb') as f:
+                # Committed chunks are parsed again and discarded: skiprows counts
+                # lines, which drifts from the record count on blank lines and
+                # quoted fields spanning lines
+                for chunk_number, df in enumerate(pd.read_csv(f, chunksize=chunksize)):
+                    if chunk_number < skipped:
+                        continue
+                    first_row = chunk_number * chunksize
+                    df.index = pd.RangeIndex(first_row, first_row + len(df))
+
+                    result = self._import_results_chunk(df, f"{prefix}{chunk_number}")
+                    stats['success'] += result['success']
+                    stats['errors'] += result['errors']
+                    if 'message' in result:
+                        stats['message'] = result['message']
+                        break
+
+                    stats['chunks'] += 1
+                    room = MAX_ERROR_DETAILS - len(stats['error_details'])
+                    stats['error_details'] += result['error_details'][:room]
+
+                    if progress:
+                        progress(min(f.tell() / file_size, 1.0), stats)
+        except Exception as e:
+            # Chunks committed so far stay committed and are skipped on resume
+            stats['errors'] += 1
+            stats['message'] = f"Failed to read CSV: {str(e)}"
+
+        return stats
+
+    def _import_riders_frame(self, df: pd.DataFrame) -> Dict:
+        """Validate and bulk-import a frame of riders."""
+        if 'name' not in df.columns:
+            return _read_failure("Missing required column: name")
+
+        names = _text_column(df, 'name')
+        keys = _name_keys(names)
+
+        pcs_ids = _text_column(df, 'pcs_id')
+
+        invalid = keys.isna()
+        errors = [(index, "Missing rider name") for index in df.index[invalid]]
+
+        # A repeated pcs_id would make the bulk insert fail as a whole, and a
+        # repeated name_key would silently merge two rows into one rider
+        valid = ~invalid
+        for column, values, shown in (('pcs_id', pcs_ids, pcs_ids), ('name', keys, names)):
+            duplicates = _duplicate_rows(values[valid].dropna())
+            errors += [
+                (index, f"Duplicate {column} '{shown[index]}', already in row {first + 1}")
+                for index, first in duplicates.items()
+            ]
+            valid[duplicates.index] = False
+
+        entries = zip(
+            names[valid],
+            _nullable(pcs_ids[valid]),
+            _nullable(_text_column(df, 'team')[valid]),
+            _nullable(_text_column(df, 'country')[valid])
+        )
+
+        try:
+            resolve_riders_bulk(self.db, list(entries))
+        except Exception as e:
+            return _write_failure(e, len(df))
+
+        return _import_stats(int(valid.sum()), errors)
+
+    def _import_races_frame(self, df: pd.DataFrame) -> Dict:
+        """Validate and bulk-import a frame of races with their characteristics."""
+        missing_columns = [column for column in ('name', 'date') if column not in df.columns]
+        if missing_columns:
+            return _read_failure(f"Missing required columns: {', '.join(missing_columns)}")
+
+        names = _text_column(df, 'name')
+        keys = _name_keys(names)
+        dates = pd.to_datetime(df['date'], errors='coerce', format='mixed')
+        weights, weight_errors = _race_characteristics(df)
+
+        errors = weight_errors
+        errors += [(index, "Missing race name") for index in df.index[keys.isna()]]
+        errors += [
+            (index, f"Invalid date '{df.at[index, 'date']}'")
+            for index in df.index[dates.isna() & keys.notna()]
+        ]
+
+        invalid = keys.isna() | dates.isna()
+        invalid.loc[[index for index, _ in weight_errors]] = True
+        valid = ~invalid
+
+        # Races already stored or repeated in the file are matched, not inserted
+        races = pd.DataFrame({'name': names, 'name_key': keys, 'date': dates})[valid]
+        stored = get_race_ids_by_name_keys(self.db, races['name_key'])
+        is_new = ~races.duplicated(['name_key', 'date']) & pd.Series([
+            (key, race_date.to_pydatetime()) not in stored
+            for key, race_date in zip(races['name_key'], races['date'])
+        ], index=races.index, dtype=bool)
+        new_races = races[is_new]
+
+        if not new_races.empty:
+            categories = _text_column(df, 'category').fillna('Others')[new_races.index]
+            countries = _nullable(_text_column(df, 'country')[new_races.index])
+            race_dates = [race_date.to_pydatetime() for race_date in new_races['date']]
+
+            rows = [
+                {
+                    'name': name,
+                    'name_key': key,
+                    'date': race_date,
+                    'season': race_date.year,
+                    'category': parse_race_category(category),
+                    'country': country
+                }
+                for name, key, race_date, category, country in zip(
+                    new_races['name'], new_races['name_key'], race_dates, categories, countries
+                )
+            ]
+
+            try:
+                created = self.db.execute(
+                    insert(Race).returning(Race.id, Race.name_key, Race.date), rows
+                ).all()
+                race_ids = {(key, race_date): race_id for race_id, key, race_date in created}
+
+                race_weights = weights.loc[new_races.index]
+                race_weights.insert(0, 'race_id', [
+                    race_ids[(key, race_date)]
+                    for key, race_date in zip(new_races['name_key'], race_dates)
+                ])
+                self.db.execute(insert(RaceCharacteristics), race_weights.to_dict('records'))
+                bump_ratings_version(self.db)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                return _write_failure(e, len(df))
+
+        return _import_stats(int(valid.sum()), errors)
+
+    def _import_results_frame(self, df: pd.DataFrame, race_id: int) -> Dict:
+        """Validate and bulk-import a frame of results for one race."""
+        missing_columns = [column for column in ('position', 'rider_name') if column not in df.columns]
+        if missing_columns:
+            return _read_failure(f"Missing required columns: {', '.join(missing_columns)}")
+
+        rows, errors = self._result_rows(df)
+
+        try:
+            success_count = len(add_race_results_bulk(self.db, race_id, rows.to_dict('records')))
+        except Exception as e:
+            return _write_failure(e, len(df))
 
-            for _, row in df.iterrows():
-                try:
-                    from src.utils.db_helpers import get_rider_by_name
-                    rider = get_rider_by_name(self.db, row['rider_name'])
-
-                    if not rider:
-                        raise ValueError(f"Rider '{row['rider_name']}' not found")
-
-                    add_race_result(
-                        self.db,
-                        race_id=race_id,
-                        rider_id=rider.id,
-                        position=int(row['position']),
-                        time_seconds=int(row.get('time_seconds', 0)) or None,
-                        time_behind_seconds=int(row.get('time_behind_seconds', 0)) or None
-                    )
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {_ + 1}: {str(e)}")
+        return _import_stats(success_count, errors)
 
+    def _import_results_chunk(self, df: pd.DataFrame, checkpoint_key: str) -> Dict:
+        """Import a chunk of multi-race results and its checkpoint in one transaction."""
+        rows, errors = self._result_rows(df)
+        race_ids, race_errors = self._race_ids(df)
+        errors += race_errors
+
+        rows = rows[race_ids[rows.index].notna()]
+        rows.insert(0, 'race_id', race_ids[rows.index].astype(int))
+
+        try:
+            if not rows.empty:
+                self.db.execute(insert(RaceResult), rows.to_dict('records'))
+                bump_ratings_version(self.db)
+            self.db.add(UpdateCheckpoint(kind=IMPORT_CHECKPOINT_KIND, key=checkpoint_key))
+            self.db.commit()
         except Exception as e:
-            return {
-                'success': 0,
-                'errors': 1,
-                'message': f"Failed to read CSV: {str(e)}"
-            }
-
-        return {
-            'success': success_count,
-            'errors': error_count,
-            'error_details': errors
-        }
+            self.db.rollback()
+            return _write_failure(e, len(df))
+
+        return _import_stats(len(rows), errors)
+
+    def _result_rows(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[int, str]]]:
+        """
+        Resolve riders and validate positions for a frame of results.
+
+        Returns:
+            Tuple of (valid result rows indexed like df, (row index, message) errors)
+        """
+        names = _text_column(df, 'rider_name')
+        keys = _name_keys(names)
+        positions = pd.to_numeric(df['position'], errors='coerce')
+
+        # Resolve every rider on the sheet with batched IN (...) lookups
+        rider_ids = keys.map(get_rider_ids_by_name_keys(self.db, keys.dropna()))
+
+        errors = [(index, "Missing rider name") for index in df.index[keys.isna()]]
+        errors += [
+            (index, f"Rider '{names[index]}' not found")
+            for index in df.index[keys.notna() & rider_ids.isna()]
+        ]
+        errors += [
+            (index, f"Invalid position '{df.at[index, 'position']}'")
+            for index in df.index[positions.isna()]
+        ]
+
+        valid = rider_ids.notna() & positions.notna()
+        rows = pd.DataFrame({
+            'rider_id': rider_ids[valid].astype(int),
+            'position': positions[valid].astype(int),
+            'time_seconds': _optional_seconds(df, 'time_seconds')[valid],
+            'time_behind_seconds': _optional_seconds(df, 'time_behind_seconds')[valid]
+        })
+        return rows, errors
+
+    def _race_ids(self, df: pd.DataFrame) -> Tuple[pd.Series, List[Tuple[int, str]]]:
+        """
+        Resolve the race of each result row by race_pcs_id, then race and race_date.
+
+        Returns:
+            Tuple of (race IDs indexed like df, NaN when unresolved, errors)
+        """
+        pcs_ids = _text_column(df, 'race_pcs_id')
+        race_ids = pcs_ids.map(get_race_ids_by_pcs_ids(self.db, pcs_ids.dropna())).astype(float)
+
+        names = _text_column(df, 'race')
+        keys = _name_keys(names)
+        raw_dates = df['race_date'] if 'race_date' in df.columns else pd.Series(None, index=df.index)
+        dates = pd.to_datetime(raw_dates, errors='coerce', format='mixed')
+
+        unresolved = race_ids.isna() & keys.notna() & dates.notna()
+        if unresolved.any():
+            by_key = get_race_ids_by_name_keys(self.db, keys[unresolved].unique())
+            race_ids[unresolved] = [
+                by_key.get((key, race_date.to_pydatetime()), float('nan'))
+                for key, race_date in zip(keys[unresolved], dates[unresolved])
+            ]
+
+        errors = []
+        for index in df.index[race_ids.isna()]:
+            if pd.notna(keys[index]) and pd.isna(dates[index]):
+                errors.append((index, f"Invalid race date '{raw_dates[index]}'"))
+            elif pd.notna(keys[index]):
+                errors.append((index, f"Race '{names[index]}' on {dates[index].date()} not found"))
+            elif pd.notna(pcs_ids[index]):
+                errors.append((index, f"Race '{pcs_ids[index]}' not found"))
+            else:
+                errors.append((index, "Missing race"))
+
+        return race_ids, errors
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Return a column as stripped strings with blanks as NA (all NA if absent)."""
+    if column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype='string')
+
+    values = df[column].astype('string').str.strip()
+    return values.mask(values == '')
+
+
+def _name_keys(names: pd.Series) -> pd.Series:
+    """Normalize names, computing each distinct name only once."""
+    distinct = names.dropna().unique()
+    return names.map({name: make_name_key(name) for name in distinct})
+
+
+def _duplicate_rows(values: pd.Series) -> pd.Series:
+    """Map each row repeating an earlier value to the row it repeats."""
+    first_rows = pd.Series(values.index, index=values.index).groupby(values.to_numpy()).transform('first')
+    return first_rows[first_rows != first_rows.index]
+
+
+def _nullable(values: pd.Series) -> pd.Series:
+    """Convert NA to None for database drivers."""
+    return values.astype(object).where(values.notna(), None)
+
+
+def _optional_seconds(df: pd.DataFrame, column: str) -> pd.Series:
+    """Read an optional seconds column; missing, blank and zero values become None."""
+    if column not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+
+    seconds = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
+    return seconds.astype(object).where(seconds != 0, None)
+
+
+def _race_characteristics(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[int, str]]]:
+    """
+    Build race characteristic weights from templates or custom columns.
+
+    Returns:
+        Tuple of (weights frame indexed like df, (row index, message) errors)
+    """
+    weights = pd.DataFrame(0.0, index=df.index, columns=list(CHARACTERISTIC_COLUMNS.values()))
+    errors = []
+
+    templates = _text_column(df, 'template')
+    custom = templates.isna()
+
+    for column, field in CHARACTERISTIC_COLUMNS.items():
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors='coerce')
+            bad = custom & df[column].notna() & values.isna()
+            errors += [(index, f"Invalid {column} weight '{df.at[index, column]}'") for index in df.index[bad]]
+            weights[field] = values.fillna(0.0)
+
+    weights.loc[~custom] = 0.0
+    for template in templates.dropna().unique():
+        rows = templates == template
+        try:
+            characteristics = RaceTemplates.get_template(template)
+        except KeyError as e:
+            errors += [(index, str(e).strip('"')) for index in df.index[rows]]
+            continue
+        for field, value in characteristics.items():
+            weights.loc[rows, field] = value
+
+    return weights, errors
+
+
+def _file_fingerprint(filepath: str, chunksize: int) -> str:
+    """Identify a file by its size and the bytes at both ends, without reading all of it."""
+    digest = hashlib.sha1(f"{os.path.getsize(filepath)}:{chunksize}".encode())
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        f.seek(max(f.tell(), os.path.getsize(filepath) - FINGERPRINT_BYTES))
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _import_stats(success_count: int, errors: List[Tuple[int, str]]) -> Dict:
+    """Format import statistics with per-row errors in file order."""
+    return {
+        'success': success_count,
+        'errors': len(errors),
+        'error_details': [f"Row {index + 1}: {message}" for index, message in sorted(errors)]
+    }
+
+
+def _read_failure(error) -> Dict:
+    return {
+        'success': 0,
+        'errors': 1,
+        'message': f"Failed to read CSV: {str(error)}"
+    }
+
+
+def _write_failure(error: Exception, row_count: int) -> Dict:
+    return {
+        'success': 0,
+        'errors': row_count,
+        'message': f"Import failed, no rows were written: {str(error)}"
+    }
 
 
 def create_sample_csv_templates():
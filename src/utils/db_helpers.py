@@ -1,15 +1,34 @@
 """Database helper functions for common operations."""
 
-from datetime import datetime
-from typing import List, Dict, Optional
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple, Union
+from sqlalchemy import insert, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics
+from src.models import (
+    Rider, RiderRating, RatingHistory, RatingSnapshot, Race, RaceResult, RaceCharacteristics, UpdateCheckpoint,
+    DataVersion
+)
 from src.models.race import RaceCategory
+from src.models.rider import HISTORY_RATING_COLUMNS
+from src.models.naming import make_name_key
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+# Bumped by every write to riders, races, results or ratings
+RATINGS_VERSION = "ratings"
 
 
 def add_rider(
@@ -33,7 +52,7 @@ def add_rider(
         Created Rider object
     """
     # Check if rider already exists
-    existing = db.query(Rider).filter(Rider.name == name).first()
+    existing = get_rider_by_name(db, name)
     if existing:
         return existing
 
@@ -45,12 +64,144 @@ def add_rider(
     )
 
     db.add(rider)
+    bump_ratings_version(db)
     db.commit()
     db.refresh(rider)
 
     return rider
 
 
+def resolve_riders_bulk(
+    db: Session,
+    entries: List[Tuple[Optional[str], ...]],
+    created: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """
+    Get or create many riders at once.
+
+    Existing riders are matched on pcs_id first and then on name_key, using
+    indexed IN (...) lookups. Missing riders are inserted in one statement
+    together with their initial RiderRating rows, in a single transaction.
+    Entries repeating a pcs_id under another spelling resolve to the rider
+    of its first entry.
+
+    Args:
+        db: Database session
+        entries: (name, pcs_id, team) or (name, pcs_id, team, country)
+            tuples; everything but the name may be None
+        created: Optional list that receives the names of newly created riders
+
+    Returns:
+        Dictionary mapping each entry name to its rider ID
+    """
+    by_key = {}
+    names_by_key = {}
+    key_by_pcs_id = {}
+    for name, pcs_id, team, *rest in entries:
+        key = make_name_key(name)
+        if not key:
+            continue
+        # Inserting the same pcs_id twice would fail the whole batch
+        if pcs_id:
+            key = key_by_pcs_id.get(pcs_id, key)
+        names_by_key.setdefault(key, set()).add(name.strip())
+        if key not in by_key:
+            country = rest[0] if rest else None
+            by_key[key] = (name.strip(), pcs_id or None, team or None, country or None)
+            if pcs_id:
+                key_by_pcs_id[pcs_id] = key
+
+    ids_by_pcs_id = _lookup_ids(db, Rider.pcs_id, {pcs_id for _, pcs_id, _, _ in by_key.values() if pcs_id})
+    ids_by_key = get_rider_ids_by_name_keys(db, by_key)
+
+    resolved_keys = {}
+    missing = []
+    for key, (name, pcs_id, team, country) in by_key.items():
+        rider_id = ids_by_pcs_id.get(pcs_id) if pcs_id else None
+        if rider_id is None:
+            rider_id = ids_by_key.get(key)
+        if rider_id is None:
+            missing.append({'name': name, 'name_key': key, 'pcs_id': pcs_id, 'team': team, 'country': country})
+        else:
+            resolved_keys[key] = rider_id
+
+    if missing:
+        try:
+            new_riders = db.execute(insert(Rider).returning(Rider.id, Rider.name_key), missing).all()
+            db.execute(insert(RiderRating), [
+                {
+                    'rider_id': rider_id,
+                    **{dim: settings.initial_rating for dim in settings.dimensions},
+                    'overall': settings.initial_rating,
+                    'races_count': 0,
+                    'wins_count': 0,
+                    'podiums_count': 0
+                }
+                for rider_id, _ in new_riders
+            ])
+            # Imported here: the services package imports this module
+            from src.services.leaderboard import Leaderboard
+            Leaderboard(db).update(rider_id for rider_id, _ in new_riders)
+            bump_ratings_version(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for rider_id, key in new_riders:
+            resolved_keys[key] = rider_id
+            if created is not None:
+                created.append(by_key[key][0])
+
+    resolved = {}
+    for key, rider_id in resolved_keys.items():
+        for name in names_by_key[key]:
+            resolved[name] = rider_id
+
+    return resolved
+
+
+def get_rider_ids_by_name_keys(db: Session, keys) -> Dict[str, int]:
+    """Map normalized rider names to rider IDs using chunked IN (...) lookups."""
+    return _lookup_ids(db, Rider.name_key, keys)
+
+
+def get_race_ids_by_name_keys(db: Session, keys) -> Dict[Tuple[str, datetime], int]:
+    """Map (name_key, date) pairs of stored races with any of the given name keys to race IDs."""
+    keys = list(set(keys))
+    ids = {}
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        ids.update(
+            ((key, race_date), race_id) for race_id, key, race_date in
+            db.query(Race.id, Race.name_key, Race.date).filter(Race.name_key.in_(keys[start:start + IN_CHUNK_SIZE]))
+        )
+    return ids
+
+
+def get_race_ids_by_pcs_ids(db: Session, pcs_ids) -> Dict[str, int]:
+    """Map ProCyclingStats race IDs to race IDs using chunked IN (...) lookups."""
+    return _lookup_ids(db, Race.pcs_id, pcs_ids)
+
+
+def _lookup_ids(db: Session, column, values) -> Dict:
+    """Map values of an indexed column to row IDs, IN_CHUNK_SIZE values per query."""
+    values = list(set(values))
+    ids = {}
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        ids.update(
+            db.query(column, column.class_.id).filter(column.in_(values[start:start + IN_CHUNK_SIZE]))
+        )
+    return ids
+
+
+def parse_race_category(category: Optional[str]) -> RaceCategory:
+    """Convert a category name such as 'Monument' or 'ProSeries' to a RaceCategory."""
+    try:
+        return RaceCategory[(category or "Others").upper()]
+    except KeyError:
+        return RaceCategory.OTHERS
+
+
 def add_race(
     db: Session,
     name: str,
@@ -73,13 +224,14 @@ def add_race(
         pcs_id: Pro Cycling Stats ID
 
     Returns:
-        Created Race object
+        Created Race object, or the existing race with the same name and date
     """
-    # Get or create race category enum
-    try:
-        race_category = RaceCategory[category.upper().replace("PROSERIES", "PROSERIES")]
-    except KeyError:
-        race_category = RaceCategory.OTHERS
+    race_category = parse_race_category(category)
+
+    # Check if race already exists for that date
+    existing = db.query(Race).filter(Race.name_key == make_name_key(name), Race.date == date).first()
+    if existing:
+        return existing
 
     race = Race(
         name=name,
@@ -101,12 +253,112 @@ def add_race(
         )
         db.add(race_char)
 
+    bump_ratings_version(db)
     db.commit()
     db.refresh(race)
 
     return race
 
 
+def upsert_race(
+    db: Session,
+    name: str,
+    date: datetime,
+    category: str = "Others",
+    country: Optional[str] = None,
+    characteristics: Optional[Dict[str, float]] = None,
+    pcs_id: Optional[str] = None
+) -> Tuple[Race, bool]:
+    """
+    Insert a race unless it is already stored, in one INSERT ... ON CONFLICT.
+
+    With a pcs_id, a race only matches the race stored under that pcs_id, or
+    one stored without a pcs_id under the same name and date. A different
+    PCS race that parses to the same name on the same day (e.g. split stages
+    1a and 1b) is stored with the stage part of its pcs_id appended to the
+    name. Without a pcs_id, races match on name and date. Existing races are
+    returned unchanged, so callers can use the created flag to make sure
+    results and ratings are only applied once.
+
+    Args:
+        db: Database session
+        name: Race name
+        date: Race date
+        category: Race category
+        country: Country where race takes place
+        characteristics: Dictionary of race characteristics
+        pcs_id: Pro Cycling Stats ID
+
+    Returns:
+        Tuple of (race, whether it was created by this call)
+
+    Raises:
+        ValueError: If the disambiguated name is taken on that date as well
+    """
+    race_category = parse_race_category(category)
+
+    def insert_race(race_name: str) -> Optional[int]:
+        dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        conflict_target = [Race.pcs_id] if pcs_id else [Race.name_key, Race.date]
+        return db.execute(
+            dialect_insert(Race)
+            .values(
+                name=race_name,
+                name_key=make_name_key(race_name),
+                date=date,
+                category=race_category,
+                country=country,
+                season=date.year,
+                pcs_id=pcs_id
+            )
+            .on_conflict_do_nothing(index_elements=conflict_target)
+            .returning(Race.id)
+        ).scalar()
+
+    try:
+        try:
+            race_id = insert_race(name)
+        except IntegrityError:
+            # Same name and date as a stored race, but a different pcs_id
+            db.rollback()
+            existing = db.query(Race).filter(Race.name_key == make_name_key(name), Race.date == date).first()
+            if existing is not None and existing.pcs_id is None:
+                return existing, False
+
+            distinct_name = f"{name} ({_pcs_id_suffix(pcs_id)})"
+            try:
+                race_id = insert_race(distinct_name)
+            except IntegrityError:
+                db.rollback()
+                raise ValueError(
+                    f"Race '{pcs_id}' collides with another race named '{distinct_name}' on {date:%Y-%m-%d}"
+                )
+            logger.warning(f"Stored race '{pcs_id}' as '{distinct_name}': '{name}' is taken on {date:%Y-%m-%d}")
+
+        if race_id is None:
+            db.commit()
+            race = get_race_by_pcs_id(db, pcs_id) if pcs_id else None
+            if race is None:
+                race = db.query(Race).filter(Race.name_key == make_name_key(name), Race.date == date).first()
+            return race, False
+
+        if characteristics:
+            db.add(RaceCharacteristics(race_id=race_id, **characteristics))
+        bump_ratings_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return db.get(Race, race_id), True
+
+
+def _pcs_id_suffix(pcs_id: str) -> str:
+    """The part of a PCS race id below the race and season, e.g. 'stage-1a' for 'tour-de-france/2024/stage-1a'."""
+    segments = pcs_id.split('/')
+    return '/'.join(segments[2:]) or pcs_id
+
+
 def add_race_result(
     db: Session,
     race_id: int,
@@ -144,12 +396,69 @@ def add_race_result(
     )
 
     db.add(result)
+    bump_ratings_version(db)
     db.commit()
     db.refresh(result)
 
     return result
 
 
+def add_race_results_bulk(
+    db: Session,
+    race_id: int,
+    rows: List[Dict]
+) -> List[int]:
+    """
+    Add a whole result sheet for a race in one transaction.
+
+    Rows are inserted with a batched INSERT ... RETURNING instead of
+    committing and refreshing each result.
+
+    Args:
+        db: Database session
+        race_id: Race ID
+        rows: Result dictionaries with rider_id and position, and optionally
+            time_seconds, time_behind_seconds, points, did_not_finish and
+            did_not_start
+
+    Returns:
+        IDs of the created results, in the order of rows
+    """
+    if not rows:
+        return []
+
+    mappings = [
+        {
+            'race_id': race_id,
+            'rider_id': row['rider_id'],
+            'position': row['position'],
+            'time_seconds': row.get('time_seconds'),
+            'time_behind_seconds': row.get('time_behind_seconds'),
+            'points': row.get('points') or 0,
+            'did_not_finish': 1 if row.get('did_not_finish') else 0,
+            'did_not_start': 1 if row.get('did_not_start') else 0
+        }
+        for row in rows
+    ]
+
+    try:
+        returned = db.execute(
+            insert(RaceResult).returning(RaceResult.id, RaceResult.rider_id, RaceResult.position), mappings
+        ).all()
+        bump_ratings_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Batched RETURNING rows need not follow parameter order, so match them
+    # back on rider and position
+    ids_by_row = defaultdict(list)
+    for result_id, rider_id, position in returned:
+        ids_by_row[rider_id, position].append(result_id)
+    return [ids_by_row[mapping['rider_id'], mapping['position']].pop() for mapping in mappings]
+
+
 def get_top_riders(
     db: Session,
     dimension: str = "overall",
@@ -158,6 +467,9 @@ def get_top_riders(
     """
     Get top riders by rating dimension.
 
+    Reads the materialized leaderboard, so the cost does not grow with the
+    number of rated riders.
+
     Args:
         db: Database session
         dimension: Rating dimension (overall, flat, mountain, etc.)
@@ -166,18 +478,13 @@ def get_top_riders(
     Returns:
         List of dictionaries with rider info and ratings
     """
-    if not hasattr(RiderRating, dimension):
-        dimension = "overall"
+    from src.services.leaderboard import Leaderboard, LEADERBOARD_DIMENSIONS
 
-    riders_query = (
-        db.query(Rider, RiderRating)
-        .join(RiderRating, Rider.id == RiderRating.rider_id)
-        .order_by(getattr(RiderRating, dimension).desc())
-        .limit(limit)
-    )
+    if dimension not in LEADERBOARD_DIMENSIONS:
+        dimension = "overall"
 
     results = []
-    for rider, rating in riders_query:
+    for _, rider, rating in Leaderboard(db).top(dimension, limit):
         results.append({
             'name': rider.name,
             'team': rider.team,
@@ -192,11 +499,246 @@ def get_top_riders(
     return results
 
 
+def get_ratings_as_of(
+    db: Session,
+    as_of: Union[date, datetime],
+    dimension: str = "overall"
+) -> Dict[int, int]:
+    """
+    Get every rated rider's rating as it stood at the end of a past date.
+
+    Reads the latest monthly snapshot on or before the date, then only the
+    rating history recorded between that snapshot and the date.
+
+    Args:
+        db: Database session
+        as_of: Date whose races are included
+        dimension: Rating dimension (overall, flat, mountain, etc.)
+
+    Returns:
+        Dictionary mapping rider ID to rating, for riders rated by then
+    """
+    if dimension not in HISTORY_RATING_COLUMNS:
+        raise ValueError(f"Unknown rating dimension '{dimension}'")
+
+    end = datetime(as_of.year, as_of.month, as_of.day) + timedelta(days=1)
+
+    snapshot_date = db.query(func.max(RatingSnapshot.snapshot_date)).filter(
+        RatingSnapshot.snapshot_date <= end
+    ).scalar()
+
+    ratings = {}
+    if snapshot_date is not None:
+        ratings.update(
+            db.query(RatingSnapshot.rider_id, getattr(RatingSnapshot, dimension)).filter(
+                RatingSnapshot.snapshot_date == snapshot_date
+            )
+        )
+
+    for rider_id, rating in _latest_history(db, [dimension], snapshot_date, end):
+        if rating is not None:
+            ratings[rider_id] = rating
+
+    return ratings
+
+
+def refresh_rating_snapshots(db: Session) -> int:
+    """
+    Create any missing monthly rating snapshots.
+
+    A snapshot is taken at the start of every month covered by rating
+    history. Each new snapshot is built from the previous one plus that
+    month's history, so only months without a snapshot are scanned.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of snapshots created
+    """
+    first, last = db.query(func.min(RatingHistory.date), func.max(RatingHistory.date)).one()
+    if first is None:
+        return 0
+
+    existing = {snapshot_date for (snapshot_date,) in db.query(RatingSnapshot.snapshot_date).distinct()}
+
+    created = 0
+    previous = None
+    state, state_date = {}, None
+
+    # Only months that history has moved past, so today's updates do not churn a snapshot
+    month = _next_month(first)
+    while month <= last:
+        if month not in existing:
+            if state_date != previous:
+                state = {
+                    rider_id: values for rider_id, *values in db.query(
+                        RatingSnapshot.rider_id,
+                        *[getattr(RatingSnapshot, column) for column in HISTORY_RATING_COLUMNS]
+                    ).filter(RatingSnapshot.snapshot_date == previous)
+                } if previous else {}
+
+            for rider_id, *values in _latest_history(db, HISTORY_RATING_COLUMNS, previous, month):
+                state[rider_id] = values
+
+            if state:
+                db.execute(insert(RatingSnapshot), [
+                    {'snapshot_date': month, 'rider_id': rider_id, **dict(zip(HISTORY_RATING_COLUMNS, values))}
+                    for rider_id, values in state.items()
+                ])
+                created += 1
+            state_date = month
+
+        previous = month
+        month = _next_month(month)
+
+    db.commit()
+    return created
+
+
+def invalidate_rating_snapshots(db: Session, changed_date: datetime) -> int:
+    """
+    Delete snapshots made stale by rating history changed on or after a date.
+
+    Does not commit, so it can join the transaction that changes the history.
+
+    Returns:
+        Number of snapshot rows deleted
+    """
+    return db.query(RatingSnapshot).filter(
+        RatingSnapshot.snapshot_date > changed_date
+    ).delete(synchronize_session=False)
+
+
+def _latest_history(db: Session, columns, start: Optional[datetime], end: datetime):
+    """Each rider's last rating history row in [start, end), reading only the given columns."""
+    latest = db.query(
+        RatingHistory.rider_id,
+        *[getattr(RatingHistory, column) for column in columns],
+        func.row_number().over(
+            partition_by=RatingHistory.rider_id,
+            order_by=(RatingHistory.date.desc(), RatingHistory.id.desc())
+        ).label("recency")
+    ).filter(RatingHistory.date < end)
+    if start is not None:
+        latest = latest.filter(RatingHistory.date >= start)
+    latest = latest.subquery()
+
+    return db.query(latest.c.rider_id, *[latest.c[column] for column in columns]).filter(latest.c.recency == 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    """First day of the month after the given date."""
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+
+def get_ratings_version(db: Session) -> int:
+    """
+    Current value of the ratings version counter.
+
+    The counter changes with every committed write to riders, races,
+    results or ratings, so readers can key cached query results on it.
+    """
+    return db.query(DataVersion.version).filter(DataVersion.name == RATINGS_VERSION).scalar() or 0
+
+
+def bump_ratings_version(db: Session):
+    """
+    Increment the ratings version counter.
+
+    Does not commit, so the new version becomes visible together with the
+    write that caused it.
+    """
+    bumped = db.execute(
+        update(DataVersion)
+        .where(DataVersion.name == RATINGS_VERSION)
+        .values(version=DataVersion.version + 1)
+    ).rowcount
+    if not bumped:
+        db.execute(insert(DataVersion).values(name=RATINGS_VERSION, version=1))
+
+
 def get_rider_by_name(db: Session, name: str) -> Optional[Rider]:
-    """Get rider by name."""
-    return db.query(Rider).filter(Rider.name.ilike(f"%{name}%")).first()
+    """Get rider by name, ignoring case, accents and punctuation."""
+    return db.query(Rider).filter(Rider.name_key == make_name_key(name)).first()
+
+
+def get_race_by_pcs_id(db: Session, pcs_id: str) -> Optional[Race]:
+    """Get race by its Pro Cycling Stats ID."""
+    return db.query(Race).filter(Race.pcs_id == pcs_id).first()
 
 
 def get_race_by_name(db: Session, name: str) -> Optional[Race]:
-    """Get race by name."""
-    return db.query(Race).filter(Race.name.ilike(f"%{name}%")).first()
+    """Get the most recent race with a name, ignoring case, accents and punctuation."""
+    return (
+        db.query(Race)
+        .filter(Race.name_key == make_name_key(name))
+        .order_by(Race.date.desc())
+        .first()
+    )
+
+
+def delete_race(db: Session, race_id: int):
+    """
+    Delete a race together with its characteristics, results and rating history.
+
+    Meant for undoing a partially stored race whose ratings were never
+    applied; ratings already updated from it are not reverted.
+    """
+    for model in (RaceResult, RaceCharacteristics, RatingHistory):
+        db.query(model).filter(model.race_id == race_id).delete(synchronize_session=False)
+    db.query(Race).filter(Race.id == race_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def get_completed_checkpoints(db: Session, kind: str, keys: List[str]) -> set:
+    """Return which of the given checkpoint keys have been completed."""
+    completed = set()
+    keys = list(keys)
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CHUNK_SIZE]
+        completed.update(
+            key for (key,) in db.query(UpdateCheckpoint.key).filter(
+                UpdateCheckpoint.kind == kind,
+                UpdateCheckpoint.key.in_(chunk)
+            )
+        )
+    return completed
+
+
+def mark_checkpoint(db: Session, kind: str, key: str):
+    """Record a unit of update work as completed (no-op if already recorded)."""
+    exists = db.query(UpdateCheckpoint.id).filter(
+        UpdateCheckpoint.kind == kind,
+        UpdateCheckpoint.key == key
+    ).first()
+
+    if not exists:
+        db.add(UpdateCheckpoint(kind=kind, key=key))
+        db.commit()
+
+
+def get_checkpoint_keys(db: Session, kind: str, prefix: str) -> List[str]:
+    """Return the completed checkpoint keys of a kind that start with prefix."""
+    return [
+        key for (key,) in db.query(UpdateCheckpoint.key).filter(
+            UpdateCheckpoint.kind == kind,
+            UpdateCheckpoint.key.startswith(prefix, autoescape=True)
+        )
+    ]
+
+
+def clear_checkpoints(db: Session, kind: str, keys: List[str]) -> int:
+    """Forget completed checkpoints so their work is redone. Returns rows deleted."""
+    deleted = 0
+    keys = list(keys)
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CHUNK_SIZE]
+        deleted += db.query(UpdateCheckpoint).filter(
+            UpdateCheckpoint.kind == kind,
+            UpdateCheckpoint.key.in_(chunk)
+        ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
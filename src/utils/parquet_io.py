@@ -0,0 +1,351 @@
+"""Parquet import and export for moving rating data between databases."""
+
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.models import Rider, Race, RaceCharacteristics, RaceResult, RatingHistory
+from src.models.rider import HISTORY_RATING_COLUMNS
+from src.models.naming import make_name_key
+from src.utils.db_helpers import (
+    resolve_riders_bulk, get_race_ids_by_name_keys, get_race_ids_by_pcs_ids, parse_race_category,
+    invalidate_rating_snapshots, bump_ratings_version
+)
+from src.services.rating_engine import RatingEngine
+from config.settings import settings
+
+# Low-cardinality text columns are dictionary encoded. Rider tables hold
+# hundreds of teams, so the indices must be wider than int8.
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+_TIMESTAMP = pa.timestamp('us')
+
+# Typed file schemas. Row IDs are those of the exporting database and are
+# only used to link the tables of one export together.
+SCHEMAS = {
+    'riders': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        pa.field('pcs_id', pa.string()),
+        pa.field('name', pa.string(), nullable=False),
+        pa.field('country', _CATEGORY),
+        pa.field('team', _CATEGORY),
+        pa.field('birth_date', _TIMESTAMP),
+    ]),
+    'races': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        pa.field('pcs_id', pa.string()),
+        pa.field('name', pa.string(), nullable=False),
+        pa.field('category', _CATEGORY),
+        pa.field('date', _TIMESTAMP, nullable=False),
+        pa.field('season', pa.int16(), nullable=False),
+        pa.field('country', _CATEGORY),
+        pa.field('is_stage_race', pa.bool_()),
+        pa.field('stage_number', pa.int16()),
+        pa.field('parent_race_id', pa.int32()),
+    ]),
+    'race_characteristics': pa.schema(
+        [pa.field('race_id', pa.int32(), nullable=False)]
+        + [pa.field(f'{dim}_weight', pa.float64()) for dim in settings.dimensions]
+        + [pa.field(column, pa.float64()) for column in ('distance_km', 'elevation_gain_m', 'avg_gradient')]
+    ),
+    'race_results': pa.schema([
+        pa.field('race_id', pa.int32(), nullable=False),
+        pa.field('rider_id', pa.int32(), nullable=False),
+        pa.field('position', pa.int16(), nullable=False),
+        pa.field('time_seconds', pa.int32()),
+        pa.field('time_behind_seconds', pa.int32()),
+        pa.field('points', pa.int32()),
+        pa.field('did_not_finish', pa.bool_()),
+        pa.field('did_not_start', pa.bool_()),
+    ]),
+    'rating_history': pa.schema(
+        [
+            pa.field('rider_id', pa.int32(), nullable=False),
+            pa.field('race_id', pa.int32()),
+            pa.field('date', _TIMESTAMP, nullable=False),
+        ]
+        + [pa.field(column, pa.int16()) for column in HISTORY_RATING_COLUMNS]
+        + [pa.field('change_reason', pa.string())]
+    ),
+}
+
+TABLES = tuple(SCHEMAS)
+
+
+def export_parquet(
+    db: Session,
+    directory: str,
+    season: Optional[int] = None,
+    compression: str = 'zstd'
+) -> Dict[str, int]:
+    """
+    Export riders, races, characteristics, results and rating history to Parquet.
+
+    Each table is written to <directory>/<table>.parquet with the typed
+    schema in SCHEMAS.
+
+    Args:
+        db: Database session
+        directory: Output directory, created if needed
+        season: Only export this season's races, their results and history,
+            and the riders who took part. Exports everything when None.
+        compression: Parquet compression codec
+
+    Returns:
+        Dictionary mapping each table to the number of rows written
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    race_filter = [Race.season == season] if season is not None else []
+    season_races = select(Race.id).where(*race_filter)
+
+    queries = {
+        'races': select(
+            Race.id, Race.pcs_id, Race.name, Race.category, Race.date, Race.season,
+            Race.country, Race.is_stage_race, Race.stage_number, Race.parent_race_id
+        ).where(*race_filter).order_by(Race.date, Race.id),
+        'race_characteristics': select(
+            *[getattr(RaceCharacteristics, name) for name in SCHEMAS['race_characteristics'].names]
+        ).where(RaceCharacteristics.race_id.in_(season_races)),
+        'race_results': select(
+            *[getattr(RaceResult, name) for name in SCHEMAS['race_results'].names]
+        ).where(RaceResult.race_id.in_(season_races)).order_by(RaceResult.race_id, RaceResult.position),
+        'rating_history': select(
+            *[getattr(RatingHistory, name) for name in SCHEMAS['rating_history'].names]
+        ).order_by(RatingHistory.date, RatingHistory.id),
+    }
+
+    riders = select(Rider.id, Rider.pcs_id, Rider.name, Rider.country, Rider.team, Rider.birth_date)
+    if season is not None:
+        riders = riders.where(Rider.id.in_(select(RaceResult.rider_id).where(RaceResult.race_id.in_(season_races))))
+        queries['rating_history'] = queries['rating_history'].where(RatingHistory.race_id.in_(season_races))
+    queries['riders'] = riders.order_by(Rider.id)
+
+    counts = {}
+    for table in TABLES:
+        rows = db.execute(queries[table]).all()
+        if table == 'races':
+            rows = [(*row[:3], row.category.value if row.category else None, *row[4:]) for row in rows]
+
+        arrow_table = _to_arrow(rows, SCHEMAS[table])
+        pq.write_table(arrow_table, os.path.join(directory, f'{table}.parquet'), compression=compression)
+        counts[table] = arrow_table.num_rows
+
+    return counts
+
+
+def import_parquet(db: Session, directory: str) -> Dict[str, int]:
+    """
+    Import a Parquet export, typically from another database.
+
+    Riders are matched on pcs_id or name and created when missing; races are
+    matched on pcs_id or name and date. Characteristics, results and rating
+    history are only imported for races that did not exist yet, so importing
+    the same export twice adds nothing. Riders with imported history have
+    their current ratings reset to their latest history.
+
+    Args:
+        db: Database session
+        directory: Directory written by export_parquet
+
+    Returns:
+        Dictionary with the number of rows imported per table, plus
+        'races_matched' for races that already existed
+    """
+    tables = {table: _read_table(directory, table) for table in TABLES}
+
+    rider_map = _import_riders(db, tables['riders'])
+
+    # Races and their linked rows commit together: committed races are
+    # matched as existing on a re-import, which skips their linked rows
+    try:
+        new_race_map, created_count = _import_races(db, tables['races'])
+        stats = {
+            'riders': tables['riders'].num_rows,
+            'races': created_count,
+            'races_matched': tables['races'].num_rows - created_count
+        }
+
+        stats['race_characteristics'] = _insert_linked(
+            db, RaceCharacteristics, tables['race_characteristics'], new_race_map, rider_map
+        )
+        stats['race_results'] = _insert_linked(db, RaceResult, tables['race_results'], new_race_map, rider_map)
+
+        history_rows = _linked_rows(tables['rating_history'], new_race_map, rider_map)
+        if history_rows:
+            db.execute(insert(RatingHistory), history_rows)
+            invalidate_rating_snapshots(db, min(row['date'] for row in history_rows))
+        stats['rating_history'] = len(history_rows)
+
+        if stats['race_characteristics'] or stats['race_results'] or history_rows:
+            bump_ratings_version(db)
+        RatingEngine(db).sync_from_history({row['rider_id'] for row in history_rows})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return stats
+
+
+def _to_arrow(rows: List[Tuple], schema: pa.Schema) -> pa.Table:
+    """Build a typed Arrow table from database rows, one column at a time."""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode().cast(field.type))
+        elif pa.types.is_boolean(field.type):
+            # Flags are stored as 0/1 integers
+            arrays.append(pa.array([None if value is None else bool(value) for value in values], type=field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _read_table(directory: str, table: str) -> pa.Table:
+    """Read one exported table, validating it against its schema (empty if absent)."""
+    schema = SCHEMAS[table]
+    path = os.path.join(directory, f'{table}.parquet')
+    if not os.path.exists(path):
+        return schema.empty_table()
+    return pq.read_table(path, columns=schema.names).cast(schema)
+
+
+def _ids(table: pa.Table, column: str) -> np.ndarray:
+    """Hand a non-null integer column to NumPy, without copying single-chunk columns."""
+    array = table.column(column).combine_chunks()
+    return array.to_numpy(zero_copy_only=True).astype(np.int64, copy=False)
+
+
+def _id_map(source_ids: np.ndarray, target_ids: np.ndarray) -> np.ndarray:
+    """Lookup array translating exported row IDs to local ones (-1 when unmapped)."""
+    id_map = np.full(int(source_ids.max(initial=0)) + 1, -1, dtype=np.int64)
+    id_map[source_ids] = target_ids
+    return id_map
+
+
+def _remap(id_map: np.ndarray, source_ids: np.ndarray) -> np.ndarray:
+    """Translate exported IDs through an ID map; IDs outside it become -1."""
+    inside = source_ids < len(id_map)
+    return np.where(inside, id_map[np.where(inside, source_ids, 0)], -1)
+
+
+def _import_riders(db: Session, riders: pa.Table) -> np.ndarray:
+    """Match or create the exported riders and return their ID map."""
+    source_ids = _ids(riders, 'id')
+    names = riders.column('name').to_pylist()
+    entries = zip(
+        names,
+        riders.column('pcs_id').to_pylist(),
+        riders.column('team').to_pylist(),
+        riders.column('country').to_pylist()
+    )
+    resolved = resolve_riders_bulk(db, list(entries))
+    return _id_map(source_ids, np.array([resolved.get(name.strip(), -1) for name in names], dtype=np.int64))
+
+
+def _import_races(db: Session, races: pa.Table) -> Tuple[np.ndarray, int]:
+    """
+    Match or create the exported races. Does not commit.
+
+    Returns:
+        Tuple of (ID map of the newly created races only, number created)
+    """
+    source_ids = _ids(races, 'id')
+    rows = races.to_pylist()
+    keys = [make_name_key(row['name']) for row in rows]
+
+    by_pcs_id = get_race_ids_by_pcs_ids(db, [row['pcs_id'] for row in rows if row['pcs_id']])
+    by_key = get_race_ids_by_name_keys(db, keys)
+    target_ids = np.array([
+        by_pcs_id.get(row['pcs_id'], by_key.get((key, row['date']), -1)) if row['pcs_id']
+        else by_key.get((key, row['date']), -1)
+        for row, key in zip(rows, keys)
+    ], dtype=np.int64)
+    new_races = target_ids == -1
+
+    created = [
+        {
+            'pcs_id': row['pcs_id'],
+            'name': row['name'],
+            'name_key': key,
+            'category': parse_race_category(row['category']),
+            'date': row['date'],
+            'season': row['season'],
+            'country': row['country'],
+            'is_stage_race': 1 if row['is_stage_race'] else 0,
+            'stage_number': row['stage_number']
+        }
+        for row, key, is_new in zip(rows, keys, new_races) if is_new
+    ]
+
+    if created:
+        inserted = db.execute(
+            insert(Race).returning(Race.id, sort_by_parameter_order=True), created
+        ).scalars().all()
+        target_ids[new_races] = inserted
+
+    race_map = _id_map(source_ids, target_ids)
+
+    parents = [
+        {'id': int(target_id), 'parent_race_id': int(race_map[row['parent_race_id']])}
+        for row, target_id, is_new in zip(rows, target_ids, new_races)
+        if is_new and row['parent_race_id'] is not None and row['parent_race_id'] < len(race_map)
+        and race_map[row['parent_race_id']] != -1
+    ]
+    if parents:
+        db.execute(update(Race), parents)
+    if created:
+        bump_ratings_version(db)
+
+    return _id_map(source_ids, np.where(new_races, target_ids, -1)), int(new_races.sum())
+
+
+def _linked_rows(table: pa.Table, race_map: np.ndarray, rider_map: np.ndarray) -> List[Dict]:
+    """Rows of a table whose race (and rider) map to local IDs, with IDs translated."""
+    if table.num_rows == 0:
+        return []
+
+    keep = np.ones(table.num_rows, dtype=bool)
+    race_ids = None
+    rider_ids = None
+
+    if 'race_id' in table.column_names:
+        race_column = table.column('race_id')
+        known = ~race_column.is_null().to_numpy(zero_copy_only=False)
+        source = race_column.fill_null(0).combine_chunks().to_numpy(zero_copy_only=False).astype(np.int64)
+        race_ids = _remap(race_map, source)
+        keep &= known & (race_ids != -1)
+
+    if 'rider_id' in table.column_names:
+        rider_ids = _remap(rider_map, _ids(table, 'rider_id'))
+        keep &= rider_ids != -1
+
+    rows = table.filter(pa.array(keep)).to_pylist()
+    if race_ids is not None:
+        for row, race_id in zip(rows, race_ids[keep].tolist()):
+            row['race_id'] = race_id
+    if rider_ids is not None:
+        for row, rider_id in zip(rows, rider_ids[keep].tolist()):
+            row['rider_id'] = rider_id
+    return rows
+
+
+def _insert_linked(db: Session, model, table: pa.Table, race_map: np.ndarray, rider_map: np.ndarray) -> int:
+    """Bulk insert the rows of a race-linked table, with IDs translated."""
+    rows = _linked_rows(table, race_map, rider_map)
+    for row in rows:
+        for flag in ('is_stage_race', 'did_not_finish', 'did_not_start'):
+            if flag in row:
+                row[flag] = 1 if row[flag] else 0
+    if rows:
+        db.execute(insert(model), rows)
+    return len(rows)
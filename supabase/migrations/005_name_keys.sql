@@ -0,0 +1,56 @@
+-- ============================================================================
+-- NORMALIZED NAME KEYS
+-- Accent-folded, lowercased, punctuation-free names for exact indexed lookups
+-- ("Pogačar" and "Pogacar" share a key). Must match make_name_key() in
+-- src/models/naming.py.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION make_name_key(name TEXT)
+RETURNS TEXT AS $$
+    SELECT NULLIF(
+        btrim(regexp_replace(lower(public.unaccent('public.unaccent', name)), '[^[:alnum:]]+', ' ', 'g')),
+        ''
+    );
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+ALTER TABLE riders ADD COLUMN IF NOT EXISTS name_key VARCHAR(255);
+ALTER TABLE races ADD COLUMN IF NOT EXISTS name_key VARCHAR(255);
+
+-- Backfill, leaving later duplicates NULL so the unique indexes can be built
+UPDATE riders r
+SET name_key = make_name_key(r.name)
+WHERE r.name_key IS NULL
+  AND r.id = (
+      SELECT MIN(d.id) FROM riders d
+      WHERE make_name_key(d.name) = make_name_key(r.name)
+  );
+
+UPDATE races r
+SET name_key = make_name_key(r.name)
+WHERE r.name_key IS NULL
+  AND r.id = (
+      SELECT MIN(d.id) FROM races d
+      WHERE make_name_key(d.name) = make_name_key(r.name) AND d.date = r.date
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_riders_name_key ON riders(name_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_races_name_key_date ON races(name_key, date);
+
+-- Keep keys in sync on insert and rename
+CREATE OR REPLACE FUNCTION update_name_key_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.name_key = make_name_key(NEW.name);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_riders_name_key
+    BEFORE INSERT OR UPDATE OF name ON riders FOR EACH ROW
+    EXECUTE FUNCTION update_name_key_column();
+
+CREATE TRIGGER update_races_name_key
+    BEFORE INSERT OR UPDATE OF name ON races FOR EACH ROW
+    EXECUTE FUNCTION update_name_key_column();
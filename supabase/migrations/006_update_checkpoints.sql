@@ -0,0 +1,22 @@
+-- ============================================================================
+-- UPDATE CHECKPOINTS
+-- Dates and race pages completed by the historical backfill, so an
+-- interrupted run resumes where it stopped.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS update_checkpoints (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    key VARCHAR(500) NOT NULL,
+    completed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_update_checkpoints_kind_key ON update_checkpoints(kind, key);
+
+ALTER TABLE update_checkpoints ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated full access to update_checkpoints"
+    ON update_checkpoints FOR ALL
+    TO authenticated
+    USING (true)
+    WITH CHECK (true);
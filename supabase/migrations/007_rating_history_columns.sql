@@ -0,0 +1,41 @@
+-- ============================================================================
+-- COLUMNAR RATING HISTORY
+-- One integer column per rating dimension instead of a JSONB snapshot, so
+-- history charts and time-travel queries read only the columns they need.
+-- Must match RatingHistory in src/models/rider.py.
+-- ============================================================================
+
+ALTER TABLE rating_history
+    ADD COLUMN IF NOT EXISTS flat INTEGER,
+    ADD COLUMN IF NOT EXISTS cobbles INTEGER,
+    ADD COLUMN IF NOT EXISTS mountain INTEGER,
+    ADD COLUMN IF NOT EXISTS time_trial INTEGER,
+    ADD COLUMN IF NOT EXISTS sprint INTEGER,
+    ADD COLUMN IF NOT EXISTS gc INTEGER,
+    ADD COLUMN IF NOT EXISTS one_day INTEGER,
+    ADD COLUMN IF NOT EXISTS endurance INTEGER,
+    ADD COLUMN IF NOT EXISTS overall INTEGER;
+
+-- Copy existing snapshots; overall comes from overall_after (see 003)
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'rating_history' AND column_name = 'ratings'
+    ) THEN
+        UPDATE rating_history SET
+            flat = (ratings->>'flat')::INTEGER,
+            cobbles = (ratings->>'cobbles')::INTEGER,
+            mountain = (ratings->>'mountain')::INTEGER,
+            time_trial = (ratings->>'time_trial')::INTEGER,
+            sprint = (ratings->>'sprint')::INTEGER,
+            gc = (ratings->>'gc')::INTEGER,
+            one_day = (ratings->>'one_day')::INTEGER,
+            endurance = (ratings->>'endurance')::INTEGER,
+            overall = COALESCE((ratings->>'overall')::INTEGER, overall_after);
+
+        ALTER TABLE rating_history DROP COLUMN ratings;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_rating_history_rider_id_date ON rating_history(rider_id, date);
@@ -0,0 +1,37 @@
+-- ============================================================================
+-- RATING SNAPSHOTS
+-- Every rider's ratings at the start of each month, built from rating history
+-- strictly before that date. Point-in-time queries read the latest snapshot
+-- and only the history recorded after it. Must match RatingSnapshot in
+-- src/models/rating_snapshot.py.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS rating_snapshots (
+    id SERIAL PRIMARY KEY,
+    snapshot_date TIMESTAMPTZ NOT NULL,
+    rider_id INTEGER NOT NULL REFERENCES riders(id) ON DELETE CASCADE,
+    flat INTEGER,
+    cobbles INTEGER,
+    mountain INTEGER,
+    time_trial INTEGER,
+    sprint INTEGER,
+    gc INTEGER,
+    one_day INTEGER,
+    endurance INTEGER,
+    overall INTEGER
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rating_snapshots_date_rider_id ON rating_snapshots(snapshot_date, rider_id);
+
+ALTER TABLE rating_snapshots ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to rating_snapshots"
+    ON rating_snapshots FOR SELECT
+    TO anon
+    USING (true);
+
+CREATE POLICY "Allow authenticated full access to rating_snapshots"
+    ON rating_snapshots FOR ALL
+    TO authenticated
+    USING (true)
+    WITH CHECK (true);
@@ -0,0 +1,61 @@
+-- ============================================================================
+-- LEADERBOARD
+-- Each rider's rank per rating dimension ('overall' included), ordered by
+-- rating descending and then rider ID. Kept up to date by the rating engine
+-- for the riders a race touches. Must match LeaderboardEntry in
+-- src/models/leaderboard.py.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS leaderboard (
+    id SERIAL PRIMARY KEY,
+    dimension VARCHAR(50) NOT NULL,
+    rank INTEGER NOT NULL,
+    rider_id INTEGER NOT NULL REFERENCES riders(id) ON DELETE CASCADE,
+    rating INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_leaderboard_dimension_rank ON leaderboard(dimension, rank);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leaderboard_dimension_rider_id ON leaderboard(dimension, rider_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_dimension_rating ON leaderboard(dimension, rating);
+
+-- Rank the riders already rated. 003 rebuilt rider_ratings without the
+-- per-dimension columns, so dimensions missing from it are left unranked.
+DO $$
+DECLARE
+    dimensions TEXT;
+BEGIN
+    SELECT string_agg(
+               format('(%L, %s)', d.dimension,
+                      CASE WHEN c.column_name IS NULL THEN 'NULL::INTEGER' ELSE format('r.%I', d.dimension) END),
+               ', ' ORDER BY d.position)
+    INTO dimensions
+    FROM unnest(ARRAY['flat', 'cobbles', 'mountain', 'time_trial', 'sprint', 'gc', 'one_day', 'endurance', 'overall'])
+         WITH ORDINALITY AS d(dimension, position)
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = current_schema() AND c.table_name = 'rider_ratings' AND c.column_name = d.dimension;
+
+    EXECUTE format($seed$
+        INSERT INTO leaderboard (dimension, rank, rider_id, rating)
+        SELECT d.dimension,
+               ROW_NUMBER() OVER (PARTITION BY d.dimension ORDER BY d.rating DESC, r.rider_id),
+               r.rider_id,
+               d.rating
+        FROM rider_ratings r
+        CROSS JOIN LATERAL (VALUES %s) AS d(dimension, rating)
+        WHERE d.rating IS NOT NULL
+        ON CONFLICT (dimension, rider_id) DO NOTHING
+    $seed$, dimensions);
+END $$;
+
+ALTER TABLE leaderboard ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to leaderboard"
+    ON leaderboard FOR SELECT
+    TO anon
+    USING (true);
+
+CREATE POLICY "Allow authenticated full access to leaderboard"
+    ON leaderboard FOR ALL
+    TO authenticated
+    USING (true)
+    WITH CHECK (true);
@@ -0,0 +1,16 @@
+-- ============================================================================
+-- QUERY INDEXES
+-- Indexes for the hot queries: a race's classified finishers in order, a
+-- rider's results, and the rating history rows written by a race. The
+-- leaderboard's unique index is rebuilt rider-first so updates can load all
+-- dimensions of the touched riders. Must match the models in src/models/.
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_race_results_race_id_status_position
+    ON race_results(race_id, did_not_finish, did_not_start, position);
+CREATE INDEX IF NOT EXISTS idx_race_results_rider_id_race_id ON race_results(rider_id, race_id);
+
+CREATE INDEX IF NOT EXISTS idx_rating_history_race_id ON rating_history(race_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leaderboard_rider_id_dimension ON leaderboard(rider_id, dimension);
+DROP INDEX IF EXISTS idx_leaderboard_dimension_rider_id;
@@ -0,0 +1,25 @@
+-- ============================================================================
+-- DATA VERSIONS
+-- Named change counters. "ratings" is bumped in the same transaction as every
+-- write to riders, races, results or ratings, and the Streamlit pages key
+-- their cached queries on it. Must match DataVersion in
+-- src/models/data_version.py.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE data_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to data_versions"
+    ON data_versions FOR SELECT
+    TO anon
+    USING (true);
+
+CREATE POLICY "Allow authenticated full access to data_versions"
+    ON data_versions FOR ALL
+    TO authenticated
+    USING (true)
+    WITH CHECK (true);
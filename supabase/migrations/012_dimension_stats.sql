@@ -0,0 +1,64 @@
+-- ============================================================================
+-- DIMENSION STATISTICS
+-- Running totals over rider_ratings: the rider count, the sum of each rating
+-- dimension and the sum of each product of two dimensions. The rating engine
+-- applies every rating change to them, and the Analytics page derives means,
+-- standard deviations and correlations from these rows alone. Must match
+-- DimensionStat in src/models/dimension_stat.py.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS dimension_stats (
+    name VARCHAR(50) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+-- Total the riders already rated (an empty table is computed on first use).
+-- 003 rebuilt rider_ratings without the per-dimension columns; dimensions
+-- missing from it still get their rows, totalling 0.
+DO $$
+DECLARE
+    dimensions TEXT;
+BEGIN
+    SELECT string_agg(
+               format('(%L, %s, %s)', d.dimension, d.position,
+                      CASE WHEN c.column_name IS NULL THEN 'NULL::INTEGER' ELSE format('r.%I', d.dimension) END),
+               ', ' ORDER BY d.position)
+    INTO dimensions
+    FROM unnest(ARRAY['flat', 'cobbles', 'mountain', 'time_trial', 'sprint', 'gc', 'one_day', 'endurance', 'overall'])
+         WITH ORDINALITY AS d(dimension, position)
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = current_schema() AND c.table_name = 'rider_ratings' AND c.column_name = d.dimension;
+
+    EXECUTE format($seed$
+        WITH ratings AS (
+            SELECT r.id, d.dimension, d.position, d.rating::BIGINT AS rating
+            FROM rider_ratings r
+            CROSS JOIN LATERAL (VALUES %s) AS d(dimension, position, rating)
+        )
+        INSERT INTO dimension_stats (name, value)
+        SELECT 'count', COUNT(*) FROM rider_ratings HAVING COUNT(*) > 0
+        UNION ALL
+        SELECT 'sum:' || dimension, COALESCE(SUM(rating), 0)
+        FROM ratings
+        GROUP BY dimension
+        UNION ALL
+        SELECT 'product:' || a.dimension || ':' || b.dimension, COALESCE(SUM(a.rating * b.rating), 0)
+        FROM ratings a
+        JOIN ratings b ON b.id = a.id AND b.position >= a.position
+        GROUP BY a.dimension, b.dimension
+        ON CONFLICT (name) DO NOTHING
+    $seed$, dimensions);
+END $$;
+
+ALTER TABLE dimension_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to dimension_stats"
+    ON dimension_stats FOR SELECT
+    TO anon
+    USING (true);
+
+CREATE POLICY "Allow authenticated full access to dimension_stats"
+    ON dimension_stats FOR ALL
+    TO authenticated
+    USING (true)
+    WITH CHECK (true);
@@ -0,0 +1,131 @@
+"""Tests for the Analytics page aggregates."""
+
+import pytest
+import random
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.base import Base
+from src.models import Rider, RiderRating, Race
+from src.models.race import RaceCategory
+from src.services.leaderboard import Leaderboard
+from src.utils import analytics
+from config.settings import settings
+
+
+@pytest.fixture
+def db_session():
+    """Create a test database session."""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def ratings(db_session):
+    """Rate 37 riders with correlated random ratings and return them as a DataFrame."""
+    rng = random.Random(7)
+    rows = []
+    for rider_id in range(1, 38):
+        base = rng.randint(1300, 1700)
+        row = {dim: base + rng.randint(-150, 150) for dim in settings.dimensions}
+        row['overall'] = round(sum(row.values()) / len(row))
+        races = rng.randint(0, 12)
+        wins = rng.randint(0, races)
+        row.update(races_count=races, wins_count=wins, podiums_count=min(races, wins + 1))
+        rows.append(row)
+
+        db_session.add(Rider(id=rider_id, name=f'Rider {rider_id:02d}'))
+        db_session.add(RiderRating(rider_id=rider_id, **row))
+    db_session.flush()
+    Leaderboard(db_session).rebuild()
+    db_session.commit()
+
+    frame = pd.DataFrame(rows, index=range(1, 38))
+    frame['name'] = [f'Rider {rider_id:02d}' for rider_id in frame.index]
+    return frame
+
+
+class TestAnalytics:
+    """Test suite checking the SQL aggregates against pandas on the raw rows."""
+
+    def test_empty_database(self, db_session):
+        """Test that every aggregate handles a database without data."""
+        assert analytics.get_overview(db_session) == {'riders': 0, 'races': 0, 'results': 0, 'avg_rating': None}
+        assert analytics.get_dimension_moments(db_session) is None
+        assert analytics.get_dimension_quartiles(db_session) == {}
+        assert analytics.get_races_by_category(db_session) == {}
+        assert analytics.get_races_by_month(db_session) == []
+        assert analytics.get_best_win_rates(db_session) == []
+
+    def test_moments_match_pandas(self, db_session, ratings):
+        """Test mean, sample SD and correlation against pandas."""
+        moments = analytics.get_dimension_moments(db_session)
+        frame = ratings[settings.dimensions]
+        correlation = frame.corr()
+
+        assert moments['count'] == len(frame)
+        for dim in settings.dimensions:
+            assert moments['mean'][dim] == pytest.approx(frame[dim].mean())
+            assert moments['sd'][dim] == pytest.approx(frame[dim].std())
+            for other in settings.dimensions:
+                assert moments['correlation'][dim][other] == pytest.approx(correlation.loc[dim, other])
+
+    def test_quartiles_match_pandas(self, db_session, ratings):
+        """Test the box plot statistics against pandas quantiles and 1.5 IQR whiskers."""
+        quartiles = analytics.get_dimension_quartiles(db_session)
+
+        for dim in settings.dimensions:
+            values = ratings[dim]
+            q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+            reach = 1.5 * (q3 - q1)
+            stats = quartiles[dim]
+
+            assert stats['min'] == values.min()
+            assert stats['max'] == values.max()
+            assert stats['q1'] == pytest.approx(q1)
+            assert stats['median'] == pytest.approx(median)
+            assert stats['q3'] == pytest.approx(q3)
+            assert stats['lowerfence'] == values[values >= q1 - reach].min()
+            assert stats['upperfence'] == values[values <= q3 + reach].max()
+
+    def test_overview_and_rider_tables(self, db_session, ratings):
+        """Test the overview, most active riders and best win rates against pandas."""
+        overview = analytics.get_overview(db_session)
+        assert overview['riders'] == len(ratings)
+        assert overview['avg_rating'] == pytest.approx(ratings['overall'].mean())
+
+        active = analytics.get_most_active_riders(db_session, limit=5)
+        assert [rider['races'] for rider in active] == sorted(ratings['races_count'], reverse=True)[:5]
+
+        eligible = ratings[ratings['races_count'] >= 5].copy()
+        eligible['win_rate'] = eligible['wins_count'] * 100.0 / eligible['races_count']
+        expected = eligible.sort_values(
+            ['win_rate', 'wins_count', 'name'], ascending=[False, False, True]
+        ).head(10)
+
+        best = analytics.get_best_win_rates(db_session, min_races=5, limit=10)
+        assert [rider['name'] for rider in best] == list(expected['name'])
+        assert [rider['win_rate'] for rider in best] == pytest.approx(list(expected['win_rate']))
+
+    def test_race_counts(self, db_session):
+        """Test races grouped by category and by month."""
+        dates = [datetime(2024, 3, 2), datetime(2024, 3, 30), datetime(2024, 4, 7), datetime(2025, 1, 20)]
+        categories = [RaceCategory.WT, RaceCategory.WT, RaceCategory.MONUMENT, RaceCategory.WT]
+        for index, (race_date, category) in enumerate(zip(dates, categories)):
+            db_session.add(Race(name=f'Race {index}', date=race_date, category=category, season=race_date.year))
+        db_session.commit()
+
+        assert analytics.get_races_by_category(db_session) == {
+            RaceCategory.WT.value: 3, RaceCategory.MONUMENT.value: 1
+        }
+        assert analytics.get_races_by_month(db_session) == [
+            {'month': '2024-03', 'count': 2},
+            {'month': '2024-04', 'count': 1},
+            {'month': '2025-01', 'count': 1}
+        ]
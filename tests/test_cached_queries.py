@@ -0,0 +1,103 @@
+"""Tests for the version-keyed page query cache."""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip('streamlit')
+
+from streamlit.testing.v1 import AppTest
+
+from src.models.base import Base
+from src.services.rating_engine import RatingEngine
+from src.utils import cached_queries
+from src.utils.db_helpers import add_rider, add_race, add_race_results_bulk
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """Point the cache layer at an in-memory database shared by all sessions."""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(cached_queries, 'SessionLocal', factory)
+
+    for function in (cached_queries.load_top_riders, cached_queries.load_summary,
+                     cached_queries.load_rider_names, cached_queries.load_rider_profile,
+                     cached_queries.load_analytics, cached_queries.load_specialists):
+        function.clear()
+
+    yield factory
+    engine.dispose()
+
+
+def count_statements(factory):
+    statements = []
+    event.listen(factory.kw['bind'], 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestCachedQueries:
+    """Test suite for reads cached on the ratings version."""
+
+    def test_reads_are_cached_until_a_write(self, session_factory):
+        """Test that reruns hit the cache and a rating update invalidates it exactly."""
+        db = session_factory()
+        riders = [add_rider(db, name=f'Rider {i}') for i in range(3)]
+
+        def rate_race(name, day, order):
+            race = add_race(db, name=name, date=datetime(2024, 3, day), characteristics={'flat_weight': 1.0})
+            add_race_results_bulk(db, race.id, [
+                {'rider_id': rider.id, 'position': position} for position, rider in enumerate(order, 1)
+            ])
+            RatingEngine(db).update_ratings_for_race(race.id)
+
+        def page():
+            # Results are only written to the cache inside a script run
+            import streamlit as st
+            from src.utils import cached_queries
+            riders = cached_queries.load_top_riders(cached_queries.ratings_version(), 'flat', 10)
+            st.write(f"{riders[0]['name']} {riders[0]['rating']}")
+
+        rate_race('Race 1', 1, riders)
+        app = AppTest.from_function(page)
+        statements = count_statements(session_factory)
+
+        app.run()
+        first_run = len(statements)
+        app.run()
+
+        # A rerun only reads the version
+        assert len(statements) == first_run + 1
+        leader = app.markdown[0].value
+        assert leader.startswith('Rider 0')
+
+        rate_race('Race 2', 2, list(reversed(riders)))
+        statements.clear()
+        app.run()
+
+        assert len(statements) == first_run
+        assert app.markdown[0].value != leader
+        db.close()
+
+    def test_rider_profile(self, session_factory):
+        """Test that the profile bundle survives the session that loaded it."""
+        db = session_factory()
+        rider = add_rider(db, name='Rider A', team='Team A')
+        race = add_race(db, name='Race', date=datetime(2024, 3, 1), characteristics={'flat_weight': 1.0})
+        add_race_results_bulk(db, race.id, [{'rider_id': rider.id, 'position': 1}])
+        RatingEngine(db).update_ratings_for_race(race.id)
+        db.close()
+
+        version = cached_queries.ratings_version()
+        profile = cached_queries.load_rider_profile(version, 'Rider A')
+
+        assert cached_queries.load_rider_names(version) == ['Rider A']
+        assert profile['team'] == 'Team A'
+        assert profile['ratings']['wins'] == 1
+        assert len(profile['history']) == 1
+        assert profile['results'][0]['race'] == 'Race'
+        assert cached_queries.load_rider_profile(version, 'Nobody') is None
+        assert cached_queries.load_summary(version)['top_rider']['name'] == 'Rider A'
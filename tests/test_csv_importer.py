@@ -0,0 +1,273 @@
+"""Tests for the CSV importer."""
+
+import pytest
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models.base import Base
+from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics
+from src.utils.csv_importer import CSVImporter
+from src.utils.db_helpers import add_rider, add_race, IN_CHUNK_SIZE
+from src.utils.race_templates import RaceTemplates
+
+
+@pytest.fixture
+def db_session():
+    """Create a test database session."""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write CSV text to a temporary file and return its path."""
+    def write(content, name='import.csv'):
+        path = tmp_path / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+    return write
+
+
+class TestImportRiders:
+    """Test suite for rider imports."""
+
+    def test_imports_riders_with_ratings(self, db_session, write_csv):
+        """Test that riders and their initial ratings are created."""
+        add_rider(db_session, name='Tadej Pogacar')
+        path = write_csv(
+            "name,team,country,pcs_id\n"
+            "Tadej Pogačar,UAE Team Emirates,Slovenia,tadej-pogacar\n"
+            "Jonas Vingegaard,Visma-Lease a Bike,Denmark,jonas-vingegaard\n"
+            ",No Name Team,,\n"
+            "Primož Roglič,,Slovenia,\n"
+        )
+
+        result = CSVImporter(db_session).import_riders_from_csv(path)
+
+        assert result['success'] == 3
+        assert result['error_details'] == ["Row 3: Missing rider name"]
+        assert db_session.query(Rider).count() == 3
+        assert db_session.query(RiderRating).count() == 2  # Existing rider keeps its row
+        jonas = db_session.query(Rider).filter(Rider.pcs_id == 'jonas-vingegaard').one()
+        assert (jonas.team, jonas.country) == ('Visma-Lease a Bike', 'Denmark')
+
+    def test_duplicate_riders_are_reported(self, db_session, write_csv):
+        """Test that repeated pcs_ids and names are dropped instead of failing the import."""
+        path = write_csv(
+            "name,team,country,pcs_id\n"
+            "Tadej Pogačar,UAE Team Emirates,Slovenia,tadej-pogacar\n"
+            "Tadej Pogacar Jr,UAE Team Emirates,Slovenia,tadej-pogacar\n"
+            "Jonas Vingegaard,Visma-Lease a Bike,Denmark,\n"
+            "JONAS VINGEGAARD,,,jonas-vingegaard\n"
+        )
+
+        result = CSVImporter(db_session).import_riders_from_csv(path)
+
+        assert result['success'] == 2
+        assert result['error_details'] == [
+            "Row 2: Duplicate pcs_id 'tadej-pogacar', already in row 1",
+            "Row 4: Duplicate name 'JONAS VINGEGAARD', already in row 3"
+        ]
+        assert db_session.query(Rider.name).order_by(Rider.id).all() == [('Tadej Pogačar',), ('Jonas Vingegaard',)]
+        assert db_session.query(RiderRating).count() == 2
+
+    def test_missing_column(self, db_session, write_csv):
+        """Test that a file without a name column is rejected."""
+        result = CSVImporter(db_session).import_riders_from_csv(write_csv("team\nUAE\n"))
+
+        assert result['success'] == 0
+        assert 'name' in result['message']
+
+
+class TestImportRaces:
+    """Test suite for race imports."""
+
+    def test_templates_and_custom_characteristics(self, db_session, write_csv):
+        """Test that template and custom weight rows are imported in one pass."""
+        path = write_csv(
+            "name,date,category,country,template,flat,cobbles,mountain,tt,sprint,gc,oneday,endurance\n"
+            "Paris-Roubaix,2024-04-07,Monument,France,Paris-Roubaix,,,,,,,,\n"
+            "Custom Stage,2024-07-14,GT,France,,0.1,0.0,1.0,0.0,0.0,0.9,0.0,0.8\n"
+            "Bad Weights,2024-07-15,GT,France,,abc,0,0,0,0,0,0,0\n"
+            "Bad Date,not a date,GT,France,Mountain Stage,,,,,,,,\n"
+            "Unknown Template,2024-07-16,WT,France,No Such Template,,,,,,,,\n"
+            "Paris-Roubaix,2024-04-07,Monument,France,Paris-Roubaix,,,,,,,,\n"
+        )
+
+        result = CSVImporter(db_session).import_races_from_csv(path)
+
+        assert result['success'] == 3
+        assert [error.split(':')[0] for error in result['error_details']] == ['Row 3', 'Row 4', 'Row 5']
+        assert db_session.query(Race).count() == 2
+
+        roubaix = db_session.query(Race).filter(Race.name == 'Paris-Roubaix').one()
+        assert roubaix.category.value == 'Monument'
+        assert roubaix.characteristics.cobbles_weight == RaceTemplates.get_template('Paris-Roubaix')['cobbles_weight']
+
+        custom = db_session.query(Race).filter(Race.name == 'Custom Stage').one()
+        assert custom.characteristics.mountain_weight == 1.0
+        assert custom.season == 2024
+
+    def test_existing_races_are_matched(self, db_session, write_csv):
+        """Test that races already stored on the same date are not inserted again."""
+        add_race(db_session, name='Milano-Sanremo', date=datetime(2024, 3, 16))
+        path = write_csv("name,date\nMilano-Sanremo,2024-03-16\nMilano-Sanremo,2025-03-22\n")
+
+        result = CSVImporter(db_session).import_races_from_csv(path)
+
+        assert result['success'] == 2
+        assert db_session.query(Race).count() == 2
+        assert db_session.query(RaceCharacteristics).count() == 1
+
+
+class TestImportResults:
+    """Test suite for result imports."""
+
+    def test_imports_results_and_reports_row_errors(self, db_session, write_csv):
+        """Test that valid rows are inserted and invalid ones reported by row."""
+        race = add_race(db_session, name='Test Race', date=datetime(2024, 4, 7))
+        add_rider(db_session, name='Tadej Pogačar')
+        add_rider(db_session, name='Jonas Vingegaard')
+        path = write_csv(
+            "position,rider_name,time_seconds,time_behind_seconds\n"
+            "1,TADEJ POGACAR,14400,0\n"
+            "2,Jonas Vingegaard,14420,20\n"
+            "3,Unknown Rider,14450,50\n"
+            "x,Jonas Vingegaard,,\n"
+        )
+
+        result = CSVImporter(db_session).import_results_from_csv(path, race.id)
+
+        assert result['success'] == 2
+        assert result['error_details'] == ["Row 3: Rider 'Unknown Rider' not found", "Row 4: Invalid position 'x'"]
+
+        results = db_session.query(RaceResult).order_by(RaceResult.position).all()
+        assert [(r.position, r.time_seconds, r.time_behind_seconds) for r in results] == [(1, 14400, None), (2, 14420, 20)]
+
+    def test_large_file_uses_batched_statements(self, db_session, write_csv):
+        """Test that a 50k-row sheet imports quickly with a bounded number of statements."""
+        race = add_race(db_session, name='Big Race', date=datetime(2024, 4, 7))
+        CSVImporter(db_session).import_riders_from_csv(
+            write_csv("name\n" + "\n".join(f"Rider {i}" for i in range(2000)), 'riders.csv')
+        )
+        path = write_csv(
+            "position,rider_name,time_seconds\n"
+            + "\n".join(f"{i + 1},Rider {i % 2000},{14400 + i}" for i in range(50000))
+        )
+
+        statements = []
+        event.listen(db_session.bind, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        started = time.perf_counter()
+        result = CSVImporter(db_session).import_results_from_csv(path, race.id)
+        elapsed = time.perf_counter() - started
+
+        assert result['success'] == 50000
+        assert result['errors'] == 0
+        assert db_session.query(RaceResult).count() == 50000
+        assert len([s for s in statements if 'FROM riders' in s]) == 2000 // IN_CHUNK_SIZE
+        # One bulk INSERT, sent by the driver in pages of 1000 rows
+        assert len([s for s in statements if s.startswith('INSERT')]) == 50000 // 1000
+        assert elapsed < 10
+
+
+class TestImportResultsStream:
+    """Test suite for streamed multi-race result imports."""
+
+    @pytest.fixture
+    def archive(self, db_session, write_csv):
+        """Two races, three riders and a five-row results archive."""
+        add_race(db_session, name='Paris-Roubaix', date=datetime(2024, 4, 7))
+        add_race(db_session, name='Paris-Roubaix', date=datetime(2023, 4, 9), pcs_id='race/paris-roubaix/2023')
+        for name in ('Mathieu van der Poel', 'Jasper Philipsen', 'Mads Pedersen'):
+            add_rider(db_session, name=name)
+        return write_csv(
+            "race_pcs_id,race,race_date,position,rider_name,time_seconds\n"
+            ",Paris-Roubaix,2024-04-07,1,Mathieu van der Poel,19800\n"
+            ",Paris-Roubaix,2024-04-07,2,Jasper Philipsen,19980\n"
+            "race/paris-roubaix/2023,,,1,Mathieu van der Poel,20100\n"
+            ",Paris-Roubaix,2022-04-17,1,Dylan van Baarle,\n"
+            "race/paris-roubaix/2023,,,2,Mads Pedersen,20150\n"
+        )
+
+    def test_imports_many_races_in_chunks(self, db_session, archive):
+        """Test that rows are matched to races by pcs_id or name and date, chunk by chunk."""
+        fractions = []
+        result = CSVImporter(db_session).import_results_stream(
+            archive, chunksize=2, progress=lambda fraction, stats: fractions.append(fraction)
+        )
+
+        assert result['success'] == 4
+        assert result['chunks'] == 3
+        assert result['error_details'] == [
+            "Row 4: Race 'Paris-Roubaix' on 2022-04-17 not found",
+            "Row 4: Rider 'Dylan van Baarle' not found"
+        ]
+        assert fractions[-1] == 1.0
+
+        by_season = {}
+        for result_row in db_session.query(RaceResult):
+            by_season.setdefault(result_row.race.season, []).append(result_row.position)
+        assert {season: sorted(positions) for season, positions in by_season.items()} == {2023: [1, 2], 2024: [1, 2]}
+
+    def test_resumes_after_last_committed_chunk(self, db_session, archive):
+        """Test that an interrupted import continues without duplicating committed rows."""
+        def interrupt(fraction, stats):
+            if stats['chunks'] == 2:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            CSVImporter(db_session).import_results_stream(archive, chunksize=2, progress=interrupt)
+        assert db_session.query(RaceResult).count() == 3
+
+        result = CSVImporter(db_session).import_results_stream(archive, chunksize=2)
+
+        assert result['chunks_skipped'] == 2
+        assert result['chunks'] == 1
+        assert result['success'] == 1
+        assert db_session.query(RaceResult).count() == 4
+
+        restarted = CSVImporter(db_session).import_results_stream(archive, chunksize=2, restart=True)
+        assert restarted['chunks_skipped'] == 0
+        assert db_session.query(RaceResult).count() == 8
+
+    def test_resume_counts_records_not_lines(self, db_session, write_csv):
+        """Test that resuming skips parsed records, not lines, past multiline fields and blank lines."""
+        add_race(db_session, name='Paris-Roubaix', date=datetime(2024, 4, 7))
+        riders = ['Mathieu van der Poel', 'Jasper Philipsen', 'Mads Pedersen', 'Nils Politt']
+        for name in riders:
+            add_rider(db_session, name=name)
+        path = write_csv(
+            "race,race_date,position,rider_name,note\n"
+            'Paris-Roubaix,2024-04-07,1,Mathieu van der Poel,"Solo win\nfrom 60 km"\n'
+            "\n"
+            "Paris-Roubaix,2024-04-07,2,Jasper Philipsen,\n"
+            "Paris-Roubaix,2024-04-07,3,Mads Pedersen,\n"
+            "Paris-Roubaix,2024-04-07,4,Nils Politt,\n"
+        )
+
+        def interrupt(fraction, stats):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            CSVImporter(db_session).import_results_stream(path, chunksize=2, progress=interrupt)
+        result = CSVImporter(db_session).import_results_stream(path, chunksize=2)
+
+        assert result['chunks_skipped'] == 1
+        assert result['success'] == 2
+        positions = db_session.query(RaceResult.position).order_by(RaceResult.position).all()
+        assert [position for position, in positions] == [1, 2, 3, 4]
+
+    def test_missing_race_columns(self, db_session, write_csv):
+        """Test that a file without any race key columns is rejected."""
+        result = CSVImporter(db_session).import_results_stream(write_csv("position,rider_name\n1,A\n"))
+
+        assert result['success'] == 0
+        assert 'race, race_date' in result['message']
@@ -7,8 +7,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.models.base import Base
-from src.models import Rider, Race, RaceResult, RiderRating
+from src.models import Rider, Race, RaceResult, RiderRating, RatingHistory, UpdateCheckpoint
 from src.services.daily_updater import DailyUpdater
+from src.services.update_pipeline import UpdatePipeline
 
 
 @pytest.fixture
@@ -201,6 +202,368 @@ class TestDailyUpdater:
         assert stats['races_failed'] == 1
         assert len(stats['errors']) == 1
 
+    @patch.object(DailyUpdater, '_process_race')
+    def test_run_daily_update_prefetches_new_races(self, mock_process_race, db_session, mock_scraper):
+        """Test that detail pages of races not yet stored are prefetched concurrently."""
+        from src.utils.db_helpers import add_race
+        add_race(db_session, name='Known Race', date=datetime.now(),
+                 characteristics={'flat_weight': 0.5, 'cobbles_weight': 0.0,
+                                  'mountain_weight': 0.8, 'time_trial_weight': 0.0,
+                                  'sprint_weight': 0.2, 'gc_weight': 0.6,
+                                  'one_day_weight': 0.0, 'endurance_weight': 0.7})
+        mock_scraper.get_today_races.return_value = [
+            {'name': 'Known Race', 'url': 'http://test.com/known', 'date': date.today()},
+            {'name': 'New Race', 'url': 'http://test.com/new', 'date': date.today()},
+        ]
+
+        updater = DailyUpdater(db_session, mock_scraper)
+        updater.run_daily_update(date.today())
+
+        mock_scraper.prefetch.assert_called_once_with(['http://test.com/new'])
+        assert mock_process_race.call_count == 2
+
+    def test_run_daily_update_pipelined(self, db_session, mock_scraper):
+        """Test that the pipelined update stores every race and reports stage stats."""
+        characteristics = {'flat_weight': 0.5, 'cobbles_weight': 0.0,
+                           'mountain_weight': 0.8, 'time_trial_weight': 0.0,
+                           'sprint_weight': 0.2, 'gc_weight': 0.6,
+                           'one_day_weight': 0.0, 'endurance_weight': 0.7}
+        mock_scraper.get_today_races.return_value = [
+            {'name': f'Race {i}', 'url': f'http://test.com/race{i}', 'date': date(2024, 6, 1)}
+            for i in range(5)
+        ] + [{'name': 'Broken Race', 'url': 'http://test.com/broken', 'date': date(2024, 6, 1)}]
+        mock_scraper.fetch_race_page.side_effect = lambda url: None if 'broken' in url else url.encode()
+        mock_scraper.parse_race_details.side_effect = lambda url, content: {
+            'name': f'Race {url[-1]}',
+            'date': datetime(2024, 6, 1),
+            'category': 'WT',
+            'characteristics': characteristics,
+            'results': [
+                {'rider_name': 'Rider A', 'position': 1},
+                {'rider_name': 'Rider B', 'position': 2},
+            ]
+        }
+
+        updater = DailyUpdater(db_session, mock_scraper)
+        stats = updater.run_daily_update(date(2024, 6, 1), pipelined=True)
+
+        assert stats['races_processed'] == 5
+        assert stats['races_failed'] == 1
+        assert stats['errors'][0]['race'] == 'Broken Race'
+        assert db_session.query(Race).count() == 5
+        assert stats['ratings_updated'] == 10
+        assert stats['pipeline']['stages']['fetch']['items'] == 6
+        assert stats['pipeline']['stages']['write']['items'] == 6
+        assert 'max_depth' in stats['pipeline']['queues']['parse']
+
+        rating = db_session.query(RiderRating).join(Rider).filter(Rider.name == 'Rider A').first()
+        assert rating.races_count == 5
+
+    def test_rerun_does_not_reapply_ratings(self, db_session, mock_scraper):
+        """Test that storing the same PCS race twice applies its results and ratings once."""
+        race_info = {'name': 'Stage 1', 'url': 'https://www.procyclingstats.com/race/tdf/2024/stage-1',
+                     'pcs_id': 'tdf/2024/stage-1'}
+        race_data = {
+            'name': 'Tour de France Stage 1',
+            'date': datetime(2024, 6, 29),
+            'category': 'GT',
+            'pcs_id': 'tdf/2024/stage-1',
+            'characteristics': {'flat_weight': 0.5, 'cobbles_weight': 0.0,
+                                'mountain_weight': 0.8, 'time_trial_weight': 0.0,
+                                'sprint_weight': 0.2, 'gc_weight': 0.6,
+                                'one_day_weight': 0.0, 'endurance_weight': 0.7},
+            'results': [{'rider_name': 'Rider A', 'position': 1}, {'rider_name': 'Rider B', 'position': 2}]
+        }
+        updater = DailyUpdater(db_session, mock_scraper)
+
+        updater._store_race(race_info, race_data)
+        updater._store_race(race_info, dict(race_data, name='Tour de France - Stage 1'))
+
+        assert updater._find_existing_race(race_info) is not None
+        assert db_session.query(RaceResult).count() == 2
+        assert updater.stats['ratings_updated'] == 2
+        rating = db_session.query(RiderRating).join(Rider).filter(Rider.name == 'Rider A').first()
+        assert rating.races_count == 1
+
+    def test_late_race_triggers_incremental_recompute(self, db_session, mock_scraper):
+        """Test that a race older than the latest rated race is recomputed incrementally."""
+        from src.utils.db_helpers import add_race
+        characteristics = {'flat_weight': 0.5, 'cobbles_weight': 0.0,
+                           'mountain_weight': 0.8, 'time_trial_weight': 0.0,
+                           'sprint_weight': 0.2, 'gc_weight': 0.6,
+                           'one_day_weight': 0.0, 'endurance_weight': 0.7}
+        updater = DailyUpdater(db_session, mock_scraper)
+
+        recent = add_race(db_session, name='Recent Race', date=datetime(2024, 6, 10), characteristics=characteristics)
+        updater._process_results(recent.id, [
+            {'rider_name': 'Rider A', 'position': 1},
+            {'rider_name': 'Rider B', 'position': 2},
+        ])
+        assert updater._update_ratings(recent) == 2
+
+        late = add_race(db_session, name='Late Race', date=datetime(2024, 6, 1), characteristics=characteristics)
+        updater._process_results(late.id, [
+            {'rider_name': 'Rider B', 'position': 1},
+            {'rider_name': 'Rider A', 'position': 2},
+        ])
+
+        with patch.object(updater.rating_engine, 'recompute_from',
+                          wraps=updater.rating_engine.recompute_from) as recompute:
+            assert updater._update_ratings(late) == 2
+            recompute.assert_called_once_with(late.date, race_ids=[late.id])
+
+        rating = db_session.query(RiderRating).join(Rider).filter(Rider.name == 'Rider A').first()
+        db_session.refresh(rating)
+        assert rating.races_count == 2
+
+
+class TestUpdatePipeline:
+    """Test suite for the staged fetch/parse/write pipeline."""
+
+    def test_writes_in_input_order(self):
+        """Test that the writer sees items in input order despite uneven fetch times."""
+        import random
+        import time
+        delays = [random.Random(i).uniform(0, 0.02) for i in range(20)]
+        written = []
+
+        def fetch(item):
+            time.sleep(delays[item])
+            return item * 10
+
+        pipeline = UpdatePipeline(
+            fetch=fetch,
+            parse=lambda item, payload: payload + 1,
+            write=lambda item, result, error: written.append((item, result)),
+            fetch_workers=4, parse_workers=2, queue_size=2
+        )
+        stats = pipeline.run(list(range(20)))
+
+        assert written == [(i, i * 10 + 1) for i in range(20)]
+        assert stats['stages']['parse']['items'] == 20
+        assert stats['queues']['write']['max_depth'] <= 2
+
+    def test_stage_errors_reach_writer(self):
+        """Test that fetch and parse errors are handed to the writer instead of aborting."""
+        written = []
+
+        def fetch(item):
+            if item == 1:
+                raise IOError("fetch failed")
+            return item
+
+        def parse(item, payload):
+            if item == 2:
+                raise ValueError("parse failed")
+            return payload
+
+        pipeline = UpdatePipeline(fetch, parse, lambda item, result, error: written.append((item, result, error)))
+        pipeline.run([0, 1, 2, 3])
+
+        assert [item for item, _, _ in written] == [0, 1, 2, 3]
+        assert isinstance(written[1][2], IOError)
+        assert isinstance(written[2][2], ValueError)
+        assert written[3] == (3, 3, None)
+
+    def test_overlaps_fetching(self):
+        """Test that fetches run concurrently."""
+        import time
+        pipeline = UpdatePipeline(
+            fetch=lambda item: time.sleep(0.05),
+            parse=lambda item, payload: payload,
+            write=lambda item, result, error: None,
+            fetch_workers=4
+        )
+        stats = pipeline.run(list(range(8)))
+
+        assert stats['wall_seconds'] < 0.3  # Serial fetching would take 0.4s
+
+    def test_slow_item_bounds_reorder_buffer(self):
+        """Test that results finishing behind a slow item are not buffered without limit."""
+        import time
+        written = []
+        pipeline = UpdatePipeline(
+            fetch=lambda item: time.sleep(0.2) if item == 0 else None,
+            parse=lambda item, payload: item,
+            write=lambda item, result, error: written.append(result),
+            fetch_workers=4,
+            max_in_flight=6
+        )
+        stats = pipeline.run(list(range(100)))
+
+        assert written == list(range(100))
+        assert stats['queues']['reorder']['max_depth'] <= 6
+
+    def test_writer_error_stops_workers(self):
+        """Test that an exception in the writer propagates and shuts the pipeline down."""
+        def write(item, result, error):
+            raise RuntimeError("database down")
+
+        pipeline = UpdatePipeline(lambda item: item, lambda item, payload: payload, write, queue_size=1)
+
+        with pytest.raises(RuntimeError):
+            pipeline.run(list(range(50)))
+
+
+class TestBackfill:
+    """Test suite for the parallel, resumable historical backfill."""
+
+    CHARACTERISTICS = {'flat_weight': 0.5, 'cobbles_weight': 0.0,
+                       'mountain_weight': 0.8, 'time_trial_weight': 0.0,
+                       'sprint_weight': 0.2, 'gc_weight': 0.6,
+                       'one_day_weight': 0.0, 'endurance_weight': 0.7}
+
+    @pytest.fixture
+    def backfill_scraper(self, mock_scraper):
+        """A scraper with two races a day, one of which fails on June 2nd."""
+        import time
+        mock_scraper.broken = {'http://test.com/2024-06-02/1'}
+
+        def list_races(day):
+            time.sleep(0.01)  # Finish listings out of order under concurrency
+            return [
+                {'name': f'Race {day} {i}', 'url': f'http://test.com/{day}/{i}', 'date': day}
+                for i in range(2)
+            ]
+
+        def fetch_page(url):
+            return None if url in mock_scraper.broken else url.encode()
+
+        def parse(url, content):
+            day = date.fromisoformat(url.split('/')[-2])
+            return {
+                'name': f'Race {day} {url[-1]}',
+                'date': datetime.combine(day, datetime.min.time()),
+                'category': 'WT',
+                'characteristics': self.CHARACTERISTICS,
+                'results': [
+                    {'rider_name': 'Rider A', 'position': 1 + (day.day % 2)},
+                    {'rider_name': 'Rider B', 'position': 2 - (day.day % 2)},
+                ]
+            }
+
+        mock_scraper.get_today_races.side_effect = list_races
+        mock_scraper.fetch_race_page.side_effect = fetch_page
+        mock_scraper.parse_race_details.side_effect = parse
+        return mock_scraper
+
+    def test_backfill_applies_ratings_chronologically(self, db_session, backfill_scraper):
+        """Test that races are rated in date order even though fetching is parallel."""
+        updater = DailyUpdater(db_session, backfill_scraper)
+
+        with patch.object(updater.rating_engine, 'recompute_from', side_effect=AssertionError):
+            stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 3))
+
+        assert stats['success']
+        assert stats['races_processed'] == 5
+        assert stats['races_failed'] == 1
+        assert stats['dates_completed'] == 2
+
+        history_dates = [h.date for h in db_session.query(RatingHistory).order_by(RatingHistory.id)]
+        assert history_dates == sorted(history_dates)
+
+    def test_backfill_resumes_from_checkpoints(self, db_session, backfill_scraper):
+        """Test that a rerun only redoes the dates and races that did not finish."""
+        updater = DailyUpdater(db_session, backfill_scraper)
+        updater.run_backfill(date(2024, 6, 1), date(2024, 6, 3))
+
+        completed = {c.key for c in db_session.query(UpdateCheckpoint).filter(UpdateCheckpoint.kind == 'date')}
+        assert completed == {'2024-06-01', '2024-06-03'}
+
+        backfill_scraper.broken.clear()
+        backfill_scraper.get_today_races.reset_mock()
+        backfill_scraper.fetch_race_page.reset_mock()
+
+        stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 3))
+
+        backfill_scraper.get_today_races.assert_called_once_with(date(2024, 6, 2))
+        backfill_scraper.fetch_race_page.assert_called_once_with('http://test.com/2024-06-02/1')
+        assert stats['dates_skipped'] == 2
+        assert stats['dates_completed'] == 1
+        assert stats['races_failed'] == 0
+        assert db_session.query(Race).count() == 6
+        assert db_session.query(RaceResult).count() == 12
+
+    def test_backfill_restart_walks_completed_dates(self, db_session, backfill_scraper):
+        """Test that restart relists completed dates without duplicating stored races."""
+        backfill_scraper.broken.clear()
+        updater = DailyUpdater(db_session, backfill_scraper)
+        updater.run_backfill(date(2024, 6, 1), date(2024, 6, 2))
+        backfill_scraper.fetch_race_page.reset_mock()
+
+        stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 2), restart=True)
+
+        assert stats['dates_skipped'] == 0
+        assert backfill_scraper.get_today_races.call_count == 4
+        backfill_scraper.fetch_race_page.assert_not_called()
+        assert db_session.query(Race).count() == 4
+
+    def test_rating_failure_after_storing_race_is_retried(self, db_session, backfill_scraper):
+        """Test that a race whose rating fails after it was stored is stored and rated again on the next run."""
+        backfill_scraper.broken.clear()
+        updater = DailyUpdater(db_session, backfill_scraper)
+        update = updater.rating_engine.update_ratings_for_race
+        calls = []
+
+        def fail_first(race_id):
+            calls.append(race_id)
+            if len(calls) == 1:
+                raise RuntimeError('rating failed')
+            return update(race_id)
+
+        with patch.object(updater.rating_engine, 'update_ratings_for_race', side_effect=fail_first):
+            stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 2))
+
+        assert stats['races_failed'] == 1
+        assert stats['dates_completed'] == 1
+        assert db_session.query(Race).count() == 3
+        assert db_session.query(RaceResult).count() == 6
+
+        stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 2))
+
+        assert stats['races_failed'] == 0
+        assert stats['dates_completed'] == 1
+        assert db_session.query(Race).count() == 4
+        assert db_session.query(RaceResult).count() == 8
+        assert db_session.query(RatingHistory).count() == 8
+        rating = db_session.query(RiderRating).join(Rider).filter(Rider.name == 'Rider A').one()
+        db_session.refresh(rating)
+        assert rating.races_count == 4
+
+    def test_deferred_races_that_no_longer_exist_are_dropped(self, db_session, backfill_scraper):
+        """Test that deferred race IDs without a stored race do not reach the recompute."""
+        from src.utils.db_helpers import mark_checkpoint
+        mark_checkpoint(db_session, 'unrated', '999')
+        updater = DailyUpdater(db_session, backfill_scraper)
+
+        with patch.object(updater.rating_engine, 'recompute_from') as recompute:
+            assert updater._rate_deferred_races() == 0
+
+        recompute.assert_not_called()
+        assert db_session.query(UpdateCheckpoint).filter(UpdateCheckpoint.kind == 'unrated').count() == 0
+
+    def test_backfill_before_rated_races_recomputes_once(self, db_session, backfill_scraper):
+        """Test that backfilling races older than the ratings ends with one recompute, not one per race."""
+        backfill_scraper.broken.clear()
+        updater = DailyUpdater(db_session, backfill_scraper)
+        updater.run_backfill(date(2024, 6, 3), date(2024, 6, 3))
+
+        with patch.object(updater.rating_engine, 'recompute_from',
+                          wraps=updater.rating_engine.recompute_from) as recompute:
+            stats = updater.run_backfill(date(2024, 6, 1), date(2024, 6, 2))
+
+        assert stats['success']
+        backfilled = [race.id for race in db_session.query(Race).filter(Race.date < datetime(2024, 6, 3))]
+        recompute.assert_called_once()
+        assert recompute.call_args.args == (datetime(2024, 6, 1),)
+        assert sorted(recompute.call_args.kwargs['race_ids']) == sorted(backfilled)
+        assert db_session.query(UpdateCheckpoint).filter(UpdateCheckpoint.kind == 'unrated').count() == 0
+
+        # Every race is rated, as if the seasons had been processed in order
+        rating = db_session.query(RiderRating).join(Rider).filter(Rider.name == 'Rider A').one()
+        db_session.refresh(rating)
+        assert rating.races_count == 6
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
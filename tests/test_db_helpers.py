@@ -0,0 +1,411 @@
+"""Tests for the database helper functions."""
+
+import pytest
+import random
+from datetime import date, datetime
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.models.base import Base
+from sqlalchemy import text
+
+from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics, RatingHistory, RatingSnapshot
+from src.models.naming import make_name_key
+from src.models.migrations import migrate_name_keys
+from src.utils.db_helpers import (
+    add_rider, add_race, upsert_race, add_race_results_bulk, resolve_riders_bulk,
+    get_rider_by_name, get_race_by_name, get_race_by_pcs_id,
+    get_ratings_as_of, refresh_rating_snapshots, get_ratings_version
+)
+from src.services.rating_engine import RatingEngine
+from src.services.leaderboard import LEADERBOARD_DIMENSIONS
+from src.services.dimension_stats import DimensionStats
+
+
+@pytest.fixture
+def db_session():
+    """Create a test database session."""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def race(db_session):
+    """Create a race for results to belong to."""
+    return add_race(db_session, name='Test Race', date=datetime(2024, 4, 7), category='Monument')
+
+
+class TestAddRaceResultsBulk:
+    """Test suite for add_race_results_bulk."""
+
+    def test_inserts_all_rows_and_returns_ids(self, db_session, race):
+        """Test that every row is inserted and ids come back in order."""
+        riders = [add_rider(db_session, name=f'Rider {i}') for i in range(1, 6)]
+        rows = [
+            {'rider_id': rider.id, 'position': position, 'time_seconds': 14400 + position}
+            for position, rider in enumerate(riders, 1)
+        ]
+
+        result_ids = add_race_results_bulk(db_session, race.id, rows)
+
+        assert len(result_ids) == 5
+        stored = {r.id: r for r in db_session.query(RaceResult).all()}
+        assert [stored[i].position for i in result_ids] == [1, 2, 3, 4, 5]
+        assert stored[result_ids[0]].time_seconds == 14401
+        assert stored[result_ids[0]].did_not_finish == 0
+
+    def test_ids_follow_rows_across_insert_batches(self, db_session, race):
+        """Test that ids match their rows when the sheet spans several multi-row INSERT batches."""
+        db_session.execute(insert(Rider), [{'id': i, 'name': f'Rider {i}'} for i in range(1, 2501)])
+        db_session.commit()
+        rows = [{'rider_id': i, 'position': i} for i in random.Random(3).sample(range(1, 2501), 2500)]
+
+        result_ids = add_race_results_bulk(db_session, race.id, rows)
+
+        stored = dict(db_session.query(RaceResult.id, RaceResult.rider_id))
+        assert [stored[result_id] for result_id in result_ids] == [row['rider_id'] for row in rows]
+
+    def test_single_transaction(self, db_session, race):
+        """Test that the sheet is written with one INSERT and one COMMIT."""
+        rider_ids = [add_rider(db_session, name=f'Rider {i}').id for i in range(1, 51)]
+        race_id = race.id
+        statements = []
+        event.listen(db_session.get_bind(), 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        commits = []
+        event.listen(db_session.get_bind(), 'commit', lambda conn: commits.append(conn))
+
+        add_race_results_bulk(
+            db_session, race_id,
+            [{'rider_id': rider_id, 'position': i} for i, rider_id in enumerate(rider_ids, 1)]
+        )
+
+        inserts = [s for s in statements if s.startswith('INSERT INTO race_results')]
+        selects = [s for s in statements if s.startswith('SELECT')]
+        assert len(inserts) == 1
+        assert selects == []
+        assert len(commits) == 1
+
+    def test_empty_sheet(self, db_session, race):
+        """Test that an empty sheet is a no-op."""
+        assert add_race_results_bulk(db_session, race.id, []) == []
+        assert db_session.query(RaceResult).count() == 0
+
+
+class TestResolveRidersBulk:
+    """Test suite for resolve_riders_bulk."""
+
+    def test_resolves_existing_and_creates_missing(self, db_session):
+        """Test matching on pcs_id and name, and creating the rest with ratings."""
+        by_pcs_id = add_rider(db_session, name='T. Pogačar', pcs_id='tadej-pogacar')
+        by_name = add_rider(db_session, name='Jonas Vingegaard')
+        created = []
+
+        rider_ids = resolve_riders_bulk(db_session, [
+            ('Tadej Pogačar', 'tadej-pogacar', 'UAE'),
+            ('Jonas Vingegaard', None, 'Visma'),
+            ('Remco Evenepoel', 'remco-evenepoel', 'Soudal'),
+            ('Remco Evenepoel', 'remco-evenepoel', 'Soudal'),
+        ], created=created)
+
+        assert rider_ids['Tadej Pogačar'] == by_pcs_id.id
+        assert rider_ids['Jonas Vingegaard'] == by_name.id
+        assert created == ['Remco Evenepoel']
+
+        new_rider = db_session.query(Rider).filter(Rider.id == rider_ids['Remco Evenepoel']).one()
+        assert new_rider.pcs_id == 'remco-evenepoel'
+        assert new_rider.team == 'Soudal'
+        rating = db_session.query(RiderRating).filter(RiderRating.rider_id == new_rider.id).one()
+        assert rating.overall == 1500
+        assert rating.races_count == 0
+
+    def test_repeated_pcs_id_creates_one_rider(self, db_session):
+        """Test that a rider listed twice under different spellings is inserted once."""
+        created = []
+
+        rider_ids = resolve_riders_bulk(db_session, [
+            ('Tom Pidcock', 'thomas-pidcock', 'INEOS'),
+            ('Thomas Pidcock', 'thomas-pidcock', 'INEOS'),
+            ('Wout van Aert', 'wout-van-aert', 'Visma'),
+        ], created=created)
+
+        assert rider_ids['Tom Pidcock'] == rider_ids['Thomas Pidcock']
+        assert created == ['Tom Pidcock', 'Wout van Aert']
+        assert db_session.query(Rider).count() == 2
+        assert db_session.query(RiderRating).count() == 2
+
+    def test_query_count_is_constant(self, db_session):
+        """Test that a large sheet resolves with a fixed number of statements."""
+        add_rider(db_session, name='Existing Rider')
+        DimensionStats(db_session).rebuild()
+        db_session.commit()
+        statements = []
+        event.listen(db_session.get_bind(), 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        rider_ids = resolve_riders_bulk(
+            db_session, [(f'Rider {i}', f'rider-{i}', None) for i in range(200)] + [('Existing Rider', None, None)]
+        )
+
+        assert len(rider_ids) == 201
+        rider_statements = [
+            statement for statement in statements
+            if not any(table in statement for table in ('leaderboard', 'data_versions', 'dimension_stats'))
+        ]
+        assert len(rider_statements) == 5  # pcs_id lookup, name lookup, rider insert, rating insert, rating reload
+        assert len([statement for statement in statements if 'data_versions' in statement]) == 1
+        # Counting them into the dimension statistics is one read and one batched update
+        assert len([statement for statement in statements if 'dimension_stats' in statement]) == 2
+        # Ranking the new riders costs a fixed number of statements per dimension
+        leaderboard_statements = [statement for statement in statements if 'leaderboard' in statement]
+        assert len(leaderboard_statements) == 3 + 2 * len(LEADERBOARD_DIMENSIONS)
+        assert db_session.query(RiderRating).count() == 200
+
+
+class TestUpsertRace:
+    """Test suite for upsert_race."""
+
+    CHARACTERISTICS = {'flat_weight': 0.2, 'mountain_weight': 0.9}
+
+    def test_inserts_once_per_pcs_id(self, db_session):
+        """Test that a rerun returns the stored race instead of inserting again."""
+        race, created = upsert_race(db_session, 'Tour de France Stage 1', datetime(2024, 6, 29), 'GT',
+                                    characteristics=self.CHARACTERISTICS, pcs_id='tour-de-france/2024/stage-1')
+        assert created
+        assert race.name_key == 'tour de france stage 1'
+        assert race.characteristics.mountain_weight == 0.9
+
+        again, created = upsert_race(db_session, 'Tour de France - Stage 1', datetime(2024, 6, 29), 'GT',
+                                     characteristics=self.CHARACTERISTICS, pcs_id='tour-de-france/2024/stage-1')
+        assert not created
+        assert again.id == race.id
+        assert db_session.query(Race).count() == 1
+        assert db_session.query(RaceCharacteristics).count() == 1
+
+    def test_stages_with_distinct_pcs_ids(self, db_session):
+        """Test that different stages on the same day are kept apart by pcs_id."""
+        upsert_race(db_session, 'Tour de France', datetime(2024, 6, 29), pcs_id='tour-de-france/2024/stage-1')
+        _, created = upsert_race(db_session, 'Tour de France Stage 2', datetime(2024, 6, 29),
+                                 pcs_id='tour-de-france/2024/stage-2')
+
+        assert created
+        assert get_race_by_pcs_id(db_session, 'tour-de-france/2024/stage-2').name == 'Tour de France Stage 2'
+
+    def test_falls_back_to_name_and_date(self, db_session, race):
+        """Test that a race stored without pcs_id is matched on name and date."""
+        existing, created = upsert_race(db_session, 'TEST RACE', race.date, pcs_id='test-race/2024')
+
+        assert not created
+        assert existing.id == race.id
+
+    def test_single_statement(self, db_session):
+        """Test that the existence check and insert are one INSERT ... ON CONFLICT."""
+        statements = []
+        event.listen(db_session.bind, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        upsert_race(db_session, 'Milano-Sanremo', datetime(2024, 3, 16), 'Monument', pcs_id='milano-sanremo/2024')
+
+        race_statements = [st for st in statements if 'races' in st and 'race_characteristics' not in st]
+        assert race_statements[0].startswith('INSERT')
+        assert 'ON CONFLICT (pcs_id) DO NOTHING' in race_statements[0]
+
+    def test_split_stages_with_the_same_name(self, db_session):
+        """Test that two PCS races parsing to the same name on one day are both stored."""
+        date = datetime(2024, 5, 4)
+        first, _ = upsert_race(db_session, 'Tour de Romandie', date, pcs_id='tour-de-romandie/2024/stage-1a')
+        second, created = upsert_race(db_session, 'Tour de Romandie', date, pcs_id='tour-de-romandie/2024/stage-1b')
+
+        assert created
+        assert second.id != first.id
+        assert second.name == 'Tour de Romandie (stage-1b)'
+
+        # Reruns find each stage under its own pcs_id
+        again, created = upsert_race(db_session, 'Tour de Romandie', date, pcs_id='tour-de-romandie/2024/stage-1b')
+        assert not created
+        assert again.id == second.id
+
+    def test_unresolvable_collision_is_reported(self, db_session):
+        """Test that a collision the stage suffix cannot resolve raises instead of returning another race."""
+        date = datetime(2024, 5, 4)
+        upsert_race(db_session, 'Race (stage-1b)', date, pcs_id='other-race/2024')
+        upsert_race(db_session, 'Race', date, pcs_id='race/2024/stage-1a')
+
+        with pytest.raises(ValueError, match='collides'):
+            upsert_race(db_session, 'Race', date, pcs_id='race/2024/stage-1b')
+        assert db_session.query(Race).count() == 2
+
+
+class TestNameKeys:
+    """Test suite for normalized name keys."""
+
+    @pytest.mark.parametrize('name, expected', [
+        ('Tadej Pogačar', 'tadej pogacar'),
+        ('  TADEJ   POGACAR ', 'tadej pogacar'),
+        ('Liège-Bastogne-Liège', 'liege bastogne liege'),
+        ('Mads Pedersen', 'mads pedersen'),
+        ('Søren Kragh Andersen', 'soren kragh andersen'),
+        ("Ben O'Connor", 'ben o connor'),
+        ('Michał Kwiatkowski', 'michal kwiatkowski'),
+        ('', None),
+        ('---', None),
+    ])
+    def test_make_name_key(self, name, expected):
+        """Test accent folding, lowercasing and punctuation stripping."""
+        assert make_name_key(name) == expected
+
+    def test_lookup_ignores_accents(self, db_session):
+        """Test that riders and races are found by their normalized name."""
+        rider = add_rider(db_session, name='Tadej Pogačar')
+        race = add_race(db_session, name='Liège–Bastogne–Liège', date=datetime(2024, 4, 21))
+
+        assert rider.name_key == 'tadej pogacar'
+        assert get_rider_by_name(db_session, 'tadej pogacar').id == rider.id
+        assert get_rider_by_name(db_session, 'Pogacar') is None
+        assert get_race_by_name(db_session, 'Liege-Bastogne-Liege').id == race.id
+
+    def test_add_rider_reuses_normalized_match(self, db_session):
+        """Test that add_rider does not duplicate an accent variant."""
+        rider = add_rider(db_session, name='Primož Roglič')
+
+        assert add_rider(db_session, name='Primoz Roglic').id == rider.id
+        assert db_session.query(Rider).count() == 1
+
+    def test_migration_backfills_existing_tables(self):
+        """Test adding and backfilling name_key on tables from an older schema."""
+        engine = create_engine('sqlite:///:memory:')
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE riders (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"))
+            conn.execute(text("CREATE TABLE races (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, date DATETIME)"))
+            conn.execute(text("INSERT INTO riders (name) VALUES ('Wout van Aert'), ('Wout Van Aert'), ('Tom Pidcock')"))
+            conn.execute(text("INSERT INTO races (name, date) VALUES ('Paris-Roubaix', '2023-04-09'), "
+                              "('Paris Roubaix', '2024-04-07')"))
+
+        migrate_name_keys(engine)
+        migrate_name_keys(engine)  # Idempotent
+
+        with engine.connect() as conn:
+            riders = conn.execute(text("SELECT id, name_key FROM riders ORDER BY id")).all()
+            races = conn.execute(text("SELECT name_key FROM races ORDER BY id")).scalars().all()
+
+        assert riders == [(1, 'wout van aert'), (2, None), (3, 'tom pidcock')]
+        assert races == ['paris roubaix', 'paris roubaix']
+
+
+class TestRatingsAsOf:
+    """Test suite for point-in-time rating queries."""
+
+    @pytest.fixture
+    def season(self, db_session):
+        """Rate a race roughly every ten days from January to June."""
+        rng = random.Random(3)
+        riders = [add_rider(db_session, name=f'Rider {i}') for i in range(12)]
+        for month in range(1, 7):
+            for day in (5, 15, 25):
+                race = add_race(db_session, name=f'Race {month}-{day}', date=datetime(2024, month, day),
+                                characteristics={'flat_weight': 0.5, 'mountain_weight': 0.5})
+                field = rng.sample(riders, 8)
+                add_race_results_bulk(db_session, race.id, [
+                    {'rider_id': rider.id, 'position': position + 1} for position, rider in enumerate(field)
+                ])
+                RatingEngine(db_session).update_ratings_for_race(race.id)
+        return riders
+
+    @staticmethod
+    def scan_history(db_session, as_of, dimension):
+        """Ratings as of a date by reading the whole history."""
+        ratings = {}
+        for history in db_session.query(RatingHistory).order_by(RatingHistory.date, RatingHistory.id):
+            if history.date.date() <= as_of:
+                ratings[history.rider_id] = getattr(history, dimension)
+        return ratings
+
+    def test_matches_full_history_scan(self, db_session, season):
+        """Test that snapshot plus deltas equals replaying the history."""
+        assert refresh_rating_snapshots(db_session) == 5  # February to June
+        assert refresh_rating_snapshots(db_session) == 0
+
+        for as_of in (date(2024, 1, 4), date(2024, 1, 31), date(2024, 3, 15), date(2024, 6, 30)):
+            for dimension in ('overall', 'mountain'):
+                assert get_ratings_as_of(db_session, as_of, dimension) == self.scan_history(db_session, as_of, dimension)
+
+    def test_reads_one_snapshot_and_bounded_history(self, db_session, season):
+        """Test that only history after the nearest snapshot is scanned."""
+        refresh_rating_snapshots(db_session)
+        statements = []
+        event.listen(db_session.bind, 'before_cursor_execute',
+                     lambda conn, cursor, statement, params, *args: statements.append((statement, params)))
+
+        get_ratings_as_of(db_session, date(2024, 4, 20))
+
+        history_params = [params for statement, params in statements if 'FROM rating_history' in statement]
+        assert len(statements) == 3
+        assert len(history_params) == 1
+        assert '2024-04-01' in str(history_params[0])
+
+    def test_late_race_invalidates_later_snapshots(self, db_session, season):
+        """Test that history written before a snapshot drops the stale snapshots."""
+        refresh_rating_snapshots(db_session)
+        race = add_race(db_session, name='Late Race', date=datetime(2024, 3, 1),
+                        characteristics={'flat_weight': 1.0})
+        add_race_results_bulk(db_session, race.id, [{'rider_id': season[0].id, 'position': 1}])
+        RatingEngine(db_session).update_ratings_for_race(race.id)
+
+        remaining = {d for (d,) in db_session.query(RatingSnapshot.snapshot_date).distinct()}
+        assert remaining == {datetime(2024, 2, 1), datetime(2024, 3, 1)}
+
+        refresh_rating_snapshots(db_session)
+        as_of = date(2024, 5, 1)
+        assert get_ratings_as_of(db_session, as_of) == self.scan_history(db_session, as_of, 'overall')
+
+    def test_unknown_dimension(self, db_session):
+        """Test that an unknown dimension is rejected."""
+        with pytest.raises(ValueError):
+            get_ratings_as_of(db_session, date(2024, 1, 1), 'climbing')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
+
+
+class TestRatingsVersion:
+    """Test suite for the ratings version counter."""
+
+    def test_writes_bump_the_version(self, db_session):
+        """Test that imports and rating updates each move the version forward."""
+        assert get_ratings_version(db_session) == 0
+
+        rider = add_rider(db_session, name='Rider A')
+        assert get_ratings_version(db_session) == 1
+
+        race = add_race(db_session, name='Race', date=datetime(2024, 3, 1), characteristics={'flat_weight': 1.0})
+        add_race_results_bulk(db_session, race.id, [{'rider_id': rider.id, 'position': 1}])
+        assert get_ratings_version(db_session) == 3
+
+        RatingEngine(db_session).update_ratings_for_race(race.id)
+        assert get_ratings_version(db_session) == 4
+
+    def test_reads_and_no_op_writes_keep_the_version(self, db_session):
+        """Test that nothing but an actual change invalidates cached reads."""
+        add_rider(db_session, name='Rider A')
+        upsert_race(db_session, name='Race', date=datetime(2024, 3, 1))
+        version = get_ratings_version(db_session)
+
+        resolve_riders_bulk(db_session, [('Rider A', None, None)])
+        upsert_race(db_session, name='Race', date=datetime(2024, 3, 1))
+
+        assert get_ratings_version(db_session) == version
+
+    def test_failed_write_keeps_the_version(self, db_session):
+        """Test that a rolled back write does not bump the version."""
+        race = add_race(db_session, name='Race', date=datetime(2024, 3, 1))
+        version = get_ratings_version(db_session)
+
+        with pytest.raises(Exception):
+            add_race_results_bulk(db_session, race.id, [{'rider_id': 1, 'position': None}])
+
+        assert get_ratings_version(db_session) == version
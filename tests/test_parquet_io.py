@@ -0,0 +1,129 @@
+"""Tests for Parquet import and export."""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.base import Base
+from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics, RatingHistory
+from src.services.rating_engine import RatingEngine
+from src.utils.db_helpers import add_rider, add_race, add_race_results_bulk
+from src.utils.parquet_io import export_parquet, import_parquet, TABLES
+
+
+def make_session():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+@pytest.fixture
+def source():
+    """A database with two rated seasons of races."""
+    session = make_session()
+    riders = [add_rider(session, name=f'Rider {i}', team='Team A', country='Belgium') for i in range(5)]
+    weights = {'flat_weight': 0.4, 'sprint_weight': 0.6}
+
+    for season in (2023, 2024):
+        for month in (3, 4):
+            race = add_race(session, name=f'Race {month}', date=datetime(season, month, 1),
+                            category='WT', characteristics=weights, pcs_id=f'race/race-{month}/{season}')
+            add_race_results_bulk(session, race.id, [
+                {'rider_id': rider.id, 'position': position + 1, 'time_seconds': 10000 + position}
+                for position, rider in enumerate(riders[::(1 if month == 3 else -1)])
+            ])
+            RatingEngine(session).update_ratings_for_race(race.id)
+
+    yield session
+    session.close()
+
+
+class TestParquetRoundTrip:
+    """Test suite for moving data between databases through Parquet."""
+
+    def test_season_round_trip(self, source, tmp_path):
+        """Test that an exported season imports into another database unchanged."""
+        counts = export_parquet(source, str(tmp_path), season=2024)
+
+        assert counts == {
+            'riders': 5, 'races': 2, 'race_characteristics': 2, 'race_results': 10, 'rating_history': 10
+        }
+        assert sorted(path.name for path in tmp_path.iterdir()) == sorted(f'{table}.parquet' for table in TABLES)
+
+        target = make_session()
+        add_rider(target, name='Rider 3', pcs_id='rider-3')  # Existing riders are matched
+        stats = import_parquet(target, str(tmp_path))
+
+        assert stats['races'] == 2
+        assert stats['race_results'] == 10
+        assert stats['rating_history'] == 10
+        assert target.query(Rider).count() == 5
+
+        def sheet(session):
+            return sorted(
+                (race.name, race.date, race.category, rider.name, result.position, result.time_seconds)
+                for result, race, rider in session.query(RaceResult, Race, Rider).join(Race).join(Rider)
+            )
+
+        source_sheet = [row for row in sheet(source) if row[1].year == 2024]
+        assert sheet(target) == source_sheet
+
+        roubaix = target.query(Race).filter(Race.pcs_id == 'race/race-4/2024').one()
+        assert roubaix.characteristics.sprint_weight == 0.6
+
+        def latest_ratings(session):
+            return {
+                rider.name: rating.to_dict()
+                for rider, rating in session.query(Rider, RiderRating).join(RiderRating)
+            }
+
+        # Current ratings follow the imported history
+        assert latest_ratings(target) == latest_ratings(source)
+
+    def test_reimport_adds_nothing(self, source, tmp_path):
+        """Test that importing the same export twice does not duplicate rows."""
+        export_parquet(source, str(tmp_path))
+        target = make_session()
+        import_parquet(target, str(tmp_path))
+
+        stats = import_parquet(target, str(tmp_path))
+
+        assert stats['races'] == 0
+        assert stats['races_matched'] == 4
+        assert stats['race_results'] == 0
+        assert target.query(RaceResult).count() == 20
+        assert target.query(RatingHistory).count() == 20
+        assert target.query(RaceCharacteristics).count() == 4
+
+    def test_failed_import_leaves_no_races(self, source, tmp_path):
+        """Test that races are not kept when their linked rows fail, so a re-import completes."""
+        export_parquet(source, str(tmp_path))
+        target = make_session()
+
+        with patch('src.utils.parquet_io._insert_linked', side_effect=RuntimeError('insert failed')):
+            with pytest.raises(RuntimeError):
+                import_parquet(target, str(tmp_path))
+        assert target.query(Race).count() == 0
+
+        stats = import_parquet(target, str(tmp_path))
+
+        assert stats['races'] == 4
+        assert target.query(RaceResult).count() == 20
+        assert target.query(RatingHistory).count() == 20
+        assert target.query(RaceCharacteristics).count() == 4
+
+    def test_many_teams_round_trip(self, tmp_path):
+        """Test that team and country columns hold more distinct values than an int8 index can."""
+        session = make_session()
+        for i in range(300):
+            add_rider(session, name=f'Rider {i}', team=f'Team {i}', country=f'Country {i % 150}')
+
+        export_parquet(session, str(tmp_path))
+        target = make_session()
+        import_parquet(target, str(tmp_path))
+
+        assert sorted(target.query(Rider.name, Rider.team, Rider.country).all()) == sorted(
+            session.query(Rider.name, Rider.team, Rider.country).all()
+        )
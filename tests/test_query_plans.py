@@ -0,0 +1,166 @@
+"""Query plan audit: the hot queries must not scan whole tables."""
+
+import re
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from src.models.base import Base
+from src.models import Rider, Race, RaceResult, RaceCharacteristics, RatingHistory, RatingSnapshot
+from src.models.migrations import migrate_indexes
+from src.models.race import RaceCategory
+from src.services.rating_engine import RatingEngine
+from src.utils.db_helpers import (
+    get_top_riders, get_ratings_as_of, resolve_riders_bulk, get_race_by_pcs_id, get_rider_by_name
+)
+
+TABLES = set(Base.metadata.tables)
+
+
+@pytest.fixture
+def db_session():
+    """Create a test database with a few rated races."""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    for rider_id in range(1, 11):
+        session.add(Rider(id=rider_id, name=f'Rider {rider_id}'))
+    for race_id in range(1, 4):
+        session.add(Race(id=race_id, name=f'Race {race_id}', date=datetime(2024, 3, race_id),
+                         category=RaceCategory.WT, season=2024, pcs_id=f'race/race-{race_id}/2024'))
+        session.add(RaceCharacteristics(race_id=race_id, flat_weight=0.5, sprint_weight=0.5))
+        for position, rider_id in enumerate(range(1, 11), 1):
+            session.add(RaceResult(race_id=race_id, rider_id=rider_id, position=position))
+    session.commit()
+
+    rating_engine = RatingEngine(session)
+    rating_engine.update_ratings_for_race(1)
+    rating_engine.update_ratings_for_race(2)
+
+    yield session
+    session.close()
+
+
+def record_statements(session):
+    """Collect (statement, parameters) for every statement the session runs."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(session.get_bind(), 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def scanned_table(detail):
+    """
+    The audited table a plan step reads in full, or None.
+
+    Understands current SQLite wording ("SCAN <table>", "SCAN <table> USING
+    [COVERING] INDEX <index>") and the older "SCAN TABLE <table> [AS <alias>]".
+    Walking a whole index is still a full scan. Aliases such as
+    rider_ratings_1 map back to their table.
+    """
+    words = detail.split()
+    if not words or words[0] != 'SCAN':
+        return None
+    words = words[1:]
+    if words[:1] == ['TABLE']:
+        words = words[1:]
+    if not words:
+        return None
+    name = words[0] if words[0] in TABLES else re.sub(r'_\d+$', '', words[0])
+    return name if name in TABLES else None
+
+
+def full_table_scans(session, statements, expected=()):
+    """EXPLAIN QUERY PLAN each read, update and delete; return the ones that scan a table not in expected."""
+    scans = {}
+    connection = session.connection()
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            continue
+        for *_, detail in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+            table = scanned_table(detail)
+            if table is not None and table not in expected:
+                scans.setdefault(' '.join(statement.split()), []).append(detail)
+    return scans
+
+
+class TestQueryPlans:
+    """Test suite checking the query plans of the main read and write paths."""
+
+    def test_rating_updates_use_indexes(self, db_session):
+        """Test that a race update and a late-race recompute never scan a whole table."""
+        statements = record_statements(db_session)
+
+        engine = RatingEngine(db_session)
+        engine.update_ratings_for_race(3)
+        engine.recompute_from(datetime(2024, 3, 2).date(), race_ids=[2])
+
+        assert full_table_scans(db_session, statements) == {}
+
+    def test_page_queries_use_indexes(self, db_session):
+        """Test that the rankings, rider profile and lookup queries never scan a whole table."""
+        # Point-in-time reads start from the latest monthly snapshot
+        db_session.add(RatingSnapshot(snapshot_date=datetime(2024, 3, 1), rider_id=1, overall=1500))
+        db_session.commit()
+        statements = record_statements(db_session)
+
+        get_top_riders(db_session, dimension='sprint', limit=5)
+        get_ratings_as_of(db_session, datetime(2024, 3, 2))
+        get_race_by_pcs_id(db_session, 'race/race-1/2024')
+        get_rider_by_name(db_session, 'Rider 1')
+        resolve_riders_bulk(db_session, [('Rider 1', None, None), ('New Rider', 'new-rider', None)])
+
+        # Rider Profile page
+        db_session.query(RatingHistory.date, RatingHistory.overall).filter(
+            RatingHistory.rider_id == 1,
+            RatingHistory.overall.isnot(None)
+        ).order_by(RatingHistory.date).all()
+        db_session.query(RaceResult, Race).join(
+            Race, RaceResult.race_id == Race.id
+        ).filter(RaceResult.rider_id == 1).order_by(Race.date.desc()).limit(20).all()
+
+        assert full_table_scans(db_session, statements) == {}
+
+    def test_history_before_first_snapshot_is_read_in_full(self, db_session):
+        """Test that the audit reports the one expected scan: a point-in-time read with no snapshot yet."""
+        statements = record_statements(db_session)
+
+        get_ratings_as_of(db_session, datetime(2024, 3, 2))
+
+        assert full_table_scans(db_session, statements) != {}
+        assert full_table_scans(db_session, statements, expected={'rating_history'}) == {}
+
+    def test_scanned_table_parses_both_plan_formats(self):
+        """Test plan step parsing for current and older SQLite wording."""
+        assert scanned_table('SCAN rider_ratings') == 'rider_ratings'
+        assert scanned_table(
+            'SCAN rider_ratings USING COVERING INDEX sqlite_autoindex_rider_ratings_1'
+        ) == 'rider_ratings'
+        assert scanned_table('SCAN TABLE race_results AS race_results_1') == 'race_results'
+        assert scanned_table('SCAN TABLE riders USING INDEX ix_riders_name') == 'riders'
+        assert scanned_table('SCAN race_results_1') == 'race_results'
+        assert scanned_table('SEARCH riders USING INTEGER PRIMARY KEY (rowid=?)') is None
+        assert scanned_table('SCAN (subquery-1)') is None
+        assert scanned_table('SCAN CONSTANT ROW') is None
+
+    def test_migration_adds_missing_indexes(self, db_session):
+        """Test that databases created before the indexes get them from init_db."""
+        engine = db_session.get_bind()
+        db_session.close()
+        with engine.begin() as conn:
+            conn.exec_driver_sql('DROP INDEX ix_race_results_race_id_status_position')
+            conn.exec_driver_sql('DROP INDEX ix_rating_history_race_id')
+
+        migrate_indexes(engine)
+        migrate_indexes(engine)  # Idempotent
+
+        inspector = inspect(engine)
+        assert 'ix_race_results_race_id_status_position' in {
+            index['name'] for index in inspector.get_indexes('race_results')
+        }
+        assert 'ix_rating_history_race_id' in {index['name'] for index in inspector.get_indexes('rating_history')}
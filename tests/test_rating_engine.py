@@ -1,14 +1,22 @@
 """Tests for the rating calculation engine."""
 
 import pytest
+import json
+import random
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 from src.models.base import Base
-from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics
+from src.models import Rider, RiderRating, Race, RaceResult, RaceCharacteristics, RatingHistory
+from src.models.migrations import migrate_rating_history_columns, migrate_dimension_stats
 from src.models.race import RaceCategory
 from src.services.rating_engine import RatingEngine
+from src.services.rating_cache import RatingCache
+from src.services.leaderboard import Leaderboard, LEADERBOARD_DIMENSIONS
+from src.services.dimension_stats import DimensionStats
+from src.models import LeaderboardEntry, DimensionStat
+from config.settings import settings
 
 
 @pytest.fixture
@@ -209,6 +217,28 @@ class TestRatingEngine:
         # Should be weighted average
         assert 1450 < overall < 1650
 
+    def test_average_competitor_ratings(self, db_session):
+        """Test that field sums minus the rider give the average of everyone else."""
+        engine = RatingEngine(db_session)
+        field_ratings = {
+            1: {'mountain': 1600, 'sprint': 1400},
+            2: {'mountain': 1500, 'sprint': 1500},
+            3: {'mountain': 1300, 'sprint': 1700},
+        }
+        characteristics = {'mountain_weight': 1.0, 'sprint_weight': 0.5}
+
+        field_sums = engine._calculate_field_rating_sums(field_ratings, characteristics)
+        averages = engine._calculate_average_competitor_ratings(field_sums, 3, field_ratings[1])
+
+        assert field_sums == {'mountain': 4400, 'sprint': 4600}
+        assert averages == {'mountain': 1400.0, 'sprint': 1600.0}
+
+        # A rider alone in the field is compared against the initial rating
+        alone = engine._calculate_average_competitor_ratings(
+            {'mountain': 1600}, 1, {'mountain': 1600}
+        )
+        assert alone == {'mountain': engine.initial_rating}
+
     def test_rating_bounds(self, db_session, sample_riders, sample_race):
         """Test that ratings stay within bounds (1000-2500)."""
         engine = RatingEngine(db_session)
@@ -240,5 +270,484 @@ class TestRatingEngine:
         assert updated_rating.mountain <= 2500
 
 
+def _create_field(session, seed, field_size=60):
+    """Populate a session with a race and a field of riders with varied ratings."""
+    rng = random.Random(seed)
+
+    race = Race(id=1, name='Parity Race', date=datetime(2024, 7, 14), category=RaceCategory.GT, season=2024)
+    session.add(race)
+    session.add(RaceCharacteristics(
+        race_id=1,
+        flat_weight=0.3,
+        cobbles_weight=0.0,
+        mountain_weight=1.0,
+        time_trial_weight=0.0,
+        sprint_weight=0.1,
+        gc_weight=0.9,
+        one_day_weight=0.0,
+        endurance_weight=0.8
+    ))
+
+    positions = list(range(1, field_size + 1))
+    rng.shuffle(positions)
+
+    for rider_id, position in enumerate(positions, 1):
+        session.add(Rider(id=rider_id, name=f'Rider {rider_id}'))
+        session.add(RiderRating(
+            rider_id=rider_id,
+            flat=rng.randint(1000, 2500),
+            cobbles=rng.randint(1000, 2500),
+            mountain=rng.choice([1000, 2500, rng.randint(1000, 2500)]),
+            time_trial=rng.randint(1000, 2500),
+            sprint=rng.randint(1000, 2500),
+            gc=rng.randint(1000, 2500),
+            one_day=rng.randint(1000, 2500),
+            endurance=rng.randint(1000, 2500),
+            overall=1500
+        ))
+        session.add(RaceResult(race_id=1, rider_id=rider_id, position=position))
+
+    session.commit()
+
+
+class TestVectorizedRatingEngine:
+    """Parity tests between the scalar and NumPy race update paths."""
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_vectorized_matches_scalar(self, seed):
+        """Test that both paths produce the same ratings and history."""
+        sessions = []
+        for vectorized in (False, True):
+            engine = create_engine('sqlite:///:memory:')
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            _create_field(session, seed)
+            RatingEngine(session, vectorized=vectorized).update_ratings_for_race(1)
+            sessions.append(session)
+
+        scalar_session, vectorized_session = sessions
+        scalar_ratings = {r.rider_id: r for r in scalar_session.query(RiderRating).all()}
+        vectorized_ratings = {r.rider_id: r for r in vectorized_session.query(RiderRating).all()}
+
+        assert scalar_ratings.keys() == vectorized_ratings.keys()
+        for rider_id, scalar_rating in scalar_ratings.items():
+            vectorized_rating = vectorized_ratings[rider_id]
+            for dim, value in scalar_rating.to_dict().items():
+                assert abs(vectorized_rating.to_dict()[dim] - value) <= 1
+            assert vectorized_rating.races_count == scalar_rating.races_count
+            assert vectorized_rating.wins_count == scalar_rating.wins_count
+
+        from src.models import RatingHistory
+        scalar_history = scalar_session.query(RatingHistory).order_by(RatingHistory.rider_id).all()
+        vectorized_history = vectorized_session.query(RatingHistory).order_by(RatingHistory.rider_id).all()
+        assert [(h.rider_id, h.ratings.keys()) for h in scalar_history] == [
+            (h.rider_id, h.ratings.keys()) for h in vectorized_history
+        ]
+        for scalar_entry, vectorized_entry in zip(scalar_history, vectorized_history):
+            for dim, value in scalar_entry.ratings.items():
+                if value is None:
+                    assert vectorized_entry.ratings[dim] is None, dim
+                else:
+                    assert abs(vectorized_entry.ratings[dim] - value) <= 1, dim
+
+        for session in sessions:
+            session.close()
+
+    def test_calculate_performance_scores_matches_scalar(self, db_session):
+        """Test the vectorized performance curve against the scalar one."""
+        engine = RatingEngine(db_session)
+        positions = list(range(1, 201))
+
+        scores = engine.calculate_performance_scores(positions, len(positions))
+
+        for position, score in zip(positions, scores):
+            assert score == engine.calculate_performance_score(position, len(positions))
+
+    def test_single_rider_field(self, db_session, sample_riders, sample_race):
+        """Test that a one-rider race falls back to the initial rating as opposition."""
+        engine = RatingEngine(db_session, vectorized=True)
+        engine.initialize_rider_ratings(sample_riders[0].id)
+
+        db_session.add(RaceResult(race_id=1, rider_id=1, position=1))
+        db_session.commit()
+
+        result = engine.update_ratings_for_race(1)
+
+        assert result['updated'] == 1
+        rating = db_session.query(RiderRating).filter(RiderRating.rider_id == 1).first()
+        assert rating.mountain > 1500
+        assert rating.cobbles == 1500
+
+
+class TestRatingCache:
+    """Test suite for RatingCache."""
+
+    def test_load_creates_missing_ratings(self, db_session, sample_riders):
+        """Test that missing ratings are created at the initial rating."""
+        RatingEngine(db_session).initialize_rider_ratings(sample_riders[0].id)
+        db_session.query(RiderRating).filter(RiderRating.rider_id == 1).update({'mountain': 1700})
+        db_session.commit()
+
+        ratings = RatingCache(db_session).load([1, 2, 3, 2])
+        db_session.commit()
+
+        assert sorted(ratings) == [1, 2, 3]
+        assert ratings[1].mountain == 1700
+        assert ratings[2].mountain == 1500
+        assert ratings[3].races_count == 0
+        assert db_session.query(RiderRating).count() == 3
+
+    def test_race_update_query_count_is_constant(self):
+        """Test that the number of SELECTs does not grow with the field size."""
+        select_counts = []
+        for field_size in (10, 80):
+            engine = create_engine('sqlite:///:memory:')
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            _create_field(session, seed=7, field_size=field_size)
+
+            statements = []
+
+            @event.listens_for(engine, 'before_cursor_execute')
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            RatingEngine(session).update_ratings_for_race(1)
+            select_counts.append(sum(1 for s in statements if s.lstrip().upper().startswith('SELECT')))
+            session.close()
+
+        assert select_counts[0] == select_counts[1]
+
+
+@pytest.fixture
+def season(db_session):
+    """Create a short season of overlapping races with results."""
+    rng = random.Random(11)
+    for rider_id in range(1, 21):
+        db_session.add(Rider(id=rider_id, name=f'Rider {rider_id}'))
+
+    categories = [RaceCategory.WT, RaceCategory.MONUMENT, RaceCategory.GT, RaceCategory.OTHERS]
+    for race_id in range(1, 7):
+        db_session.add(Race(
+            id=race_id,
+            name=f'Race {race_id}',
+            date=datetime(2024, 3, race_id * 4),
+            category=categories[race_id % len(categories)],
+            season=2024
+        ))
+        db_session.add(RaceCharacteristics(
+            race_id=race_id,
+            flat_weight=rng.random(),
+            cobbles_weight=0.0,
+            mountain_weight=rng.random(),
+            time_trial_weight=0.0,
+            sprint_weight=rng.random(),
+            gc_weight=rng.random(),
+            one_day_weight=1.0,
+            endurance_weight=rng.random()
+        ))
+        field = rng.sample(range(1, 21), 12)
+        for position, rider_id in enumerate(field, 1):
+            db_session.add(RaceResult(race_id=race_id, rider_id=rider_id, position=position))
+
+    db_session.commit()
+    return db_session
+
+
+def _ratings_snapshot(session):
+    """Return {rider_id: (ratings dict, races, wins, podiums)} for comparison."""
+    session.expire_all()
+    return {
+        r.rider_id: (r.to_dict(), r.races_count, r.wins_count, r.podiums_count)
+        for r in session.query(RiderRating).all()
+    }
+
+
+class TestReplay:
+    """Test suite for RatingEngine.replay."""
+
+    def _apply_season(self, session):
+        engine = RatingEngine(session)
+        for race in session.query(Race).order_by(Race.date).all():
+            engine.update_ratings_for_race(race.id)
+
+    def test_full_replay_matches_incremental_updates(self, season):
+        """Test that replaying from scratch reproduces race-by-race updates."""
+        from src.models import RatingHistory
+        self._apply_season(season)
+        expected = _ratings_snapshot(season)
+
+        stats = RatingEngine(season).replay()
+
+        assert stats['races_replayed'] == 6
+        assert stats['results_processed'] == 72
+        assert _ratings_snapshot(season) == expected
+        assert season.query(RatingHistory).count() == 72
+
+    def test_replay_from_date_matches_full_replay(self, season):
+        """Test that a partial replay resumes from rating history."""
+        self._apply_season(season)
+        expected = _ratings_snapshot(season)
+
+        stats = RatingEngine(season).replay(start_date=datetime(2024, 3, 12).date())
+
+        assert stats['races_replayed'] == 4
+        assert _ratings_snapshot(season) == expected
+
+    def test_replay_applies_new_parameters(self, season):
+        """Test that a changed K-factor takes effect on past races."""
+        self._apply_season(season)
+        before = _ratings_snapshot(season)
+
+        engine = RatingEngine(season)
+        engine.k_factor = 64
+        engine.replay()
+
+        after = _ratings_snapshot(season)
+        assert after.keys() == before.keys()
+        assert after != before
+
+
+class TestRecompute:
+    """Test suite for incremental RatingEngine.recompute_from."""
+
+    def test_late_race_matches_full_replay(self, season):
+        """Test that recomputing after a late race equals replaying everything."""
+        late_race = season.query(Race).filter(Race.id == 3).first()
+        late_results = season.query(RaceResult).filter(RaceResult.race_id == 3).all()
+        late_rows = [(r.rider_id, r.position) for r in late_results]
+        for result in late_results:
+            season.delete(result)
+        season.commit()
+
+        # Rate the season without race 3, then import it late
+        TestReplay()._apply_season(season)
+        for rider_id, position in late_rows:
+            season.add(RaceResult(race_id=3, rider_id=rider_id, position=position))
+        season.commit()
+
+        stats = RatingEngine(season).recompute_from(late_race.date, race_ids=[3])
+        incremental = _ratings_snapshot(season)
+
+        RatingEngine(season).replay()
+        assert _ratings_snapshot(season) == incremental
+        assert stats['races_replayed'] >= 1
+
+    def test_only_reachable_riders_are_touched(self, db_session):
+        """Test that races sharing no rider with the change are left alone."""
+        for rider_id in range(1, 6):
+            db_session.add(Rider(id=rider_id, name=f'Rider {rider_id}'))
+        for race_id, day, field in [(1, 1, [1, 2]), (2, 2, [3, 4]), (3, 3, [2, 5])]:
+            db_session.add(Race(id=race_id, name=f'Race {race_id}', date=datetime(2024, 5, day),
+                                category=RaceCategory.WT, season=2024))
+            db_session.add(RaceCharacteristics(race_id=race_id, flat_weight=1.0, sprint_weight=0.5))
+            for position, rider_id in enumerate(field, 1):
+                db_session.add(RaceResult(race_id=race_id, rider_id=rider_id, position=position))
+        db_session.commit()
+        TestReplay()._apply_season(db_session)
+
+        # Correct race 1: rider 2 actually won
+        for result in db_session.query(RaceResult).filter(RaceResult.race_id == 1):
+            result.position = 3 - result.position
+        db_session.commit()
+
+        statements = []
+        event.listen(db_session.get_bind(), 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(' '.join(statement.split())))
+        stats = RatingEngine(db_session).recompute_from(datetime(2024, 5, 1).date(), race_ids=[1])
+
+        # Current ratings are only read for the touched riders
+        reads = [
+            statement for statement in statements
+            if statement.startswith('SELECT') and 'FROM rider_ratings' in statement
+        ]
+        assert reads and all('WHERE' in statement for statement in reads)
+
+        assert stats['races_replayed'] == 2  # race 1 and race 3 (via rider 2)
+        assert stats['races_skipped'] == 1
+        assert stats['riders_updated'] == 3  # riders 1, 2 and 5
+
+        incremental = _ratings_snapshot(db_session)
+        RatingEngine(db_session).replay()
+        assert _ratings_snapshot(db_session) == incremental
+
+
+def _leaderboard_matches_ratings(session):
+    """Check every dimension's materialized ranking against an ORDER BY over rider_ratings."""
+    session.expire_all()
+    for dimension in LEADERBOARD_DIMENSIONS:
+        column = getattr(RiderRating, dimension)
+        expected = [
+            (rank, rider_id, rating) for rank, (rider_id, rating) in enumerate(
+                session.query(RiderRating.rider_id, column).order_by(column.desc(), RiderRating.rider_id), 1
+            )
+        ]
+        actual = session.query(
+            LeaderboardEntry.rank, LeaderboardEntry.rider_id, LeaderboardEntry.rating
+        ).filter(LeaderboardEntry.dimension == dimension).order_by(LeaderboardEntry.rank).all()
+        assert actual == expected, dimension
+
+
+class TestLeaderboard:
+    """Test suite for the incrementally maintained leaderboard."""
+
+    def test_race_updates_keep_rankings_exact(self, season):
+        """Test that race-by-race updates leave every ranking identical to a full sort."""
+        engine = RatingEngine(season)
+        for race in season.query(Race).order_by(Race.date).all():
+            engine.update_ratings_for_race(race.id)
+            _leaderboard_matches_ratings(season)
+
+        top = Leaderboard(season).top('overall', limit=3)
+        assert [rank for rank, _, _ in top] == [1, 2, 3]
+        assert top[0][2].overall == season.query(func.max(RiderRating.overall)).scalar()
+
+    def test_new_riders_enter_the_ranking(self, season):
+        """Test that riders initialized mid-season are ranked at the initial rating."""
+        TestReplay()._apply_season(season)
+        season.add(Rider(id=21, name='Rider 21'))
+        season.commit()
+
+        RatingEngine(season).initialize_rider_ratings(21)
+
+        _leaderboard_matches_ratings(season)
+        assert Leaderboard(season).rank_of(21) is not None
+
+    def test_replay_and_recompute_keep_rankings_exact(self, season):
+        """Test that replays and recomputes rewrite the rankings they change."""
+        TestReplay()._apply_season(season)
+
+        engine = RatingEngine(season)
+        engine.k_factor = 64
+        engine.replay(start_date=datetime(2024, 3, 12).date())
+        _leaderboard_matches_ratings(season)
+
+        engine.recompute_from(datetime(2024, 3, 8).date())
+        _leaderboard_matches_ratings(season)
+
+        engine.replay()
+        _leaderboard_matches_ratings(season)
+
+    def test_rebuild_matches_incremental(self, season):
+        """Test that a full rebuild writes the same rankings as incremental updates."""
+        TestReplay()._apply_season(season)
+        incremental = sorted(
+            season.query(LeaderboardEntry.dimension, LeaderboardEntry.rank, LeaderboardEntry.rider_id).all()
+        )
+
+        Leaderboard(season).rebuild()
+        season.commit()
+
+        assert sorted(
+            season.query(LeaderboardEntry.dimension, LeaderboardEntry.rank, LeaderboardEntry.rider_id).all()
+        ) == incremental
+
+
+def _stats_match_ratings(session):
+    """Check the incrementally maintained totals against a fresh aggregate of rider_ratings."""
+    stats = DimensionStats(session)
+    incremental = stats.totals()
+    stats.rebuild()
+    assert stats.totals() == incremental
+    session.rollback()
+
+
+class TestDimensionStats:
+    """Test suite for the incrementally maintained dimension statistics."""
+
+    def test_updates_keep_totals_exact(self, season):
+        """Test that race updates, new riders, replays and recomputes keep every total exact."""
+        engine = RatingEngine(season)
+        for race in season.query(Race).order_by(Race.date).all():
+            engine.update_ratings_for_race(race.id)
+            _stats_match_ratings(season)
+
+        season.add(Rider(id=21, name='Rider 21'))
+        season.commit()
+        engine.initialize_rider_ratings(21)
+        _stats_match_ratings(season)
+
+        engine.k_factor = 64
+        engine.replay(start_date=datetime(2024, 3, 12).date())
+        _stats_match_ratings(season)
+        engine.recompute_from(datetime(2024, 3, 8).date())
+        _stats_match_ratings(season)
+
+    def test_moments_match_ratings(self, season):
+        """Test that moments read from the totals agree with the ratings themselves."""
+        TestReplay()._apply_season(season)
+        moments = DimensionStats(season).moments(['flat', 'overall'])
+        rows = season.query(RiderRating.flat, RiderRating.overall).all()
+
+        assert moments['count'] == len(rows)
+        assert moments['mean']['overall'] == pytest.approx(sum(overall for _, overall in rows) / len(rows))
+        assert moments['correlation']['flat']['flat'] == pytest.approx(1.0)
+        assert moments['correlation']['flat']['overall'] == moments['correlation']['overall']['flat']
+
+    def test_migration_computes_totals(self, season):
+        """Test that databases rated before the statistics existed get them from init_db."""
+        TestReplay()._apply_season(season)
+        expected = DimensionStats(season).totals()
+        season.query(DimensionStat).delete()
+        season.commit()
+
+        engine = season.get_bind()
+        migrate_dimension_stats(engine)
+        migrate_dimension_stats(engine)  # Idempotent
+
+        assert DimensionStats(season).totals() == expected
+
+
+class TestRatingHistoryColumns:
+    """Test suite for columnar rating history."""
+
+    def test_history_records_overall(self, db_session, sample_riders, sample_race):
+        """Test that history rows record every dimension and the overall rating."""
+        RatingEngine(db_session).update_ratings_for_race(sample_race.id)
+
+        for history in db_session.query(RatingHistory):
+            rating = db_session.query(RiderRating).filter(RiderRating.rider_id == history.rider_id).one()
+            assert history.ratings == rating.to_dict()
+
+    def test_migration_converts_json_rows(self):
+        """Test converting JSON snapshots from an older schema into columns."""
+        engine = create_engine('sqlite:///:memory:')
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE rating_history (id INTEGER PRIMARY KEY, rider_id INTEGER NOT NULL, "
+                "race_id INTEGER, date DATETIME NOT NULL, ratings JSON NOT NULL, change_reason VARCHAR)"
+            ))
+            conn.execute(text(
+                "INSERT INTO rating_history (rider_id, date, ratings) VALUES "
+                "(1, '2024-04-07', '{\"flat\": 1510, \"mountain\": 1490}')"
+            ))
+            complete = {dim: 1500 + 10 * i for i, dim in enumerate(settings.dimensions)}
+            conn.execute(
+                text("INSERT INTO rating_history (rider_id, date, ratings) VALUES (2, '2024-04-07', :ratings)"),
+                {"ratings": json.dumps(complete)}
+            )
+
+        migrate_rating_history_columns(engine)
+        migrate_rating_history_columns(engine)  # Idempotent
+
+        columns = {column['name'] for column in inspect(engine).get_columns('rating_history')}
+        indexes = {index['name'] for index in inspect(engine).get_indexes('rating_history')}
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT flat, mountain, sprint, overall FROM rating_history ORDER BY id")).all()
+
+        assert 'ratings' not in columns
+        assert 'ix_rating_history_rider_id_date' in indexes
+        # A partial snapshot cannot be weighted, a complete one gets the engine's overall
+        assert tuple(rows[0]) == (1510, 1490, None, None)
+        expected = RatingEngine(None)._calculate_overall_rating(RiderRating(**complete))
+        assert tuple(rows[1]) == (complete['flat'], complete['mountain'], complete['sprint'], expected)
+
+        # New rows can be written without the dropped JSON column
+        session = sessionmaker(bind=engine)()
+        session.add(RatingHistory(rider_id=1, date=datetime(2024, 4, 8), ratings={'flat': 1520}))
+        session.commit()
+        assert session.query(RatingHistory.flat).order_by(RatingHistory.id).all() == [(1510,), (complete['flat'],), (1520,)]
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -1,11 +1,17 @@
 """Tests for the Pro Cycling Stats scraper."""
 
+import os
 import pytest
 from datetime import date, datetime
 from unittest.mock import Mock, patch, MagicMock
 from bs4 import BeautifulSoup
 
 from src.services.procyclingstats_scraper import ProCyclingStatsScraper
+from src.services.http_cache import HttpCache
+from src.services.page_cache import CompressedLRUCache
+from src.services.rate_limiter import TokenBucket
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
 
 
 class TestProCyclingStatsScraper:
@@ -128,6 +134,17 @@ class TestProCyclingStatsScraper:
         assert characteristics['gc_weight'] == 1.0
         assert characteristics['endurance_weight'] >= 0.8
 
+    @pytest.mark.parametrize("url,expected", [
+        ('https://www.procyclingstats.com/race/tour-de-france/2024/stage-1', 'tour-de-france/2024/stage-1'),
+        ('https://www.procyclingstats.com/race/tour-de-france/2024/stage-1/result', 'tour-de-france/2024/stage-1'),
+        ('race/paris-roubaix/2024/result/', 'paris-roubaix/2024'),
+        ('https://www.procyclingstats.com/race/paris-roubaix/2024?filter=1#results', 'paris-roubaix/2024'),
+        ('https://www.procyclingstats.com/rider/tadej-pogacar', None),
+    ])
+    def test_race_pcs_id_from_url(self, url, expected):
+        """Test that race ids are stable across URL variants of the same race."""
+        assert ProCyclingStatsScraper.race_pcs_id_from_url(url) == expected
+
     def test_infer_characteristics_time_trial(self, scraper):
         """Test characteristic inference for time trial."""
         race_data = {
@@ -177,6 +194,7 @@ class TestProCyclingStatsScraper:
         assert len(results) == 3
         assert results[0]['position'] == 1
         assert results[0]['rider_name'] == 'Tadej Pogačar'
+        assert results[0]['pcs_id'] == 'tadej-pogacar'
         assert results[1]['position'] == 2
         assert results[2]['position'] == 3
 
@@ -255,5 +273,267 @@ class TestProCyclingStatsScraper:
         assert char_gt['gc_weight'] > char_other['gc_weight']
 
 
+class TestHttpCache:
+    """Test suite for the persistent HTTP cache."""
+
+    @pytest.fixture
+    def http_cache(self, tmp_path):
+        """Create a cache in a temporary directory."""
+        cache = HttpCache(str(tmp_path / 'cache' / 'http_cache.db'))
+        yield cache
+        cache.close()
+
+    def _response(self, status_code=200, content=b"<html><body>Test</body></html>", headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.content = content
+        response.headers = headers or {}
+        return response
+
+    def test_ttl_rules(self, http_cache):
+        """Test that calendar pages expire sooner than race pages."""
+        calendar_ttl = http_cache.ttl_for('https://www.procyclingstats.com/races.php?date=2024-07-14')
+        race_ttl = http_cache.ttl_for('https://www.procyclingstats.com/race/tour-de-france/2024/stage-15')
+
+        assert calendar_ttl < race_ttl
+
+    @patch('src.services.procyclingstats_scraper.requests.Session.get')
+    def test_cache_survives_new_scraper(self, mock_get, http_cache):
+        """Test that a later run reuses pages stored by an earlier one."""
+        mock_get.return_value = self._response(headers={'ETag': '"v1"'})
+        url = 'https://www.procyclingstats.com/race/test/2024'
+
+        ProCyclingStatsScraper(rate_limit_delay=0, http_cache=http_cache)._fetch_page(url)
+        soup = ProCyclingStatsScraper(rate_limit_delay=0, http_cache=http_cache)._fetch_page(url)
+
+        assert mock_get.call_count == 1
+        assert soup.get_text() == 'Test'
+
+    @patch('src.services.procyclingstats_scraper.requests.Session.get')
+    def test_stale_entry_revalidates(self, mock_get, http_cache):
+        """Test that a stale entry is revalidated with conditional headers."""
+        url = 'https://www.procyclingstats.com/race/test/2024'
+        http_cache.store(url, b"<html><body>Cached</body></html>", etag='"v1"',
+                         last_modified='Sun, 14 Jul 2024 18:00:00 GMT')
+        http_cache.ttl_rules = []  # Everything uses the default TTL
+        with patch('src.services.http_cache.DEFAULT_TTL', 0):
+            mock_get.return_value = self._response(status_code=304, content=b'')
+
+            soup = ProCyclingStatsScraper(rate_limit_delay=0, http_cache=http_cache)._fetch_page(url)
+
+        headers = mock_get.call_args.kwargs['headers']
+        assert headers['If-None-Match'] == '"v1"'
+        assert headers['If-Modified-Since'] == 'Sun, 14 Jul 2024 18:00:00 GMT'
+        assert soup.get_text() == 'Cached'
+
+    def test_final_entries_never_expire(self, http_cache):
+        """Test that final entries stay fresh regardless of TTL."""
+        url = 'https://www.procyclingstats.com/race/test/2023'
+        http_cache.store(url, b'old')
+        entry = http_cache.get(url)._replace(fetched_at=0)
+        assert not http_cache.is_fresh(url, entry)
+
+        http_cache.mark_final(url)
+        entry = http_cache.get(url)._replace(fetched_at=0)
+        assert http_cache.is_fresh(url, entry)
+
+
+class TestCompressedLRUCache:
+    """Test suite for the in-memory compressed page cache."""
+
+    def test_round_trip_and_counters(self):
+        """Test that entries decompress to the original bytes and hits/misses are counted."""
+        cache = CompressedLRUCache(max_mb=1)
+        content = b"<html><body>" + b"<tr><td>Rider</td></tr>" * 200 + b"</body></html>"
+
+        assert cache.get('a') is None
+        cache.put('a', content)
+
+        assert cache.get('a') == content
+        assert cache.size_bytes < len(content)
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test that the byte budget is enforced by evicting the oldest entries."""
+        import os
+        entry = os.urandom(400 * 1024)  # Incompressible
+        cache = CompressedLRUCache(max_mb=1)
+
+        cache.put('a', entry)
+        cache.put('b', entry)
+        cache.get('a')  # 'b' is now least recently used
+        cache.put('c', entry)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert cache.evictions == 1
+        assert cache.size_bytes <= cache.max_bytes
+
+    def test_oversized_entry_not_cached(self):
+        """Test that an entry larger than the whole budget is skipped."""
+        import os
+        cache = CompressedLRUCache(max_mb=0.1)
+        cache.put('big', os.urandom(200 * 1024))
+
+        assert len(cache) == 0
+
+
+class TestTokenBucket:
+    """Test suite for the shared token-bucket rate limiter."""
+
+    def test_burst_then_average_rate(self):
+        """Test that a full bucket allows a burst before enforcing the rate."""
+        import time
+        bucket = TokenBucket(rate=20, burst=3)
+
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        burst_elapsed = time.monotonic() - start
+
+        for _ in range(2):
+            bucket.acquire()
+        total_elapsed = time.monotonic() - start
+
+        assert burst_elapsed < 0.05
+        assert total_elapsed >= 0.09  # Two more tokens at 20/s
+
+    def test_async_acquire_shares_rate(self):
+        """Test that async callers are spaced by the same bucket."""
+        import asyncio
+        import time
+        bucket = TokenBucket(rate=20, burst=1)
+
+        async def run():
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(4)))
+
+        start = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - start >= 0.14
+
+    def test_zero_rate_is_unlimited(self):
+        """Test that a non-positive rate never waits."""
+        bucket = TokenBucket(rate=0)
+        assert bucket._reserve() == 0.0
+
+
+class TestConcurrentFetching:
+    """Test suite for concurrent page fetching."""
+
+    @staticmethod
+    def _slow_get(url, **kwargs):
+        import time
+        time.sleep(0.1)
+        response = Mock()
+        response.status_code = 200
+        response.headers = {}
+        response.content = f"<html><body><h1>{url}</h1></body></html>".encode()
+        response.raise_for_status = Mock()
+        return response
+
+    def test_prefetch_runs_requests_concurrently(self):
+        """Test that prefetching overlaps requests and fills the page cache."""
+        import time
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0, max_concurrency=4)
+        urls = [f'https://www.procyclingstats.com/race/test-{i}/2024' for i in range(8)]
+
+        with patch.object(scraper.session, 'get', side_effect=self._slow_get) as mock_get:
+            start = time.monotonic()
+            assert scraper.prefetch(urls) == 8
+            elapsed = time.monotonic() - start
+
+            assert mock_get.call_count == 8
+            assert elapsed < 0.5  # Serial fetching would take 0.8s
+
+            soup = scraper._fetch_page(urls[3])
+            assert mock_get.call_count == 8
+            assert soup.find('h1').text == urls[3]
+
+    def test_prefetch_inside_running_event_loop(self):
+        """Test that the synchronous wrapper also works when an event loop is running."""
+        import asyncio
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0, max_concurrency=4)
+        urls = [f'https://www.procyclingstats.com/race/test-{i}/2024' for i in range(4)]
+
+        async def caller():
+            return scraper.prefetch(urls)
+
+        with patch.object(scraper.session, 'get', side_effect=self._slow_get) as mock_get:
+            assert asyncio.run(caller()) == 4
+            assert mock_get.call_count == 4
+            assert all(url in scraper._cache for url in urls)
+
+    def test_prefetch_respects_rate_limit(self):
+        """Test that concurrent requests still draw from the shared rate limiter."""
+        import time
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0.05, burst=1, max_concurrency=4)
+        urls = [f'https://www.procyclingstats.com/race/test-{i}/2024' for i in range(4)]
+
+        with patch.object(scraper.session, 'get', side_effect=self._slow_get):
+            start = time.monotonic()
+            scraper.prefetch(urls)
+            elapsed = time.monotonic() - start
+
+        assert elapsed >= 0.15 + 0.1  # Three waits between four requests, plus the last request
+
+    def test_fetch_race_details_many(self):
+        """Test that the synchronous wrapper returns details keyed by URL."""
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0)
+        urls = ['https://www.procyclingstats.com/race/a/2024', 'https://www.procyclingstats.com/race/b/2024']
+
+        with patch.object(scraper.session, 'get', side_effect=self._slow_get):
+            details = scraper.fetch_race_details_many(urls)
+
+        assert set(details) == set(urls)
+        assert details[urls[0]]['name'] == urls[0]
+
+
+class TestFastParse:
+    """Test suite for the lxml-backed race page parser."""
+
+    @pytest.fixture
+    def race_page(self):
+        """Load a saved race results page."""
+        with open(os.path.join(FIXTURES_DIR, 'pcs_race_page.html'), 'rb') as f:
+            return f.read()
+
+    def test_matches_soup_parser(self, race_page):
+        """Test that the fast parser returns exactly what the BeautifulSoup parser returns."""
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0)
+
+        expected = scraper.parse_race_page(BeautifulSoup(race_page, 'html.parser'))
+        actual = scraper.parse_race_page_fast(race_page)
+
+        assert actual == expected
+        assert actual['name'] == 'Tour de France 2024'
+        assert actual['date'] == datetime(2024, 7, 13)
+        assert actual['country'] == 'fr'
+        assert actual['elevation_m'] == 4163.0
+        assert len(actual['results']) == 168  # DNF/OTL rows have no position
+
+    def test_relative_rider_links(self, race_page):
+        """Test that PCS ids are read from relative rider links."""
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0)
+        results = scraper.parse_race_page_fast(race_page)['results']
+
+        assert all(result['pcs_id'] for result in results)
+        assert results[0]['pcs_id'] == 'kragh-andersen-mathieu'
+
+    def test_fetch_race_details_uses_fast_parse(self, race_page):
+        """Test that fetch_race_details dispatches to the fast parser when enabled."""
+        scraper = ProCyclingStatsScraper(rate_limit_delay=0, fast_parse=True)
+
+        with patch.object(scraper, '_fetch_bytes', return_value=race_page), \
+             patch.object(scraper, 'parse_race_page', side_effect=AssertionError):
+            race_data = scraper.fetch_race_details('https://www.procyclingstats.com/race/tour-de-france/2024/stage-14')
+
+        assert race_data['category'] == 'GT'
+        assert race_data['characteristics']
+        assert race_data['url'].endswith('stage-14')
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
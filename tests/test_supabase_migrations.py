@@ -0,0 +1,110 @@
+"""Ordered check of the Supabase migrations against the schema they build up."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+MIGRATIONS = sorted((Path(__file__).parent.parent / 'supabase' / 'migrations').glob('*.sql'))
+
+# Words that can follow a table name where an alias would otherwise go
+KEYWORDS = {
+    'where', 'set', 'on', 'cross', 'join', 'left', 'right', 'inner', 'full', 'group', 'order',
+    'having', 'limit', 'union', 'for', 'returning', 'values', 'select', 'as', 'using', 'window'
+}
+
+CONSTRAINTS = {'primary', 'unique', 'constraint', 'foreign', 'check', 'exclude'}
+
+
+def strip_comments(sql):
+    return re.sub(r'--[^\n]*', '', sql)
+
+
+def matching_paren(sql, start):
+    """Index just past the parenthesis that closes the one at start."""
+    depth = 0
+    for index in range(start, len(sql)):
+        if sql[index] == '(':
+            depth += 1
+        elif sql[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    raise ValueError('Unbalanced parentheses')
+
+
+def split_top_level(body):
+    """Split a parenthesized list on the commas outside nested parentheses."""
+    items, depth, current = [], 0, ''
+    for char in body:
+        depth += (char == '(') - (char == ')')
+        if char == ',' and depth == 0:
+            items.append(current)
+            current = ''
+        else:
+            current += char
+    return items + [current]
+
+
+def column_names(items):
+    names = []
+    for item in items:
+        match = re.match(r'\s*(\w+)\s*(\(|$|\s)', item)
+        if match and match.group(2) != '(' and match.group(1).lower() not in CONSTRAINTS:
+            names.append(match.group(1).lower())
+    return names
+
+
+def apply_schema_changes(statement, tables):
+    """Record the tables and columns a statement creates, drops or adds."""
+    for table in re.findall(r'DROP TABLE (?:IF EXISTS )?(\w+)', statement, re.I):
+        tables.pop(table.lower(), None)
+
+    for match in re.finditer(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)\s*\(', statement, re.I):
+        if match.group(1).lower() not in tables:
+            body = statement[match.end() - 1:matching_paren(statement, match.end() - 1)][1:-1]
+            tables[match.group(1).lower()] = set(column_names(split_top_level(body)))
+
+    altered = re.match(r'\s*ALTER TABLE (?:IF EXISTS )?(\w+)', statement, re.I)
+    if altered and altered.group(1).lower() in tables:
+        columns = tables[altered.group(1).lower()]
+        columns.update(c.lower() for c in re.findall(r'ADD COLUMN (?:IF NOT EXISTS )?(\w+)', statement, re.I))
+        columns.difference_update(c.lower() for c in re.findall(r'DROP COLUMN (?:IF EXISTS )?(\w+)', statement, re.I))
+
+
+def referenced_columns(statement, tables):
+    """Yield (table, column) for every column a statement names on a known table."""
+    for match in re.finditer(r'INSERT INTO (\w+)\s*\(', statement, re.I):
+        body = statement[match.end() - 1:matching_paren(statement, match.end() - 1)][1:-1]
+        for column in column_names(split_top_level(body)):
+            yield match.group(1).lower(), column
+
+    for match in re.finditer(r'\bON (\w+)\s*\(', statement, re.I):
+        body = statement[match.end() - 1:matching_paren(statement, match.end() - 1)][1:-1]
+        for column in column_names(split_top_level(body)):
+            yield match.group(1).lower(), column
+
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE)\s+(\w+)\s+(?:AS\s+)?(\w+)', statement, re.I):
+        if table.lower() in tables and alias.lower() not in KEYWORDS:
+            aliases[alias.lower()] = table.lower()
+    for alias, column in re.findall(r'\b(\w+)\.(\w+)\b', statement):
+        if alias.lower() in aliases:
+            yield aliases[alias.lower()], column.lower()
+
+
+@pytest.mark.parametrize('upto', range(1, len(MIGRATIONS) + 1), ids=[path.name for path in MIGRATIONS])
+def test_migrations_apply_in_order(upto):
+    """Test that each migration only uses columns the earlier ones left in place."""
+    tables = {}
+    missing = []
+    for index, path in enumerate(MIGRATIONS[:upto]):
+        for statement in strip_comments(path.read_text(encoding='utf-8')).split(';'):
+            if index == upto - 1:
+                missing += [
+                    f"{table}.{column}" for table, column in referenced_columns(statement, tables)
+                    if table in tables and column not in tables[table]
+                ]
+            apply_schema_changes(statement, tables)
+
+    assert missing == []